@@ -6,6 +6,11 @@
 -- Enable UUID extension for generating unique IDs
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Trigram similarity for merchant name matching (where it is not available,
+-- apply migrations/007_merchants.sql instead: the API then matches merchants
+-- with an in-process trigram index)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- =====================================================
 -- 1. USERS TABLE (Investors)
 -- =====================================================
@@ -21,6 +26,7 @@ CREATE TABLE users (
     kyc_status VARCHAR(20) DEFAULT 'pending' CHECK (kyc_status IN ('pending', 'verified', 'rejected', 'under_review')),
     kyc_score DECIMAL(5,2) DEFAULT 0.00, -- Current KYC score (0-100)
     verification_date TIMESTAMP,
+    receipts_version BIGINT NOT NULL DEFAULT 0, -- Bumped on receipt/score changes (response cache key)
     
     -- Account Info
     account_type VARCHAR(20) DEFAULT 'investor' CHECK (account_type IN ('investor', 'admin')),
@@ -39,6 +45,53 @@ CREATE TABLE users (
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_kyc_status ON users(kyc_status);
 CREATE INDEX idx_users_created_at ON users(created_at DESC);
+CREATE INDEX idx_users_account_created ON users(account_type, created_at DESC, id DESC); -- Keyset pages of /admin/users
+
+-- =====================================================
+-- 1a. REFRESH_TOKENS TABLE (Rotating Session Tokens)
+-- =====================================================
+-- One row per issued refresh token, stored as its sha256. Each is
+-- exchanged once at POST /auth/refresh; a spent token presented again
+-- revokes every token of its family (one family per login).
+CREATE TABLE refresh_tokens (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    family_id UUID NOT NULL, -- Shared by every token descended from one login
+    token_hash VARCHAR(64) NOT NULL UNIQUE,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    used_at TIMESTAMP, -- Exchanged for the next token
+    revoked_at TIMESTAMP
+);
+
+CREATE INDEX idx_refresh_tokens_user_id ON refresh_tokens(user_id);
+CREATE INDEX idx_refresh_tokens_family_id ON refresh_tokens(family_id);
+
+-- Access tokens revoked before they expire (POST /auth/logout), by JWT
+-- id. API workers hold a Bloom filter of these jtis, kept current by
+-- LISTEN token_revoked. Rows can go once expires_at has passed.
+CREATE TABLE revoked_tokens (
+    jti VARCHAR(64) PRIMARY KEY,
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    expires_at TIMESTAMP NOT NULL, -- The token's exp
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+
+-- =====================================================
+-- 1b. MERCHANTS TABLE (Canonical Merchant Names)
+-- =====================================================
+-- Extracted company names ("NAIVAS", "Naivas Ltd", OCR variants) resolve
+-- to one merchant at ingest; scoring and stats group receipts by its id.
+CREATE TABLE merchants (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL, -- First spelling seen, for display
+    normalized_name VARCHAR(255) NOT NULL UNIQUE, -- Lowercased, punctuation and legal suffixes stripped
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_merchants_normalized_trgm ON merchants USING GIN (normalized_name gin_trgm_ops);
 
 -- =====================================================
 -- 2. RECEIPTS TABLE (Uploaded Images & Metadata)
@@ -52,6 +105,8 @@ CREATE TABLE receipts (
     file_path VARCHAR(500) NOT NULL, -- Storage path (local/S3/etc)
     file_size INTEGER, -- Size in bytes
     file_type VARCHAR(50), -- image/jpeg, image/png, etc
+    content_hash VARCHAR(64), -- SHA-256 of the stored blob (see receipt_blobs)
+    original_content_hash VARCHAR(64), -- Raw upload in the cold tier, if normalized
     
     -- Processing Status
     status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'completed', 'failed')),
@@ -61,9 +116,12 @@ CREATE TABLE receipts (
     
     -- Extracted Data (from ML model)
     company_name VARCHAR(255),
+    merchant_id INTEGER REFERENCES merchants(id), -- Canonical merchant for company_name
     receipt_date DATE,
     receipt_address TEXT,
+    locality_id INTEGER, -- Gazetteer locality (app/data/kenya_localities.csv) named in receipt_address
     total_amount DECIMAL(10,2),
+    amount_outlier_score DECIMAL(6,2), -- Robust z-score of total_amount against the user's earlier receipts
     currency VARCHAR(3) DEFAULT 'KES', -- Kenyan Shilling
     
     -- Extraction Confidence Scores (0-1)
@@ -74,7 +132,7 @@ CREATE TABLE receipts (
     overall_confidence DECIMAL(3,2), -- Average confidence
     
     -- Additional Data
-    raw_extraction_json JSONB, -- Full ML model output
+    raw_extraction_json JSONB, -- ML model's fields; tokens are in receipt_extractions
     
     -- Metadata
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -89,8 +147,65 @@ CREATE INDEX idx_receipts_user_id ON receipts(user_id);
 CREATE INDEX idx_receipts_status ON receipts(status);
 CREATE INDEX idx_receipts_receipt_date ON receipts(receipt_date DESC);
 CREATE INDEX idx_receipts_uploaded_at ON receipts(uploaded_at DESC);
+CREATE INDEX idx_receipts_user_uploaded ON receipts(user_id, uploaded_at DESC, id DESC); -- Keyset pages of /receipts
 CREATE INDEX idx_receipts_company_name ON receipts(company_name);
-CREATE INDEX idx_receipts_extraction_json ON receipts USING GIN (raw_extraction_json);
+CREATE INDEX idx_receipts_merchant_id ON receipts(merchant_id);
+CREATE INDEX idx_receipts_content_hash ON receipts(content_hash);
+
+-- =====================================================
+-- 2a. RECEIPT_EXTRACTIONS TABLE (Model Tokens, Off the Receipts Row)
+-- =====================================================
+-- The model's tokens, labels and decoded text as zlib-compressed JSON,
+-- read only when a receipt's full extraction is asked for.
+CREATE TABLE receipt_extractions (
+    receipt_id UUID PRIMARY KEY REFERENCES receipts(id) ON DELETE CASCADE,
+    payload BYTEA NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+ALTER TABLE receipt_extractions ALTER COLUMN payload SET STORAGE EXTERNAL; -- already compressed
+
+-- =====================================================
+-- 2b. RECEIPT_BLOBS TABLE (Content-Addressed File Store)
+-- =====================================================
+-- Files are stored once per SHA-256 under <tier prefix>/ab/cd/<hash>
+-- ('blobs/' for hot files, 'cold/' for retained raw originals);
+-- ref_count tracks how many receipts share each blob.
+CREATE TABLE receipt_blobs (
+    content_hash VARCHAR(64) NOT NULL,
+    tier VARCHAR(10) NOT NULL DEFAULT 'hot' CHECK (tier IN ('hot', 'cold')),
+    size_bytes INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (content_hash, tier)
+);
+
+-- =====================================================
+-- 2c. ARCHIVE TABLES (Packed Cold Storage)
+-- =====================================================
+-- Old completed receipt files are packed into append-only segment files
+-- under 'archive/segments/'; archived_blobs locates each one for a
+-- single ranged read.
+CREATE TABLE archive_segments (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    storage_key VARCHAR(500) NOT NULL UNIQUE,
+    entry_count INTEGER NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    raw_bytes BIGINT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE archived_blobs (
+    content_hash VARCHAR(64) PRIMARY KEY,
+    segment_id UUID NOT NULL REFERENCES archive_segments(id),
+    "offset" BIGINT NOT NULL,
+    length INTEGER NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    codec VARCHAR(10) NOT NULL DEFAULT 'none' CHECK (codec IN ('none', 'zlib')),
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_archived_blobs_segment_id ON archived_blobs(segment_id);
 
 -- =====================================================
 -- 3. VERIFICATION_SCORES TABLE (KYC Score Components)
@@ -151,6 +266,46 @@ CREATE INDEX idx_verification_scores_calculated_at ON verification_scores(calcul
 -- Unique constraint: One score record per user (latest calculation)
 CREATE UNIQUE INDEX idx_verification_scores_user_latest ON verification_scores(user_id);
 
+-- =====================================================
+-- 3b. USER_RECEIPT_AGGREGATES TABLE (Incremental Scoring Inputs)
+-- =====================================================
+-- One row per user, updated in the same transaction as every receipt
+-- insert/update/delete so scores are derived without scanning receipts.
+CREATE TABLE user_receipt_aggregates (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    rules_key VARCHAR(64) NOT NULL, -- Filter thresholds the row was built with
+    
+    trusted_count INTEGER NOT NULL DEFAULT 0,
+    dropped_count INTEGER NOT NULL DEFAULT 0,
+    total_spending DECIMAL(14,2) NOT NULL DEFAULT 0,
+    
+    -- Confidence sums (averages = sum / count)
+    overall_conf_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    overall_conf_count INTEGER NOT NULL DEFAULT 0,
+    conf_amount_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    conf_amount_count INTEGER NOT NULL DEFAULT 0,
+    conf_weighted_amount_sum DECIMAL(16,4) NOT NULL DEFAULT 0,
+    
+    date_count INTEGER NOT NULL DEFAULT 0,
+    min_receipt_date DATE,
+    max_receipt_date DATE,
+    date_conf_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    date_conf_count INTEGER NOT NULL DEFAULT 0,
+    
+    company_conf_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    company_conf_count INTEGER NOT NULL DEFAULT 0,
+    address_conf_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    address_conf_count INTEGER NOT NULL DEFAULT 0,
+    
+    -- Distinct merchants / locations with their receipt counts
+    merchant_counts JSONB NOT NULL DEFAULT '{}',
+    address_counts JSONB NOT NULL DEFAULT '{}',
+    -- Trusted amounts on a log scale, for per-user outlier scoring
+    amount_histogram JSONB NOT NULL DEFAULT '{}',
+    
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- =====================================================
 -- 4. AUDIT_LOGS TABLE (System Actions & Changes)
 -- =====================================================
@@ -217,6 +372,37 @@ CREATE TABLE verification_history (
 CREATE INDEX idx_verification_history_user_id ON verification_history(user_id);
 CREATE INDEX idx_verification_history_recorded_at ON verification_history(recorded_at DESC);
 
+-- =====================================================
+-- 6. PLATFORM_STATS TABLES (Admin Statistics Rollups)
+-- =====================================================
+-- Refreshed by the API when stale (stale-while-revalidate) or on a
+-- schedule by python -m app.scripts.refresh_admin_stats
+CREATE TABLE platform_stats (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1), -- A single row
+    total_users INTEGER NOT NULL DEFAULT 0, -- Investors
+    verified_users INTEGER NOT NULL DEFAULT 0,
+    pending_users INTEGER NOT NULL DEFAULT 0,
+    under_review_users INTEGER NOT NULL DEFAULT 0,
+    total_receipts BIGINT NOT NULL DEFAULT 0,
+    processed_receipts BIGINT NOT NULL DEFAULT 0,
+    failed_receipts BIGINT NOT NULL DEFAULT 0,
+    total_platform_spending DECIMAL(16,2) NOT NULL DEFAULT 0,
+    unique_merchants INTEGER NOT NULL DEFAULT 0,
+    average_kyc_score DECIMAL(5,2) NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    refresh_ms INTEGER -- How long the last refresh took
+);
+
+CREATE TABLE platform_stats_daily (
+    day DATE PRIMARY KEY,
+    new_users INTEGER NOT NULL DEFAULT 0,
+    verified_users INTEGER NOT NULL DEFAULT 0, -- By verification_date
+    receipts_uploaded INTEGER NOT NULL DEFAULT 0,
+    receipts_processed INTEGER NOT NULL DEFAULT 0,
+    receipts_failed INTEGER NOT NULL DEFAULT 0,
+    spending DECIMAL(16,2) NOT NULL DEFAULT 0 -- Processed receipts uploaded that day
+);
+
 -- =====================================================
 -- TRIGGERS & FUNCTIONS
 -- =====================================================
@@ -269,12 +455,67 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger to log score changes
+-- Triggers to log score changes (recalculations that leave the score
+-- unchanged only bump calculated_at and add no history row)
+CREATE TRIGGER log_verification_score_inserts
+    AFTER INSERT ON verification_scores
+    FOR EACH ROW
+    EXECUTE FUNCTION log_score_to_history();
+
 CREATE TRIGGER log_verification_score_changes
-    AFTER INSERT OR UPDATE ON verification_scores
+    AFTER UPDATE ON verification_scores
     FOR EACH ROW
+    WHEN (
+        (OLD.document_quality_score, OLD.spending_pattern_score, OLD.consistency_score,
+         OLD.diversity_score, OLD.final_score, OLD.total_receipts)
+        IS DISTINCT FROM
+        (NEW.document_quality_score, NEW.spending_pattern_score, NEW.consistency_score,
+         NEW.diversity_score, NEW.final_score, NEW.total_receipts)
+    )
     EXECUTE FUNCTION log_score_to_history();
 
+-- Tell API workers which users changed so they drop them from their
+-- principal caches (LISTEN user_changed); '*' clears every cache
+CREATE OR REPLACE FUNCTION notify_user_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (SELECT count(*) FROM changed_users) > 1000 THEN
+        PERFORM pg_notify('user_changed', '*');
+    ELSE
+        PERFORM pg_notify('user_changed', id::text) FROM changed_users;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER users_notify_change
+    AFTER UPDATE ON users
+    REFERENCING OLD TABLE AS changed_users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_user_changed();
+
+CREATE TRIGGER users_notify_delete
+    AFTER DELETE ON users
+    REFERENCING OLD TABLE AS changed_users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_user_changed();
+
+-- Tell API workers which access tokens were revoked so they add them to
+-- their revocation filters (LISTEN token_revoked)
+CREATE OR REPLACE FUNCTION notify_token_revoked()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('token_revoked', jti) FROM revoked_jtis;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER revoked_tokens_notify
+    AFTER INSERT ON revoked_tokens
+    REFERENCING NEW TABLE AS revoked_jtis
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_token_revoked();
+
 -- =====================================================
 -- VIEWS FOR COMMON QUERIES
 -- =====================================================
@@ -300,19 +541,19 @@ LEFT JOIN verification_scores vs ON u.id = vs.user_id
 GROUP BY u.id, u.full_name, u.email, u.kyc_status, u.kyc_score, vs.final_score, vs.is_verified;
 
 -- View: Admin Statistics
+-- Reads the rollup row rather than joining users, receipts and scores
 CREATE OR REPLACE VIEW admin_statistics AS
 SELECT 
-    COUNT(DISTINCT u.id) as total_users,
-    COUNT(DISTINCT CASE WHEN u.kyc_status = 'verified' THEN u.id END) as verified_users,
-    COUNT(DISTINCT CASE WHEN u.kyc_status = 'pending' THEN u.id END) as pending_users,
-    COUNT(r.id) as total_receipts,
-    COUNT(CASE WHEN r.status = 'completed' THEN 1 END) as processed_receipts,
-    SUM(r.total_amount) as total_platform_spending,
-    AVG(vs.final_score) as average_kyc_score,
-    COUNT(DISTINCT r.company_name) as unique_companies
-FROM users u
-LEFT JOIN receipts r ON u.id = r.user_id
-LEFT JOIN verification_scores vs ON u.id = vs.user_id;
+    total_users,
+    verified_users,
+    pending_users,
+    total_receipts,
+    processed_receipts,
+    total_platform_spending,
+    average_kyc_score,
+    unique_merchants as unique_companies,
+    refreshed_at
+FROM platform_stats;
 
 -- View: Recent Activity Feed
 CREATE OR REPLACE VIEW recent_activity AS
@@ -2,22 +2,39 @@
 API Dependencies - Authentication & Authorization
 """
 
+import uuid
+from typing import AsyncGenerator, Generator
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
-from app.core.database import get_db
+from app.core.database import AsyncSessionLocal
+from app.core.replicas import replica_set
 from app.core.security import decode_access_token
 from app.models.models import User
+from app.services.principal_cache import principal_cache
+from app.services.token_revocation import revocation_filter
 
 security = HTTPBearer()
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
 ) -> User:
-    """Get current authenticated user from JWT token"""
+    """
+    Get current authenticated user from JWT token.
+
+    A token's jti is looked up in revoked_tokens only when the worker's
+    revocation filter says it may be there.
+
+    Active users come from the principal cache when they can; otherwise
+    the lookup runs on a short-lived async session of its own, so no
+    connection is held for the rest of the request. Either way the user
+    comes back detached with its columns loaded; routes that modify it add
+    it to their own session first.
+    """
     
     token = credentials.credentials
     payload = decode_access_token(token)
@@ -29,14 +46,29 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user_id: str = payload.get("sub")
-    if user_id is None:
+    try:
+        user_id = uuid.UUID(str(payload.get("sub")))
+    except ValueError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload",
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    jti = payload.get("jti")
+    if jti is not None and await revocation_filter.is_revoked(jti):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user = principal_cache.get(user_id)
+    if user is None:
+        token = principal_cache.token()
+        async with AsyncSessionLocal() as db:
+            user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+        if user is not None and user.is_active:
+            principal_cache.put(user, token)
     
     if user is None:
         raise HTTPException(
@@ -53,7 +85,7 @@ def get_current_user(
     return user
 
 
-def get_current_admin_user(
+async def get_current_admin_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """Get current admin user - for admin-only routes"""
@@ -63,3 +95,28 @@ def get_current_admin_user(
             detail="Not enough permissions. Admin access required."
         )
     return current_user
+
+
+def get_read_db(
+    current_user: User = Depends(get_current_user)
+) -> Generator[Session, None, None]:
+    """
+    Session for a read-only route: a read replica that already has
+    everything the user wrote, else the primary (see app.core.replicas).
+    """
+    db = replica_set.session(current_user)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(
+    current_user: User = Depends(get_current_user)
+) -> AsyncGenerator[AsyncSession, None]:
+    """get_read_db for async routes"""
+    db = await replica_set.async_session(current_user)
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -2,113 +2,213 @@
 Admin API Routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from app.core.database import get_db
-from app.models.models import User, Receipt, VerificationScore
-from app.schemas.schemas import UserResponse, AdminStatistics
-from app.api.dependencies import get_current_admin_user
+from sqlalchemy import func, select
+from datetime import date, timedelta
+from typing import List, Literal, Optional
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine, get_db
+from app.core.replicas import replica_set
+from app.core.security import password_hasher
+from app.models.models import AuditLog, PlatformStats, PlatformStatsDaily, User
+from app.schemas.schemas import (
+    UserResponse,
+    AdminStatistics,
+    DailyStatistics,
+    ScoringSweepRequest,
+    ScoringSweepResponse,
+)
+from app.api.dependencies import get_async_read_db, get_current_admin_user
+from app.services.admin_exports import FORMATS, stream_export
+from app.services.admin_stats import (
+    cache_control,
+    contiguous_days,
+    read_platform_stats,
+    refresh_in_background,
+    refresh_now,
+)
+from app.services.bulk_rescoring import current_weights, run_bulk_rescore
+from app.services.principal_cache import invalidate_on_commit, principal_cache
+from app.services.response_cache import response_cache
+from app.services.score_calibration import get_snapshot, sweep, weight_grid, weight_grid_size
+from app.services.token_revocation import revocation_filter
+from app.utils.pagination import (
+    MAX_PAGE_SIZE,
+    keyset_page,
+    page_rows,
+    parse_fields,
+    set_next_cursor,
+    sparse_response,
+)
+
+# Keeps a sweep response to a size a browser can still render
+MAX_SWEEP_POINTS = 50_000
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
 @router.get("/users", response_model=List[UserResponse])
-def get_all_users(
-    skip: int = 0,
-    limit: int = 100,
+async def get_all_users(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     kyc_status: str = None,
+    skip: int = Query(0, ge=0, deprecated=True),
     current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get all users (Admin only)"""
+    """
+    Get all users (Admin only), newest first.
+
+    Page with the X-Next-Cursor response header passed back as ``cursor``;
+    ``skip`` still works but reads every skipped row.
+    """
     
-    query = db.query(User).filter(User.account_type == 'investor')
+    selected = parse_fields(fields, UserResponse, required=("id", "created_at"))
+    if selected is None:
+        query = select(User)
+    else:
+        query = select(*(getattr(User, name) for name in selected))
     
+    query = query.where(User.account_type == 'investor')
     if kyc_status:
-        query = query.filter(User.kyc_status == kyc_status)
-    
-    users = (
-        query
-        .order_by(User.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+        query = query.where(User.kyc_status == kyc_status)
+    
+    query = keyset_page(query, User.created_at, User.id, cursor, limit)
+    if skip and not cursor:
+        query = query.offset(skip)
     
+    result = await db.execute(query)
+    users = result.scalars().all() if selected is None else result.all()
+    users, next_cursor = page_rows(users, "created_at", limit)
+    
+    if selected is not None:
+        return sparse_response(users, UserResponse, selected, next_cursor)
+    set_next_cursor(response, next_cursor)
     return users
 
 
+async def _platform_stats(
+    db: AsyncSession,
+    background_tasks: BackgroundTasks,
+    response: Response,
+) -> tuple[PlatformStats, bool]:
+    """
+    The rollup row, stale-while-revalidate (see app.services.admin_stats).
+    Also says whether it was refreshed just now: ``db`` may be a replica
+    that has not seen the new rows yet.
+    """
+    stats, age = await read_platform_stats(db)
+    refreshed = False
+    if age > settings.ADMIN_STATS_MAX_AGE_SECONDS + settings.ADMIN_STATS_STALE_SECONDS:
+        # Missing or too old to serve: refresh before answering
+        await run_in_threadpool(refresh_now)
+        refreshed = True
+        async with AsyncSessionLocal() as primary:
+            stats, age = await read_platform_stats(primary)
+    elif age > settings.ADMIN_STATS_MAX_AGE_SECONDS:
+        background_tasks.add_task(refresh_in_background)
+    response.headers["Cache-Control"] = cache_control(age)
+    return stats, refreshed
+
+
 @router.get("/statistics", response_model=AdminStatistics)
-def get_platform_statistics(
+async def get_platform_statistics(
+    response: Response,
+    background_tasks: BackgroundTasks,
     current_admin: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get platform statistics (Admin only)"""
+    """Get platform statistics (Admin only), from the platform_stats rollup"""
     
-    total_users = (
-        db.query(func.count(User.id))
-        .filter(User.account_type == 'investor')
-        .scalar()
-    )
-    
-    verified_users = (
-        db.query(func.count(User.id))
-        .filter(User.account_type == 'investor', User.kyc_status == 'verified')
-        .scalar()
-    )
-    
-    pending_users = (
-        db.query(func.count(User.id))
-        .filter(User.account_type == 'investor', User.kyc_status == 'pending')
-        .scalar()
-    )
-    
-    under_review_users = (
-        db.query(func.count(User.id))
-        .filter(User.account_type == 'investor', User.kyc_status == 'under_review')
-        .scalar()
-    )
+    stats, _ = await _platform_stats(db, background_tasks, response)
+    return stats
+
+
+@router.get("/statistics/daily", response_model=List[DailyStatistics])
+async def get_daily_statistics(
+    response: Response,
+    background_tasks: BackgroundTasks,
+    days: int = Query(30, ge=1, le=366),
+    current_admin: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Per-day activity for the last ``days`` days, oldest first (Admin only)"""
     
-    total_receipts = db.query(func.count(Receipt.id)).scalar()
+    _, refreshed = await _platform_stats(db, background_tasks, response)
+    if refreshed:
+        async with AsyncSessionLocal() as primary:
+            return await _daily_statistics(primary, days)
+    return await _daily_statistics(db, days)
+
+
+async def _daily_statistics(db: AsyncSession, days: int) -> list:
+    today = (await db.execute(select(func.current_date()))).scalar()
+    since = today - timedelta(days=days - 1)
+    rows = {
+        row.day: row
+        for row in (
+            await db.execute(
+                select(PlatformStatsDaily).where(PlatformStatsDaily.day >= since)
+            )
+        ).scalars()
+    }
     
-    processed_receipts = (
-        db.query(func.count(Receipt.id))
-        .filter(Receipt.status == 'completed')
-        .scalar()
-    )
+    return contiguous_days(rows, since, days)
+
+
+@router.get("/exports/{dataset}")
+async def export_dataset(
+    dataset: Literal["users", "scores", "receipts"],
+    format: Literal["csv", "ndjson"] = "csv",
+    current_admin: User = Depends(get_current_admin_user),
+):
+    """
+    Download every user, score or per-user receipt summary (Admin only).
+
+    Rows are streamed from a server-side cursor as they are read, so an
+    export of any size starts at once and runs in constant memory.
+    """
     
-    failed_receipts = (
-        db.query(func.count(Receipt.id))
-        .filter(Receipt.status == 'failed')
-        .scalar()
+    filename = f"{dataset}-{date.today().isoformat()}.{format}"
+    replica = replica_set.pick()
+    return StreamingResponse(
+        stream_export(dataset, format, replica.async_engine if replica else async_engine),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
-    
-    total_spending = (
-        db.query(func.sum(Receipt.total_amount))
-        .filter(Receipt.status == 'completed')
-        .scalar()
-    ) or 0
-    
-    avg_score = (
-        db.query(func.avg(VerificationScore.final_score))
-        .scalar()
-    ) or 0
+
+
+@router.get("/caches")
+def get_cache_stats(current_admin: User = Depends(get_current_admin_user)):
+    """Hit rates of this worker's in-process caches (Admin only)"""
     
     return {
-        "total_users": total_users or 0,
-        "verified_users": verified_users or 0,
-        "pending_users": pending_users or 0,
-        "under_review_users": under_review_users or 0,
-        "total_receipts": total_receipts or 0,
-        "processed_receipts": processed_receipts or 0,
-        "failed_receipts": failed_receipts or 0,
-        "total_platform_spending": total_spending,
-        "average_kyc_score": round(avg_score, 2)
+        "principals": principal_cache.stats(),
+        "responses": response_cache.stats(),
+        "revocations": revocation_filter.stats(),
     }
 
 
+@router.get("/password-hashing")
+def get_password_hashing_stats(current_admin: User = Depends(get_current_admin_user)):
+    """Queue and timing of this worker's bcrypt executor (Admin only)"""
+    
+    return password_hasher.stats()
+
+
+@router.get("/replicas")
+def get_replica_stats(current_admin: User = Depends(get_current_admin_user)):
+    """Health, lag and read counts of this worker's read replicas (Admin only)"""
+    
+    return replica_set.stats()
+
+
 @router.patch("/users/{user_id}/verify", response_model=UserResponse)
 def manually_verify_user(
     user_id: str,
@@ -130,7 +230,105 @@ def manually_verify_user(
     user.kyc_status = 'verified'
     user.verification_date = datetime.utcnow()
     
+    invalidate_on_commit(db, user.id)
     db.commit()
     db.refresh(user)
     
-    return user
\ No newline at end of file
+    return user
+
+
+@router.post("/rescore", status_code=status.HTTP_202_ACCEPTED)
+def start_bulk_rescore(
+    background_tasks: BackgroundTasks,
+    dry_run: bool = False,
+    current_admin: User = Depends(get_current_admin_user),
+):
+    """Rescore every user under the current scoring settings (Admin only)"""
+    
+    background_tasks.add_task(
+        run_bulk_rescore, requested_by=current_admin.id, dry_run=dry_run
+    )
+    
+    return {
+        "detail": "Bulk rescoring started; see GET /admin/rescore/last for the summary",
+        "dry_run": dry_run,
+    }
+
+
+@router.get("/rescore/last")
+async def get_last_bulk_rescore(
+    current_admin: User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Summary and status transitions of the latest bulk rescore (Admin only)"""
+    
+    entry = (
+        await db.execute(
+            select(AuditLog)
+            .where(AuditLog.action_type == 'bulk_rescore')
+            .order_by(AuditLog.created_at.desc())
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+    
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No bulk rescore has run yet"
+        )
+    
+    return {
+        "created_at": entry.created_at,
+        "requested_by": entry.user_id,
+        **entry.new_value,
+    }
+
+
+@router.post("/scoring/sweep", response_model=ScoringSweepResponse)
+def sweep_scoring_settings(
+    request: ScoringSweepRequest,
+    current_admin: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Status counts for a grid of scoring settings; read-only (Admin only)"""
+    # Stays sync: the sweep is CPU-bound and belongs in the threadpool,
+    # not on the event loop
+    
+    weight_sets = [
+        (w.document_quality, w.spending_pattern, w.consistency, w.diversity)
+        for w in request.weights
+    ]
+    weight_count = len(weight_sets)
+    if request.weight_step is not None:
+        try:
+            weight_count += weight_grid_size(request.weight_step)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    # Counted before the weight grid is built: a fine step is millions of sets
+    grid_points = (
+        len(request.min_confidences)
+        * len(request.max_amounts)
+        * max(weight_count, 1)
+        * len(request.verification_thresholds)
+    )
+    if not grid_points or grid_points > MAX_SWEEP_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Grid must have between 1 and {MAX_SWEEP_POINTS} points (got {grid_points})"
+        )
+    if request.weight_step is not None:
+        weight_sets += weight_grid(request.weight_step)
+    if not weight_sets:
+        weight_sets = [current_weights()]
+    
+    snapshot = get_snapshot(db, refresh=request.refresh_snapshot)
+    result = sweep(
+        snapshot,
+        min_confidences=request.min_confidences,
+        max_amounts=request.max_amounts,
+        weight_sets=weight_sets,
+        thresholds=request.verification_thresholds,
+    )
+    
+    return result
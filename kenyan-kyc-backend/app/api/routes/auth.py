@@ -2,34 +2,104 @@
 Authentication API Routes
 """
 
+import uuid
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import datetime
-from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
-from app.models.models import User
-from app.schemas.schemas import UserCreate, UserLogin, UserResponse, Token
-from app.api.dependencies import get_current_user
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.security import (
+    PasswordHasherBusy,
+    create_access_token,
+    decode_access_token,
+    hash_refresh_token,
+    new_refresh_token,
+    password_hasher,
+)
+from app.models.models import RefreshToken, User
+from app.schemas.schemas import UserCreate, UserLogin, UserResponse, Token, RefreshRequest
+from app.api.dependencies import get_current_user, security
+from app.services.principal_cache import invalidate_on_commit
+from app.services.token_revocation import revoke_token
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _access_token(user) -> str:
+    return create_access_token(
+        data={
+            "sub": str(user.id),
+            "email": user.email,
+            "account_type": user.account_type
+        }
+    )
+
+
+def _issue_refresh_token(db: AsyncSession, user_id, family_id) -> str:
+    token = new_refresh_token()
+    db.add(RefreshToken(
+        user_id=user_id,
+        family_id=family_id,
+        token_hash=hash_refresh_token(token),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+async def _revoke_family(db: AsyncSession, family_id) -> None:
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new investor account"""
-    
+
     # Check if email already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = (
+        await db.execute(select(User.id).where(User.email == user_data.email))
+    ).first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    
+    # Hand the connection back while waiting on bcrypt
+    await db.rollback()
+
+    try:
+        password_hash = await password_hasher.hash(user_data.password)
+    except PasswordHasherBusy:
+        raise _busy()
+
     # Create new user
     new_user = User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         full_name=user_data.full_name,
         phone_number=user_data.phone_number,
         national_id=user_data.national_id,
@@ -37,57 +107,127 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         kyc_status='pending',
         kyc_score=0.00
     )
-    
+
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Registered by a concurrent request since the check above
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    await db.refresh(new_user)
+
     return new_user
 
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    """Login with email and password - returns JWT token"""
-    
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    """Login with email and password - returns an access and a refresh token"""
+
     # Find user by email
-    user = db.query(User).filter(User.email == credentials.email).first()
-    
+    user = (
+        await db.execute(
+            select(User.id, User.email, User.password_hash, User.account_type, User.is_active)
+            .where(User.email == credentials.email)
+        )
+    ).first()
+    # Hand the connection back while waiting on bcrypt
+    await db.rollback()
+
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     # Verify password
-    if not verify_password(credentials.password, user.password_hash):
+    try:
+        valid = await password_hasher.verify(credentials.password, user.password_hash)
+    except PasswordHasherBusy:
+        raise _busy()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     # Check if user is active
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Account is inactive"
         )
-    
-    # Update last login
-    user.last_login = datetime.utcnow()
-    db.commit()
-    
-    # Create access token
-    access_token = create_access_token(
-        data={
-            "sub": str(user.id),
-            "email": user.email,
-            "account_type": user.account_type
-        }
+
+    # Update last login, start a new refresh token family and drop the
+    # user's expired tokens
+    await db.execute(update(User).where(User.id == user.id).values(last_login=datetime.utcnow()))
+    await db.execute(
+        delete(RefreshToken).where(
+            RefreshToken.user_id == user.id, RefreshToken.expires_at < datetime.utcnow()
+        )
     )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = _issue_refresh_token(db, user.id, uuid.uuid4())
+    invalidate_on_commit(db.sync_session, user.id)
+    await db.commit()
+
+    return {
+        "access_token": _access_token(user),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Exchange a refresh token for a new access token and refresh token.
+
+    Each refresh token works once. Presenting one that was already
+    exchanged means two parties hold the chain, so every token descended
+    from the same login is revoked and both have to log in again.
+    """
+
+    stored = (
+        await db.execute(
+            select(RefreshToken)
+            .where(RefreshToken.token_hash == hash_refresh_token(body.refresh_token))
+            .with_for_update()
+        )
+    ).scalar_one_or_none()
+
+    if stored is None or stored.revoked_at is not None or stored.expires_at <= datetime.utcnow():
+        raise _invalid_refresh_token()
+
+    if stored.used_at is not None:
+        await _revoke_family(db, stored.family_id)
+        await db.commit()
+        raise _invalid_refresh_token()
+
+    user = (
+        await db.execute(
+            select(User.id, User.email, User.account_type, User.is_active)
+            .where(User.id == stored.user_id)
+        )
+    ).first()
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account is inactive"
+        )
+
+    stored.used_at = datetime.utcnow()
+    refresh_token = _issue_refresh_token(db, user.id, stored.family_id)
+    await db.commit()
+
+    return {
+        "access_token": _access_token(user),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
 
 
 @router.get("/me", response_model=UserResponse)
@@ -97,6 +237,29 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-def logout(current_user: User = Depends(get_current_user)):
-    """Logout current user"""
+async def logout(
+    body: Optional[RefreshRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Logout current user: revokes this access token and, if one is sent,
+    the refresh token's family.
+    """
+
+    if body is not None:
+        family_id = (
+            await db.execute(
+                select(RefreshToken.family_id).where(
+                    RefreshToken.token_hash == hash_refresh_token(body.refresh_token),
+                    RefreshToken.user_id == current_user.id,
+                )
+            )
+        ).scalar_one_or_none()
+        if family_id is not None:
+            await _revoke_family(db, family_id)
+
+    await revoke_token(db, decode_access_token(credentials.credentials), current_user.id)
+
     return {"message": "Successfully logged out"}
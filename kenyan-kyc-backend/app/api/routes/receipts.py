@@ -1,30 +1,51 @@
 import os
-import shutil
 from uuid import uuid4, UUID
 from fastapi import Security
 from datetime import datetime, date
 from decimal import Decimal
 import logging
+from typing import Literal, Optional
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, RedirectResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
 
 from app.core.database import get_db
 from app.core.config import settings
 from app.models.models import User, Receipt
 from app.schemas import ReceiptResponse
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_async_read_db, get_current_user, get_read_db
 from app.services.ml_service import ml_service
-from app.services.kyc_scoring import KYCScorer
+from app.services.kyc_scoring import KYCScorer, ReceiptContribution
+from app.services.gazetteer import gazetteer
+from app.services.merchants import merchant_resolver
+from app.services.storage import blob_store, cold_store, storage_backend
+from app.services.archive import receipt_archive
+from app.services.extractions import load_extraction, store_extraction
+from app.services.imaging import (
+    DERIVATIVE_MEDIA_TYPE,
+    ImageTooLarge,
+    ensure_derivative,
+    generate_derivatives,
+    ingest_upload,
+    remove_derivatives,
+)
+from app.utils.http_files import blob_response, bytes_response
+from app.utils.pagination import (
+    MAX_PAGE_SIZE,
+    keyset_page,
+    page_rows,
+    parse_fields,
+    set_next_cursor,
+    sparse_response,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/receipts", tags=["Receipts"])
 
-UPLOAD_DIR = os.path.join(settings.UPLOAD_DIR, "receipts")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 
 def to_primitive(obj):
     """Recursively convert dates/decimals/etc. into JSON-safe types."""
@@ -76,23 +97,51 @@ def extract_company_name(parsed: dict) -> str | None:
     return None
 
 
+# Receipt columns a listing can return (raw_extraction_json never is)
+_LISTED_COLUMNS = [name for name in ReceiptResponse.model_fields if name in Receipt.__table__.c]
+
+
 @router.get("", response_model=list[ReceiptResponse])
-def list_receipts(
-    db: Session = Depends(get_db),
+async def list_receipts(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """
-    List the current user's receipts (most recent first).
+    List the current user's receipts (most recent first), a page at a time.
     Used by dashboard + analytics.
+
+    The X-Next-Cursor response header, passed back as ``cursor``, fetches
+    the next page; it is absent on the last one. ``fields=id,company_name``
+    returns only the named fields.
     """
-    receipts = (
-        db.query(Receipt)
-        .filter(Receipt.user_id == current_user.id)
-        .order_by(Receipt.uploaded_at.desc())
-        .limit(50)
-        .all()
+    selected = parse_fields(fields, ReceiptResponse, required=("id", "uploaded_at"))
+    if selected is None:
+        query = select(Receipt).options(
+            load_only(*(getattr(Receipt, name) for name in _LISTED_COLUMNS))
+        )
+    else:
+        query = select(*(getattr(Receipt, name) for name in selected if name in _LISTED_COLUMNS))
+
+    result = await db.execute(
+        keyset_page(
+            query.where(Receipt.user_id == current_user.id),
+            Receipt.uploaded_at,
+            Receipt.id,
+            cursor,
+            limit,
+        )
     )
-    return receipts
+    rows = result.scalars().all() if selected is None else result.all()
+    rows, next_cursor = page_rows(rows, "uploaded_at", limit)
+
+    if selected is not None:
+        return sparse_response(rows, ReceiptResponse, selected, next_cursor)
+    set_next_cursor(response, next_cursor)
+    return rows
 
 
 @router.post("/upload", response_model=ReceiptResponse)
@@ -119,21 +168,23 @@ async def upload_receipt(
             detail="No file uploaded",
         )
 
-    # Generate unique filename
     receipt_id = uuid4()
     original_name = file.filename or "receipt"
-    _, ext = os.path.splitext(original_name)
-    safe_name = f"{receipt_id}{ext}"
-    file_path = os.path.join(UPLOAD_DIR, safe_name)
-
-    print(f"Saving file to: {file_path}", flush=True)
 
-    # Save file to disk
+    # Save file into the content-addressed store (deduplicates identical uploads);
+    # image uploads may be rewritten to a canonical compressed copy first
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        file_size = os.path.getsize(file_path)
-        print(f"File saved successfully ({file_size} bytes)", flush=True)
+        ingested = ingest_upload(file.file, content_type=file.content_type, db=db)
+        stored = ingested.blob
+        file_path = stored.key
+        file_size = stored.size
+        print(f"File saved to {file_path} ({file_size} bytes)", flush=True)
+    except ImageTooLarge as e:
+        print(f"Rejected oversized image: {e}", flush=True)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Image dimensions are too large",
+        )
     except Exception as e:
         print(f"FAILED to save file: {e}", flush=True)
         import traceback
@@ -151,7 +202,9 @@ async def upload_receipt(
         file_name=original_name,
         file_path=file_path,
         file_size=file_size if hasattr(Receipt, "file_size") else None,
-        file_type=file.content_type if hasattr(Receipt, "file_type") else None,
+        file_type=ingested.media_type if hasattr(Receipt, "file_type") else None,
+        content_hash=stored.content_hash,
+        original_content_hash=ingested.original.content_hash if ingested.original else None,
         status="processing",
         uploaded_at=datetime.utcnow(),
         processing_started_at=datetime.utcnow()
@@ -161,6 +214,11 @@ async def upload_receipt(
 
     try:
         db.add(receipt)
+        blob_store.add_reference(db, stored)
+        # Same bytes as an archived receipt: the fresh hot copy takes over
+        receipt_archive.forget(db, stored.content_hash)
+        if ingested.original:
+            cold_store.add_reference(db, ingested.original)
         db.commit()
         db.refresh(receipt)
         print(f"Receipt record created: {receipt_id}", flush=True)
@@ -170,17 +228,21 @@ async def upload_receipt(
         traceback.print_exc()
         raise
 
+    # Thumbnail + preview for list views (best effort, lazily re-created if missing)
+    generate_derivatives(stored.content_hash)
+
     # Run ML
     print("Starting ML inference...", flush=True)
     print(f"ML Service object: {ml_service}", flush=True)
     print(f"ML Service loaded: {ml_service._loaded}", flush=True)
     print(f"Model path: {settings.MODEL_PATH}", flush=True)
     print(f"Model path exists: {os.path.exists(settings.MODEL_PATH)}", flush=True)
-    print(f"File exists: {os.path.exists(file_path)}", flush=True)
     
     try:
-        print(f"Calling ml_service.run_inference({file_path})...", flush=True)
-        parsed = ml_service.run_inference(file_path) or {}
+        # The blob may live on another node (S3 backend); OCR needs a local copy
+        with blob_store.local_path(stored.content_hash) as local_file:
+            print(f"Calling ml_service.run_inference({local_file})...", flush=True)
+            parsed = ml_service.run_inference(local_file) or {}
         print("ML inference complete!", flush=True)
         print(f"Parsed data type: {type(parsed)}", flush=True)
         print(f"Parsed data keys: {parsed.keys() if isinstance(parsed, dict) else 'N/A'}", flush=True)
@@ -191,15 +253,23 @@ async def upload_receipt(
         print("Extracting fields...", flush=True)
         receipt.company_name = extract_company_name(parsed)
         print(f"Company: {receipt.company_name}", flush=True)
+        receipt.merchant_id = merchant_resolver.resolve(db, receipt.company_name)
+        print(f"Merchant: {receipt.merchant_id}", flush=True)
         
         receipt.receipt_date = parsed.get("receipt_date")
         print(f"Date: {receipt.receipt_date}", flush=True)
         
         receipt.receipt_address = parsed.get("receipt_address")
         print(f"Address: {receipt.receipt_address}", flush=True)
+        receipt.locality_id = gazetteer.match_id(receipt.receipt_address)
+        print(f"Locality: {receipt.locality_id}", flush=True)
         
         receipt.total_amount = parsed.get("total_amount")
         print(f"Total: {receipt.total_amount}", flush=True)
+        receipt.amount_outlier_score = KYCScorer(db).amount_outlier_score(
+            str(current_user.id), receipt.total_amount
+        )
+        print(f"Amount outlier score: {receipt.amount_outlier_score}", flush=True)
         
         receipt.currency = parsed.get("currency", "KES")
         print(f"Currency: {receipt.currency}", flush=True)
@@ -212,10 +282,10 @@ async def upload_receipt(
         receipt.confidence_total = confidence
         print(f"Confidence: {confidence}", flush=True)
 
-        # Store JSON-safe copy of full extraction
+        # Store JSON-safe copy of full extraction (tokens in a side row)
         if hasattr(receipt, "raw_extraction_json") and parsed is not None:
             print("Converting to JSON-safe format...", flush=True)
-            receipt.raw_extraction_json = to_primitive(parsed)
+            store_extraction(db, receipt, to_primitive(parsed))
 
         receipt.status = "completed"
         if hasattr(Receipt, "processing_completed_at"):
@@ -239,6 +309,14 @@ async def upload_receipt(
 
     print("Saving receipt status to database...", flush=True)
     try:
+        # Fold the receipt into the user's running score aggregates in the
+        # same transaction (a failed one only bumps receipts_version);
+        # refresh first so values are rounded as stored
+        db.flush()
+        db.refresh(receipt)
+        KYCScorer(db).apply_receipt_change(
+            str(current_user.id), after=ReceiptContribution.of(receipt)
+        )
         db.commit()
         db.refresh(receipt)
         print(f"Receipt saved with status: {receipt.status}", flush=True)
@@ -256,7 +334,6 @@ async def upload_receipt(
         try:
             scorer = KYCScorer(db)
             scorer.calculate_user_score(str(current_user.id))
-            db.commit()
             print("KYC score calculated", flush=True)
         except Exception as e:
             print(f"Warning: KYC score calculation failed (non-critical): {e}", flush=True)
@@ -272,11 +349,15 @@ async def upload_receipt(
 @router.get("/{receipt_id}/file")
 def get_receipt_file(
     receipt_id: str,
+    request: Request,
+    size: Literal["thumb", "preview", "original"] = "original",
     db: Session = Depends(get_db),
     current_user: User = Security(get_current_user),
 ):
     """
-    Return the raw receipt file for viewing/downloading.
+    Return the receipt file for viewing/downloading.
+    ``size=thumb|preview`` serves a small cached WebP rendition for list views;
+    responses carry an ETag and honour conditional and Range requests.
     """
     try:
         receipt_uuid = UUID(receipt_id)
@@ -297,18 +378,115 @@ def get_receipt_file(
             detail="Receipt not found",
         )
 
-    if not receipt.file_path or not os.path.exists(receipt.file_path):
+    media_type = getattr(receipt, "file_type", None) or "application/octet-stream"
+
+    # Pre-migration receipts still point at a local file path
+    if not receipt.content_hash:
+        if not receipt.file_path or not os.path.exists(receipt.file_path):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Receipt file not found on server",
+            )
+        return FileResponse(
+            path=receipt.file_path,
+            media_type=media_type,
+            filename=receipt.file_name,
+        )
+
+    key = blob_store.key_for(receipt.content_hash)
+    filename = receipt.file_name
+    etag = f'"{receipt.content_hash}-{size}"'
+    derivative = None
+    if size != "original":
+        derivative = ensure_derivative(receipt.content_hash, size)
+        # Non-image sources (PDF) have no derivative; serve the original
+        if derivative:
+            key = derivative
+            media_type = DERIVATIVE_MEDIA_TYPE
+            filename = f"{os.path.splitext(receipt.file_name)[0]}-{size}.webp"
+
+    # Old processed receipts live in an archive segment: one ranged read
+    archived = None if derivative else receipt_archive.lookup(db, receipt.content_hash)
+    if archived:
+        if archived.codec == "none":
+            return blob_response(
+                request,
+                key=archived.segment.storage_key,
+                etag=etag,
+                media_type=media_type,
+                last_modified=receipt.uploaded_at,
+                filename=filename,
+                offset=archived.offset,
+                size=archived.length,
+            )
+        return bytes_response(
+            request,
+            data=receipt_archive.read(archived),
+            etag=etag,
+            media_type=media_type,
+            last_modified=receipt.uploaded_at,
+            filename=filename,
+        )
+
+    # Let the client fetch bytes straight from object storage when possible
+    if settings.STORAGE_PRESIGNED_DOWNLOADS:
+        url = storage_backend.presigned_url(
+            key,
+            filename=filename,
+            content_type=media_type,
+        )
+        if url:
+            return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    if not storage_backend.exists(key):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Receipt file not found on server",
         )
 
-    media_type = getattr(receipt, "file_type", None) or "application/octet-stream"
-    return FileResponse(
-        path=receipt.file_path,
+    return blob_response(
+        request,
+        key=key,
+        etag=etag,
         media_type=media_type,
-        filename=receipt.file_name,
+        last_modified=receipt.uploaded_at,
+        filename=filename,
+    )
+
+
+@router.get("/{receipt_id}/extraction")
+def get_receipt_extraction(
+    receipt_id: str,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """The model's full output for a receipt: fields, tokens, labels and text."""
+    try:
+        receipt_uuid = UUID(receipt_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid receipt id",
+        )
+
+    receipt = (
+        db.query(Receipt)
+        .filter(Receipt.id == receipt_uuid, Receipt.user_id == current_user.id)
+        .first()
     )
+    if not receipt:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Receipt not found",
+        )
+
+    extraction = load_extraction(db, receipt)
+    if extraction is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Receipt has no extraction",
+        )
+    return extraction
 
 
 @router.delete("/{receipt_id}")
@@ -340,21 +518,41 @@ def delete_receipt(
             detail="Receipt not found",
         )
 
-    # Delete file from disk (ignore errors if already gone)
-    if receipt.file_path and os.path.exists(receipt.file_path):
+    content_hash = receipt.content_hash
+    original_hash = receipt.original_content_hash
+    legacy_path = receipt.file_path if not content_hash else None
+
+    last_reference = False
+    if content_hash:
+        last_reference = blob_store.release_reference(db, content_hash)
+        if last_reference:
+            receipt_archive.forget(db, content_hash)
+    last_original_reference = False
+    if original_hash:
+        last_original_reference = cold_store.release_reference(db, original_hash)
+
+    KYCScorer(db).apply_receipt_change(
+        str(current_user.id), before=ReceiptContribution.of(receipt)
+    )
+    db.delete(receipt)
+    db.commit()
+
+    # Only remove the blob once no other receipt shares it
+    if last_reference and blob_store.remove_if_unreferenced(db, content_hash):
+        remove_derivatives(content_hash)
+    if last_original_reference:
+        cold_store.remove_if_unreferenced(db, original_hash)
+    elif legacy_path and os.path.exists(legacy_path):
+        # Pre-migration receipts still live in the old flat layout
         try:
-            os.remove(receipt.file_path)
+            os.remove(legacy_path)
         except OSError:
             pass
 
-    db.delete(receipt)
-    db.commit()
-
     # Recalculate KYC score after deletion
     try:
         scorer = KYCScorer(db)
         scorer.calculate_user_score(str(current_user.id))
-        db.commit()
     except Exception as e:
         logger.exception("Error recalculating KYC score after delete: %s", e)
 
@@ -432,6 +630,5 @@ def debug_model_status():
         "model_path_exists": os.path.exists(settings.MODEL_PATH),
         "model_device": settings.MODEL_DEVICE,
         "ml_service_loaded": ml_service._loaded,
-        "upload_dir": UPLOAD_DIR,
-        "upload_dir_exists": os.path.exists(UPLOAD_DIR),
+        "storage_backend": settings.STORAGE_BACKEND,
     }
\ No newline at end of file
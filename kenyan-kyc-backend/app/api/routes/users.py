@@ -2,16 +2,46 @@
 User Management API Routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import case, func, select
 from app.core.database import get_db
-from app.models.models import User, Receipt, VerificationScore
-from app.schemas.schemas import UserResponse, UserUpdate, UserDashboard, ReceiptResponse
-from app.api.dependencies import get_current_user
+from app.models.models import Merchant, User, Receipt, VerificationScore
+from app.schemas.schemas import (
+    UserResponse, UserUpdate, UserDashboard, UserBootstrap, ReceiptResponse
+)
+from app.api.dependencies import get_async_read_db, get_current_user, get_read_db
+from app.api.routes.verification import breakdown_payload
+from app.services.gazetteer import gazetteer
+from app.services.kyc_scoring import SCORING_COLUMNS, is_scored_receipt, partition_receipts
+from app.services.principal_cache import invalidate_on_commit
+from app.services.response_cache import response_cache
+from app.utils.http_files import versioned_json_response
+from app.utils.pagination import page_rows
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+# The bootstrap's receipts page is GET /receipts' default first page
+BOOTSTRAP_PAGE_SIZE = 50
+
+# Receipt columns the bootstrap loads: the listing's plus the breakdown's
+_BOOTSTRAP_COLUMNS = [
+    getattr(Receipt, name) for name in ReceiptResponse.model_fields if name in Receipt.__table__.c
+]
+_BOOTSTRAP_COLUMNS += [c for c in SCORING_COLUMNS if c.key not in ReceiptResponse.model_fields]
+
+
+def _locality_names(locality_id: int) -> dict:
+    locality = gazetteer.get(locality_id)
+    county = gazetteer.county_of(locality_id)
+    return {
+        "locality_id": locality_id,
+        "locality": locality.name if locality else None,
+        "kind": locality.kind if locality else None,
+        "county": county.name if county else None,
+    }
+
 
 @router.get("/profile", response_model=UserResponse)
 def get_profile(current_user: User = Depends(get_current_user)):
@@ -27,6 +57,9 @@ def update_profile(
 ):
     """Update current user's profile"""
     
+    # get_current_user returns a detached user
+    db.add(current_user)
+    
     if updates.full_name is not None:
         current_user.full_name = updates.full_name
     
@@ -36,6 +69,7 @@ def update_profile(
     if updates.national_id is not None:
         current_user.national_id = updates.national_id
     
+    invalidate_on_commit(db, current_user.id)
     db.commit()
     db.refresh(current_user)
     
@@ -43,52 +77,41 @@ def update_profile(
 
 
 @router.get("/dashboard", response_model=UserDashboard)
-def get_dashboard(
+async def get_dashboard(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get user's complete dashboard data"""
     
     # Get verification score
     verification_score = (
-        db.query(VerificationScore)
-        .filter(VerificationScore.user_id == current_user.id)
-        .first()
-    )
+        await db.execute(
+            select(VerificationScore)
+            .where(VerificationScore.user_id == current_user.id)
+        )
+    ).scalars().first()
     
     # Get recent receipts (last 10)
     recent_receipts = (
-        db.query(Receipt)
-        .filter(Receipt.user_id == current_user.id)
-        .order_by(Receipt.uploaded_at.desc())
-        .limit(10)
-        .all()
-    )
-    
-    # Get receipt counts
-    total_receipts = (
-        db.query(func.count(Receipt.id))
-        .filter(Receipt.user_id == current_user.id)
-        .scalar()
-    )
-    
-    processed_receipts = (
-        db.query(func.count(Receipt.id))
-        .filter(
-            Receipt.user_id == current_user.id,
-            Receipt.status == 'completed'
+        await db.execute(
+            select(Receipt)
+            .where(Receipt.user_id == current_user.id)
+            .order_by(Receipt.uploaded_at.desc())
+            .limit(10)
         )
-        .scalar()
-    )
+    ).scalars().all()
     
-    pending_receipts = (
-        db.query(func.count(Receipt.id))
-        .filter(
-            Receipt.user_id == current_user.id,
-            Receipt.status.in_(['pending', 'processing'])
+    # Get receipt counts (one scan of the user's receipts)
+    total_receipts, processed_receipts, pending_receipts = (
+        await db.execute(
+            select(
+                func.count(Receipt.id),
+                func.count(Receipt.id).filter(Receipt.status == 'completed'),
+                func.count(Receipt.id).filter(Receipt.status.in_(['pending', 'processing'])),
+            )
+            .where(Receipt.user_id == current_user.id)
         )
-        .scalar()
-    )
+    ).one()
     
     return {
         "user": current_user,
@@ -100,10 +123,91 @@ def get_dashboard(
     }
 
 
+@router.get("/bootstrap", response_model=UserBootstrap)
+async def get_bootstrap(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Everything the dashboard shows in one response: profile, score and
+    breakdown (as GET /verification/score and /breakdown), the first page
+    of GET /receipts and the receipt counts.
+    Cached per receipts_version and profile update; send If-None-Match to
+    get a 304 when unchanged.
+    """
+    # Profile edits and admin decisions touch updated_at, not receipts_version
+    updated_at = current_user.updated_at.isoformat() if current_user.updated_at else ""
+    version = f"{current_user.receipts_version}.{updated_at}"
+
+    async def build() -> bytes:
+        return await _build_bootstrap(db, current_user)
+
+    return await versioned_json_response(
+        request,
+        etag=response_cache.etag("bootstrap", current_user.id, version),
+        get_body=lambda: response_cache.get_or_build_async(
+            "bootstrap", current_user.id, version, build
+        ),
+    )
+
+
+async def _build_bootstrap(db: AsyncSession, user: User) -> bytes:
+    # Round trip 1: the score row and the receipt counts (one scan of the
+    # user's receipts); a user without a score gets a NULL score
+    counts = (
+        select(
+            func.count(Receipt.id).label("total"),
+            func.count(Receipt.id).filter(Receipt.status == 'completed').label("processed"),
+            func.count(Receipt.id).filter(Receipt.status.in_(['pending', 'processing'])).label("pending"),
+        )
+        .where(Receipt.user_id == user.id)
+        .subquery()
+    )
+    score, total_receipts, processed_receipts, pending_receipts = (
+        await db.execute(
+            select(VerificationScore, counts.c.total, counts.c.processed, counts.c.pending)
+            .select_from(counts)
+            .outerjoin(VerificationScore, VerificationScore.user_id == user.id)
+        )
+    ).one()
+
+    # Round trip 2: every receipt, newest first. The head is the receipts
+    # page; the scored ones, oldest first, are what the breakdown partitions
+    receipts = (
+        await db.execute(
+            select(Receipt)
+            .options(load_only(*_BOOTSTRAP_COLUMNS))
+            .where(Receipt.user_id == user.id)
+            .order_by(Receipt.uploaded_at.desc(), Receipt.id.desc())
+        )
+    ).scalars().all()
+    page, next_cursor = page_rows(receipts, "uploaded_at", BOOTSTRAP_PAGE_SIZE)
+
+    breakdown = None
+    if score is not None:
+        scored = [r for r in reversed(receipts) if is_scored_receipt(r)]
+        breakdown = breakdown_payload(score, *partition_receipts(scored))
+
+    return UserBootstrap.model_validate(
+        {
+            "user": user,
+            "verification_score": score,
+            "breakdown": breakdown,
+            "receipts": page,
+            "next_cursor": next_cursor,
+            "total_receipts": total_receipts,
+            "processed_receipts": processed_receipts,
+            "pending_receipts": pending_receipts,
+        },
+        from_attributes=True,
+    ).model_dump_json().encode()
+
+
 @router.get("/stats")
 def get_user_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get user's statistical data for charts/graphs"""
     
@@ -115,10 +219,14 @@ def get_user_stats(
         .all()
     )
     
-    # Spending by company
-    spending_by_company = (
+    # Spending by merchant: grouped on the merchant id (receipts not resolved
+    # to a merchant yet fall back to their raw name); names are joined onto
+    # the top 10 only
+    unresolved_name = case((Receipt.merchant_id.is_(None), Receipt.company_name))
+    top_merchants = (
         db.query(
-            Receipt.company_name,
+            Receipt.merchant_id,
+            unresolved_name.label('unresolved_name'),
             func.count(Receipt.id).label('receipt_count'),
             func.sum(Receipt.total_amount).label('total_spent')
         )
@@ -127,7 +235,36 @@ def get_user_stats(
             Receipt.status == 'completed',
             Receipt.company_name.isnot(None)
         )
-        .group_by(Receipt.company_name)
+        .group_by(Receipt.merchant_id, unresolved_name)
+        .order_by(func.sum(Receipt.total_amount).desc())
+        .limit(10)
+        .subquery()
+    )
+    spending_by_company = (
+        db.query(
+            func.coalesce(Merchant.name, top_merchants.c.unresolved_name),
+            top_merchants.c.receipt_count,
+            top_merchants.c.total_spent
+        )
+        .outerjoin(Merchant, Merchant.id == top_merchants.c.merchant_id)
+        .order_by(top_merchants.c.total_spent.desc())
+        .all()
+    )
+
+    # Spending by locality: an integer group-by; names come from the
+    # in-process gazetteer, so nothing is joined
+    spending_by_locality = (
+        db.query(
+            Receipt.locality_id,
+            func.count(Receipt.id),
+            func.sum(Receipt.total_amount)
+        )
+        .filter(
+            Receipt.user_id == current_user.id,
+            Receipt.status == 'completed',
+            Receipt.locality_id.isnot(None)
+        )
+        .group_by(Receipt.locality_id)
         .order_by(func.sum(Receipt.total_amount).desc())
         .limit(10)
         .all()
@@ -142,5 +279,13 @@ def get_user_stats(
                 "total_spent": float(total)
             }
             for company, count, total in spending_by_company
+        ],
+        "spending_by_locality": [
+            {
+                **_locality_names(locality_id),
+                "receipt_count": count,
+                "total_spent": float(total or 0)
+            }
+            for locality_id, count, total in spending_by_locality
         ]
     }
@@ -2,41 +2,72 @@
 Verification/KYC Score API Routes
 """
 
+import json
 from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.config import settings
 from app.models.models import User, VerificationScore, Receipt
 from app.schemas.schemas import VerificationScoreResponse, MessageResponse
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_async_read_db, get_current_user, get_read_db
 from app.services.kyc_scoring import KYCScorer
+from app.services.response_cache import response_cache
+from app.utils.http_files import versioned_json_response
 
 router = APIRouter(prefix="/verification", tags=["Verification"])
 
 
-@router.get("/score", response_model=VerificationScoreResponse)
-def get_verification_score(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
-    """Get current user's KYC verification score."""
+def _find_score(
+    db: Session,
+    user_id,
+    detail: str = "No verification score found. Upload receipts to get scored.",
+) -> VerificationScore:
     score = (
         db.query(VerificationScore)
-        .filter(VerificationScore.user_id == current_user.id)
+        .filter(VerificationScore.user_id == user_id)
         .first()
     )
-
     if not score:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="No verification score found. Upload receipts to get scored.",
+            detail=detail,
         )
-
     return score
 
 
+def _json_bytes(content) -> bytes:
+    return json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+
+
+@router.get("/score", response_model=VerificationScoreResponse)
+async def get_verification_score(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Get current user's KYC verification score.
+    Cached per receipts_version; send If-None-Match to get a 304 when unchanged.
+    """
+
+    async def build() -> bytes:
+        score = await db.run_sync(_find_score, current_user.id)
+        return VerificationScoreResponse.model_validate(score).model_dump_json().encode()
+
+    return await versioned_json_response(
+        request,
+        etag=response_cache.etag("score", current_user.id, current_user.receipts_version),
+        get_body=lambda: response_cache.get_or_build_async(
+            "score", current_user.id, current_user.receipts_version, build
+        ),
+    )
+
+
 @router.post("/calculate", response_model=VerificationScoreResponse)
 def calculate_verification_score(
     current_user: User = Depends(get_current_user),
@@ -51,11 +82,11 @@ def calculate_verification_score(
 @router.get("/history")
 def get_score_history(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Get historical KYC score changes (if you decide to keep this table)."""
     history = db.execute(
-        """
+        text("""
         SELECT 
             final_score,
             total_receipts_at_time,
@@ -63,7 +94,7 @@ def get_score_history(
         FROM verification_history
         WHERE user_id = :user_id
         ORDER BY recorded_at ASC
-        """,
+        """),
         {"user_id": str(current_user.id)},
     ).fetchall()
 
@@ -78,24 +109,41 @@ def get_score_history(
 
 
 @router.get("/breakdown")
-def get_score_breakdown(
+async def get_score_breakdown(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """
     Get detailed breakdown of KYC score calculation + which receipts were used/ignored.
+    Cached per receipts_version; send If-None-Match to get a 304 when unchanged.
     """
-    score = (
-        db.query(VerificationScore)
-        .filter(VerificationScore.user_id == current_user.id)
-        .first()
+
+    async def build() -> bytes:
+        # The breakdown shares KYCScorer's (sync) partitioning; run_sync
+        # drives it over the async connection
+        return _json_bytes(await db.run_sync(_build_breakdown, current_user.id))
+
+    return await versioned_json_response(
+        request,
+        etag=response_cache.etag("breakdown", current_user.id, current_user.receipts_version),
+        get_body=lambda: response_cache.get_or_build_async(
+            "breakdown", current_user.id, current_user.receipts_version, build
+        ),
     )
 
-    if not score:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No verification score found",
-        )
+
+def _build_breakdown(db: Session, user_id) -> dict:
+    score = _find_score(db, user_id, detail="No verification score found")
+
+    # Partition receipts using the same logic as scoring
+    scorer = KYCScorer(db)
+    trusted, dropped = scorer.partition_receipts_for_user(str(user_id))
+    return breakdown_payload(score, trusted, dropped)
+
+
+def breakdown_payload(score: VerificationScore, trusted, dropped) -> dict:
+    """The /breakdown body for a score and its partitioned receipts (oldest first)."""
 
     # Use the same weights as in KYCScorer
     w_doc = Decimal(str(settings.WEIGHT_DOCUMENT_QUALITY))
@@ -109,10 +157,6 @@ def get_score_breakdown(
     consistency_contribution = Decimal(score.consistency_score) * w_cons
     diversity_contribution = Decimal(score.diversity_score) * w_div
 
-    # Partition receipts using the same logic as scoring
-    scorer = KYCScorer(db)
-    trusted, dropped = scorer.partition_receipts_for_user(str(current_user.id))
-
     receipts_used = [
         {
             "id": str(r.id),
@@ -255,32 +299,38 @@ def get_score_breakdown_debug(
 
 @router.get("/debug/all-scores")
 def debug_all_scores(db: Session = Depends(get_db)):
-    """Show all users and their verification scores"""
-    from app.models.models import User, VerificationScore, Receipt
-    
-    users = db.query(User).all()
+    """
+    Show all users and their verification scores.
+    One joined query; GET /admin/exports/scores streams the same for any number of users.
+    """
+    rows = db.execute(
+        select(
+            User.id,
+            User.email,
+            VerificationScore.final_score,
+            func.count(Receipt.id),
+            func.count(Receipt.id).filter(Receipt.status == "failed"),
+            func.count(Receipt.id).filter(Receipt.status == "completed"),
+        )
+        .outerjoin(VerificationScore, VerificationScore.user_id == User.id)
+        .outerjoin(Receipt, Receipt.user_id == User.id)
+        .group_by(User.id, VerificationScore.id)
+    ).all()
     
-    result = []
-    for user in users:
-        score = db.query(VerificationScore).filter(
-            VerificationScore.user_id == user.id
-        ).first()
-        
-        receipts = db.query(Receipt).filter(
-            Receipt.user_id == user.id
-        ).all()
-        
-        result.append({
-            "user_id": str(user.id),
-            "email": user.email,
-            "has_score": score is not None,
-            "score_value": float(score.final_score) if score else None,
-            "total_receipts": len(receipts),
-            "failed_receipts": len([r for r in receipts if r.status == "failed"]),
-            "completed_receipts": len([r for r in receipts if r.status == "completed"]),
-        })
+    result = [
+        {
+            "user_id": str(user_id),
+            "email": email,
+            "has_score": final_score is not None,
+            "score_value": float(final_score) if final_score is not None else None,
+            "total_receipts": total,
+            "failed_receipts": failed,
+            "completed_receipts": completed,
+        }
+        for user_id, email, final_score, total, failed, completed in rows
+    ]
     
     return {
-        "total_users": len(users),
+        "total_users": len(result),
         "users": result
     }
\ No newline at end of file
@@ -28,6 +28,18 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(
         os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
     )
+    # Rotated on every POST /auth/refresh; reusing a spent one revokes the
+    # whole chain
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+
+    # ---------------------------------------------------------
+    # Password hashing (login / register)
+    # - bcrypt runs on PASSWORD_HASH_WORKERS dedicated threads, not the
+    #   request threadpool; PASSWORD_HASH_MAX_QUEUE more may wait and
+    #   further logins get 503 with Retry-After
+    # ---------------------------------------------------------
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "16"))
 
     # ---------------------------------------------------------
     # File uploads
@@ -38,6 +50,142 @@ class Settings(BaseSettings):
         "ALLOWED_EXTENSIONS", "jpg,jpeg,png,pdf"
     )
 
+    @property
+    def allowed_extensions_list(self) -> List[str]:
+        return [e.strip().lower() for e in self.ALLOWED_EXTENSIONS.split(",") if e.strip()]
+
+    # ---------------------------------------------------------
+    # Receipt storage backend
+    # - local: files under UPLOAD_DIR (single instance)
+    # - s3: any S3-compatible API (AWS S3, MinIO, ...) shared by all nodes
+    # ---------------------------------------------------------
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "kyc-receipts")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")  # e.g. http://localhost:9000 for MinIO
+    S3_REGION: str = os.getenv("S3_REGION", "us-east-1")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    # Redirect file downloads to presigned URLs so bytes bypass the API
+    STORAGE_PRESIGNED_DOWNLOADS: bool = os.getenv("STORAGE_PRESIGNED_DOWNLOADS", "true").lower() == "true"
+    S3_PRESIGN_EXPIRES_SECONDS: int = int(os.getenv("S3_PRESIGN_EXPIRES_SECONDS", "300"))
+
+    # ---------------------------------------------------------
+    # Upload normalization
+    # - rewrite image uploads as a canonical, compressed copy
+    #   (orientation fixed, metadata stripped, capped resolution)
+    # - ORIGINAL_RETENTION: "cold" keeps the raw upload in the cold tier,
+    #   "drop" discards it once the canonical copy is stored
+    # ---------------------------------------------------------
+    NORMALIZE_UPLOADS: bool = os.getenv("NORMALIZE_UPLOADS", "false").lower() == "true"
+    NORMALIZE_MAX_DIMENSION: int = int(os.getenv("NORMALIZE_MAX_DIMENSION", "2400"))
+    NORMALIZE_FORMAT: str = os.getenv("NORMALIZE_FORMAT", "webp")  # webp | jpeg
+    NORMALIZE_QUALITY: int = int(os.getenv("NORMALIZE_QUALITY", "82"))
+    ORIGINAL_RETENTION: str = os.getenv("ORIGINAL_RETENTION", "cold")
+
+    # ---------------------------------------------------------
+    # Archival of processed receipt files
+    # - completed receipts older than ARCHIVE_AFTER_DAYS are packed into
+    #   append-only segments of up to ARCHIVE_SEGMENT_MAX_BYTES
+    # ---------------------------------------------------------
+    ARCHIVE_AFTER_DAYS: int = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+    ARCHIVE_SEGMENT_MAX_BYTES: int = int(os.getenv("ARCHIVE_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # ---------------------------------------------------------
+    # Bulk rescoring (python -m app.scripts.rescore_all)
+    # - receipts are streamed in chunks of about RESCORE_CHUNK_ROWS rows
+    # ---------------------------------------------------------
+    RESCORE_CHUNK_ROWS: int = int(os.getenv("RESCORE_CHUNK_ROWS", "100000"))
+    # In-memory receipt snapshot behind the admin calibration sweep
+    SCORING_SNAPSHOT_TTL_SECONDS: int = int(os.getenv("SCORING_SNAPSHOT_TTL_SECONDS", "900"))
+
+    # ---------------------------------------------------------
+    # Cached score reads (/verification/score, /verification/breakdown)
+    # - memory: per-process LRU only
+    # - redis: per-process LRU in front of a Redis shared by all nodes
+    # Entries are keyed by the user's receipts_version, so they never go
+    # stale; the TTL only bounds how long unused entries occupy Redis
+    # ---------------------------------------------------------
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_REDIS_URL: str = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+    RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+
+    # ---------------------------------------------------------
+    # Admin statistics rollups (GET /admin/statistics)
+    # - served from platform_stats; a read older than
+    #   ADMIN_STATS_MAX_AGE_SECONDS is answered as is and refreshes the
+    #   rollup in the background; past ADMIN_STATS_STALE_SECONDS more the
+    #   read waits for the refresh instead
+    # - each refresh recomputes the last ADMIN_STATS_DAILY_WINDOW_DAYS days
+    #   of the daily series (python -m app.scripts.refresh_admin_stats --full
+    #   recomputes every day)
+    # ---------------------------------------------------------
+    ADMIN_STATS_MAX_AGE_SECONDS: int = int(os.getenv("ADMIN_STATS_MAX_AGE_SECONDS", "60"))
+    ADMIN_STATS_STALE_SECONDS: int = int(os.getenv("ADMIN_STATS_STALE_SECONDS", "3600"))
+    ADMIN_STATS_DAILY_WINDOW_DAYS: int = int(os.getenv("ADMIN_STATS_DAILY_WINDOW_DAYS", "7"))
+
+    # ---------------------------------------------------------
+    # Admin exports (GET /admin/exports/{dataset})
+    # - rows are fetched from a server-side cursor EXPORT_BATCH_ROWS at a
+    #   time and each batch is encoded and sent before the next is read
+    # ---------------------------------------------------------
+    EXPORT_BATCH_ROWS: int = int(os.getenv("EXPORT_BATCH_ROWS", "2000"))
+
+    # ---------------------------------------------------------
+    # Principal cache (get_current_user)
+    # - active users are cached per process for up to
+    #   PRINCIPAL_CACHE_TTL_SECONDS (0 disables the cache)
+    # - PRINCIPAL_CACHE_LISTEN: serve only while the LISTEN connection for
+    #   other workers' invalidations is up (needs
+    #   migrations/012_principal_invalidation.sql); turn off only for a
+    #   single worker
+    # ---------------------------------------------------------
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+    PRINCIPAL_CACHE_LISTEN: bool = os.getenv("PRINCIPAL_CACHE_LISTEN", "true").lower() == "true"
+
+    # ---------------------------------------------------------
+    # Access token revocation (POST /auth/logout)
+    # - revoked jtis live in revoked_tokens; every worker keeps a Bloom
+    #   filter of them, so a token that is not in it skips the database
+    # - sized for TOKEN_REVOCATION_CAPACITY entries at
+    #   TOKEN_REVOCATION_ERROR_RATE false positives (each one costs a
+    #   lookup); rebuilt every TOKEN_REVOCATION_REBUILD_SECONDS to drop
+    #   expired tokens, or sooner once it outgrows its capacity
+    # ---------------------------------------------------------
+    TOKEN_REVOCATION_CAPACITY: int = int(os.getenv("TOKEN_REVOCATION_CAPACITY", "100000"))
+    TOKEN_REVOCATION_ERROR_RATE: float = float(os.getenv("TOKEN_REVOCATION_ERROR_RATE", "0.001"))
+    TOKEN_REVOCATION_REBUILD_SECONDS: int = int(
+        os.getenv("TOKEN_REVOCATION_REBUILD_SECONDS", "900")
+    )
+
+    # ---------------------------------------------------------
+    # Metrics (GET /metrics, Prometheus text format, per worker)
+    # - pool checkout waits, statement latency by normalized statement
+    #   (at most METRICS_MAX_STATEMENTS of them) and statements per route
+    # - statements slower than SLOW_QUERY_MS are logged on app.sql.slow
+    #   with parameter values redacted
+    # - METRICS_TOKEN, if set, must be sent as a bearer token
+    # ---------------------------------------------------------
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    METRICS_MAX_STATEMENTS: int = int(os.getenv("METRICS_MAX_STATEMENTS", "500"))
+    SLOW_QUERY_MS: int = int(os.getenv("SLOW_QUERY_MS", "200"))
+
+    # ---------------------------------------------------------
+    # Read replicas (see app.core.replicas)
+    # - DATABASE_REPLICA_URLS: comma-separated streaming replicas of
+    #   DATABASE_URL; empty sends every read to the primary
+    # - a replica serves reads while it is reachable and replaying within
+    #   REPLICA_MAX_LAG_SECONDS, checked every REPLICA_CHECK_SECONDS
+    # - users whose row changed in the last REPLICA_STICKY_SECONDS read
+    #   from the primary
+    # ---------------------------------------------------------
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    REPLICA_CHECK_SECONDS: float = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+    REPLICA_STICKY_SECONDS: float = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+
     # ---------------------------------------------------------
     # API / project metadata
     # ---------------------------------------------------------
@@ -74,6 +222,20 @@ class Settings(BaseSettings):
 
     MIN_RECEIPT_CONFIDENCE: float = float(os.getenv("MIN_RECEIPT_CONFIDENCE", "0.95"))
     MAX_SINGLE_RECEIPT_KES: float = float(os.getenv("MAX_SINGLE_RECEIPT_KES", "200000.0"))
+    # Receipts whose amount scores above AMOUNT_OUTLIER_Z against the user's
+    # own history (robust z-score, 0 disables) are dropped; users need
+    # AMOUNT_OUTLIER_MIN_HISTORY trusted receipts before any is scored
+    AMOUNT_OUTLIER_Z: float = float(os.getenv("AMOUNT_OUTLIER_Z", "3.5"))
+    AMOUNT_OUTLIER_MIN_HISTORY: int = int(os.getenv("AMOUNT_OUTLIER_MIN_HISTORY", "10"))
+
+    # ---------------------------------------------------------
+    # Merchant canonicalization
+    # - MERCHANT_MATCHER: pg_trgm (trigram index in Postgres), memory
+    #   (in-process trigram index) or auto (pg_trgm when installed)
+    # - names at least this similar to a known merchant resolve to it
+    # ---------------------------------------------------------
+    MERCHANT_MATCHER: str = os.getenv("MERCHANT_MATCHER", "auto")
+    MERCHANT_SIMILARITY_THRESHOLD: float = float(os.getenv("MERCHANT_SIMILARITY_THRESHOLD", "0.5"))
 
     # ---------------------------------------------------------
     # ML model config
@@ -3,13 +3,16 @@ Database Connection and Session Management
 """
 
 import os
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.core.config import settings
+from app.core.metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument_engine
 
 
 def _normalize_db_url(url: str) -> str:
@@ -28,25 +31,89 @@ DATABASE_URL = _normalize_db_url(settings.DATABASE_URL)
 # You can set DB_SSL=require in Render env vars, or include sslmode in DATABASE_URL.
 DB_SSL = os.getenv("DB_SSL", "").lower()  # e.g., "require"
 
-connect_args = {}
-if DB_SSL == "require" and "sslmode=" not in DATABASE_URL:
-    connect_args["sslmode"] = "require"
-
 # Pool settings can be overridden by env vars in prod
 POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
 MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
 POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", str(POOL_SIZE)))
+ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", str(MAX_OVERFLOW)))
 
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=POOL_SIZE,
-    max_overflow=MAX_OVERFLOW,
-    pool_pre_ping=True,
-    pool_recycle=POOL_RECYCLE,
-    echo=settings.DEBUG,
-    connect_args=connect_args,
-)
+
+def _connect_args(url: str) -> dict:
+    if DB_SSL == "require" and "sslmode=" not in url:
+        return {"sslmode": "require"}
+    return {}
+
+
+def _async_db_url(url: str) -> tuple[URL, dict]:
+    """
+    The asyncpg form of a libpq-style URL. asyncpg takes sslmode as its
+    ``ssl`` argument rather than a query parameter.
+    """
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    ssl = url.query.get("sslmode") or (DB_SSL or None)
+    url = url.difference_update_query(["sslmode"])
+    return url, ({"ssl": ssl} if ssl else {})
+
+
+def create_sync_engine(
+    url: str,
+    pool_label: str = "sync",
+    pool_size: int = POOL_SIZE,
+    max_overflow: int = MAX_OVERFLOW,
+    connect_args: Optional[dict] = None,
+) -> Engine:
+    """A psycopg2 engine for ``url``; its pool shows in /metrics as ``pool_label``."""
+    url = _normalize_db_url(url)
+    sync_engine = create_engine(
+        url,
+        poolclass=InstrumentedQueuePool if settings.METRICS_ENABLED else QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=POOL_RECYCLE,
+        echo=settings.DEBUG,
+        connect_args={**_connect_args(url), **(connect_args or {})},
+    )
+    if settings.METRICS_ENABLED:
+        instrument_engine(sync_engine, max_overflow, pool_label)
+    return sync_engine
+
+
+def create_engines(
+    url: str,
+    pool_label: str = "",
+    connect_args: Optional[dict] = None,
+    async_connect_args: Optional[dict] = None,
+) -> tuple[Engine, AsyncEngine]:
+    """
+    A sync (psycopg2) and an async (asyncpg) engine for the server at
+    ``url``, pooled alike. Their pools show in /metrics as
+    ``<pool_label>sync`` and ``<pool_label>async``.
+    """
+    url = _normalize_db_url(url)
+    async_url, ssl_args = _async_db_url(url)
+    sync_engine = create_sync_engine(url, f"{pool_label}sync", connect_args=connect_args)
+    # Read-heavy routes run on an asyncpg pool of their own, so a request
+    # waiting on Postgres does not hold one of Starlette's threadpool threads
+    async_engine = create_async_engine(
+        async_url,
+        poolclass=InstrumentedAsyncQueuePool if settings.METRICS_ENABLED else AsyncAdaptedQueuePool,
+        pool_size=ASYNC_POOL_SIZE,
+        max_overflow=ASYNC_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=POOL_RECYCLE,
+        echo=settings.DEBUG,
+        connect_args={**ssl_args, **(async_connect_args or {})},
+    )
+    if settings.METRICS_ENABLED:
+        instrument_engine(async_engine.sync_engine, ASYNC_MAX_OVERFLOW, f"{pool_label}async")
+    return sync_engine, async_engine
+
+
+engine, async_engine = create_engines(DATABASE_URL)
+# For connections outside the pools (LISTEN)
+ASYNC_DATABASE_URL, async_connect_args = _async_db_url(DATABASE_URL)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -54,6 +121,14 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Objects stay readable after commit: lazy loads cannot happen implicitly
+# under asyncio
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 
@@ -68,6 +143,14 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function to get an async database session.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def check_db_connection() -> bool:
     """Check if database connection is working"""
     try:
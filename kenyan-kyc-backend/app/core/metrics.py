@@ -0,0 +1,381 @@
+"""
+Connection pool, query and per-route metrics, served at GET /metrics
+
+Both engines in app/core/database.py are instrumented:
+
+- pools: how long each checkout waited for a connection (opening a new
+  one included), checkouts that hit the pool timeout, and - read at
+  scrape time - connections checked out, idle and in overflow
+- statements: a latency histogram per normalized statement (literals,
+  placeholders and IN / VALUES lists collapsed, so ``id IN ($1, $2)`` and
+  ``id IN ($1, $2, $3)`` count as one), at most METRICS_MAX_STATEMENTS of
+  them; slower than SLOW_QUERY_MS is also logged on ``app.sql.slow``
+  with parameter values replaced by their types
+- routes: requests, statements and time in the database per route
+  template, plus a histogram of statements per request
+
+The numbers are this worker's, as with GET /admin/caches. The output is
+the Prometheus text format.
+"""
+
+import bisect
+import hashlib
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Statements past the METRICS_MAX_STATEMENTS distinct ones share this key
+OTHER_STATEMENTS = "other"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# -------------------------------------------------
+# Statement normalization and parameter redaction
+# -------------------------------------------------
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_CAST_RE = re.compile(r"\?::[\w\[\]]+")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_REPEATED_GROUP_RE = re.compile(r"(\([^()]*\))(?:\s*,\s*\1)+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize_statement(statement: str) -> str:
+    """The statement with its values gone, so one query shape is one key."""
+    sql = _WHITESPACE_RE.sub(" ", statement).strip()
+    sql = _STRING_RE.sub("?", sql)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _CAST_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    return _REPEATED_GROUP_RE.sub(r"\1, ...", sql)
+
+
+def _shape(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, (str, bytes, list, tuple)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters, executemany: bool = False):
+    """Bound parameters with every value replaced by its type (and length)."""
+    if executemany:
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return {key: _shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_shape(value) for value in parameters]
+    return _shape(parameters)
+
+
+# -------------------------------------------------
+# Registry
+# -------------------------------------------------
+class RequestStats:
+    """Statements run on behalf of the current request."""
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class _RouteStats:
+    __slots__ = ("requests", "queries", "query_seconds", "latency", "queries_per_request")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries_per_request = Histogram(QUERIES_PER_REQUEST_BUCKETS)
+
+
+class Metrics:
+    def __init__(self, max_statements: int, slow_query_seconds: float):
+        self.max_statements = max_statements
+        self.slow_query_seconds = slow_query_seconds
+        self._lock = threading.Lock()
+        self._pools: dict = {}
+        self._checkout_wait: dict = {}
+        self._checkout_timeouts: dict = {}
+        self._statements: dict = {}
+        self._slow_statements = 0
+        self._routes: dict = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            for label in self._checkout_wait:
+                self._checkout_wait[label] = Histogram(LATENCY_BUCKETS)
+                self._checkout_timeouts[label] = 0
+            self._statements.clear()
+            self._slow_statements = 0
+            self._routes.clear()
+
+    # Pools -------------------------------------------------------
+    def register_pool(self, label: str, engine: Engine, max_overflow: int) -> None:
+        with self._lock:
+            self._pools[label] = (engine, max_overflow)
+            self._checkout_wait[label] = Histogram(LATENCY_BUCKETS)
+            self._checkout_timeouts[label] = 0
+
+    def observe_checkout(self, label: str, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            self._checkout_wait[label].observe(seconds)
+            if timed_out:
+                self._checkout_timeouts[label] += 1
+
+    # Statements --------------------------------------------------
+    def observe_statement(self, statement: str, seconds: float) -> None:
+        key = normalize_statement(statement)
+        with self._lock:
+            histogram = self._statements.get(key)
+            if histogram is None:
+                if len(self._statements) >= self.max_statements:
+                    key = OTHER_STATEMENTS
+                    histogram = self._statements.get(key)
+                if histogram is None:
+                    histogram = self._statements[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+            if seconds >= self.slow_query_seconds:
+                self._slow_statements += 1
+        request = _current_request.get()
+        if request is not None:
+            request.queries += 1
+            request.seconds += seconds
+
+    # Routes ------------------------------------------------------
+    def observe_request(self, method: str, route: str, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            route_stats = self._routes.get((method, route))
+            if route_stats is None:
+                route_stats = self._routes[(method, route)] = _RouteStats()
+            route_stats.requests += 1
+            route_stats.queries += stats.queries
+            route_stats.query_seconds += stats.seconds
+            route_stats.latency.observe(seconds)
+            route_stats.queries_per_request.observe(stats.queries)
+
+    # Exposition --------------------------------------------------
+    def render(self) -> str:
+        out = []
+
+        def header(name, kind, text):
+            out.append(f"# HELP {name} {text}")
+            out.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, labels, hist):
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                out.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            out.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+            out.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+            out.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        with self._lock:
+            pools = {
+                label: (engine.pool, max_overflow) for label, (engine, max_overflow) in self._pools.items()
+            }
+            gauges = [
+                ("kyc_db_pool_size", "Connections the pool keeps open", lambda p, m: p.size()),
+                ("kyc_db_pool_max_overflow", "Connections allowed past the pool size", lambda p, m: m),
+                ("kyc_db_pool_checked_out", "Connections in use", lambda p, m: p.checkedout()),
+                ("kyc_db_pool_idle", "Open connections waiting in the pool", lambda p, m: p.checkedin()),
+                ("kyc_db_pool_overflow", "Connections open past the pool size", lambda p, m: max(p.overflow(), 0)),
+            ]
+            for name, text, read in gauges:
+                header(name, "gauge", text)
+                for label, (pool, max_overflow) in pools.items():
+                    out.append(f'{name}{{pool="{label}"}} {read(pool, max_overflow)}')
+
+            header(
+                "kyc_db_pool_checkout_seconds", "histogram",
+                "Time to get a connection from the pool, opening one included",
+            )
+            for label, hist in self._checkout_wait.items():
+                histogram("kyc_db_pool_checkout_seconds", f'pool="{label}"', hist)
+            header("kyc_db_pool_checkout_timeouts_total", "counter", "Checkouts that hit the pool timeout")
+            for label, count in self._checkout_timeouts.items():
+                out.append(f'kyc_db_pool_checkout_timeouts_total{{pool="{label}"}} {count}')
+
+            header("kyc_db_statement_seconds", "histogram", "Statement latency by normalized statement")
+            for sql, hist in self._statements.items():
+                histogram("kyc_db_statement_seconds", _statement_labels(sql), hist)
+            header(
+                "kyc_db_slow_statements_total", "counter",
+                f"Statements slower than {self.slow_query_seconds * 1000:g} ms",
+            )
+            out.append(f"kyc_db_slow_statements_total {self._slow_statements}")
+
+            # Each family's samples go together, as the text format requires
+            routes = [
+                (f'method="{method}",route="{_escape(route)}"', stats)
+                for (method, route), stats in sorted(self._routes.items())
+            ]
+            header("kyc_http_requests_total", "counter", "Requests by route template")
+            for labels, stats in routes:
+                out.append(f"kyc_http_requests_total{{{labels}}} {stats.requests}")
+            header("kyc_http_request_queries_total", "counter", "Statements run for requests by route")
+            for labels, stats in routes:
+                out.append(f"kyc_http_request_queries_total{{{labels}}} {stats.queries}")
+            header("kyc_http_request_query_seconds_total", "counter", "Time in statements by route")
+            for labels, stats in routes:
+                out.append(f"kyc_http_request_query_seconds_total{{{labels}}} {stats.query_seconds:.6f}")
+            header("kyc_http_request_seconds", "histogram", "Request latency by route template")
+            for labels, stats in routes:
+                histogram("kyc_http_request_seconds", labels, stats.latency)
+            header("kyc_http_request_queries", "histogram", "Statements per request by route")
+            for labels, stats in routes:
+                histogram("kyc_http_request_queries", labels, stats.queries_per_request)
+        return "\n".join(out) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _statement_labels(sql: str) -> str:
+    # The id tells apart statements whose shortened text is the same
+    digest = hashlib.blake2b(sql.encode(), digest_size=6).hexdigest()
+    return f'id="{digest}",statement="{_escape(sql[:300])}"'
+
+
+metrics = Metrics(
+    max_statements=settings.METRICS_MAX_STATEMENTS,
+    slow_query_seconds=settings.SLOW_QUERY_MS / 1000,
+)
+
+
+# -------------------------------------------------
+# Hooks
+# -------------------------------------------------
+class _TimedCheckout:
+    metrics_label = "sync"
+
+    def connect(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            metrics.observe_checkout(self.metrics_label, time.perf_counter() - started, timed_out)
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep its label
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool that records how long each checkout waits."""
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waits."""
+    metrics_label = "async"
+
+
+# Pools log as <module>.<class>; keep these as quiet as sqlalchemy's own
+for _pool_class in (InstrumentedQueuePool, InstrumentedAsyncQueuePool):
+    logging.getLogger(f"{__name__}.{_pool_class.__name__}").setLevel(logging.WARNING)
+
+
+_STARTED = "metrics_statement_started"
+
+
+def instrument_engine(engine: Engine, max_overflow: int, label: Optional[str] = None) -> None:
+    """
+    Record this (sync or async-backing) engine's pool and statements; the
+    pool is reported as ``label`` if given, else by its class's label.
+    """
+    if label is not None:
+        engine.pool.metrics_label = label
+    metrics.register_pool(engine.pool.metrics_label, engine, max_overflow)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_STARTED, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info[_STARTED].pop()
+        metrics.observe_statement(statement, elapsed)
+        if elapsed >= metrics.slow_query_seconds:
+            slow_query_logger.warning(
+                "Slow query (%.0f ms): %s params=%s",
+                elapsed * 1000, statement[:2000], redact_parameters(parameters, executemany),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        started = context.connection.info.get(_STARTED) if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+class QueryMetricsMiddleware:
+    """Counts each request's statements against its route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_request.reset(token)
+            # Set by routing; unmatched paths share one label
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                time.perf_counter() - started,
+                stats,
+            )
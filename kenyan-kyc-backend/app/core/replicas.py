@@ -0,0 +1,303 @@
+"""
+Read replicas for read-only routes
+
+DATABASE_REPLICA_URLS lists streaming replicas of DATABASE_URL. Read-only
+routes take their session from ``get_read_db`` / ``get_async_read_db``
+(app.api.dependencies), and ``ReplicaSet`` decides where it points:
+
+- users whose row changed in the last REPLICA_STICKY_SECONDS stay on the
+  primary. Every write the app makes for a user (receipts, scores,
+  profile edits, admin decisions, logins) touches their ``users`` row
+- otherwise replicas take turns, skipping any that failed their last
+  health check (unreachable, not streaming, or replaying more than
+  REPLICA_MAX_LAG_SECONDS behind) or a connection since
+- the session's first query reads the user's ``receipts_version`` and
+  ``updated_at`` on the replica, which also proves the connection. If
+  they are older than the ones the request authenticated with, the
+  request goes to the primary
+
+A replica applies each transaction whole and in commit order, so one that
+has the user's row at that version has everything written with it: a
+user never reads older data than their own last write, and a response
+cached under a ``receipts_version`` holds that version's data whichever
+server built it.
+
+Admin reads have no such check; they may trail the admin's own writes to
+other users by up to REPLICA_MAX_LAG_SECONDS. Routes that write, and
+everything when no replica is configured or healthy, use the primary.
+"""
+
+import asyncio
+import itertools
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, SessionLocal, async_engine, create_engines
+
+logger = logging.getLogger(__name__)
+
+# A dead replica costs a request at most this long before the health
+# check takes it out of rotation
+CONNECT_TIMEOUT_SECONDS = 2
+
+PRIMARY_SQL = text("SELECT LOCALTIMESTAMP, pg_current_wal_lsn()::text")
+
+# Replayed everything the primary had written when it was last asked
+# (without that answer: everything this replica has received)
+REPLICATION_SQL = text("""
+    SELECT pg_is_in_recovery(),
+           EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'),
+           COALESCE(
+               pg_last_wal_replay_lsn() >= CAST(CAST(:primary_lsn AS text) AS pg_lsn),
+               pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+           ),
+           EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+""")
+
+USER_VERSION_SQL = text("SELECT receipts_version, updated_at FROM users WHERE id = :id")
+
+
+def parse_replica_urls(value: str) -> List[str]:
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+def replication_lag(
+    in_recovery: bool,
+    streaming: bool,
+    replayed_all: Optional[bool],
+    replay_age: Optional[float],
+) -> Optional[float]:
+    """
+    Seconds a server's data is behind the primary, from REPLICATION_SQL;
+    None if it is not following the primary. A replica that has replayed
+    all the primary's WAL is current, however long ago the last write was.
+    """
+    if not in_recovery:
+        # Promoted, or a primary listed by mistake: nothing reaches it
+        return None
+    if not streaming:
+        return None
+    if replayed_all or replay_age is None:
+        return 0.0
+    return max(0.0, float(replay_age))
+
+
+def caught_up(row, user) -> bool:
+    """Whether a replica's ``(receipts_version, updated_at)`` for ``user`` is as new as the request's."""
+    if row is None:
+        return False
+    receipts_version, updated_at = row
+    if receipts_version < user.receipts_version:
+        return False
+    return user.updated_at is None or (updated_at is not None and updated_at >= user.updated_at)
+
+
+class Replica:
+    """One replica's engines and its standing from the last health check."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = make_url(url).render_as_string(hide_password=True)
+        self.engine, self.async_engine = create_engines(
+            url,
+            pool_label=f"{name}-",
+            connect_args={"connect_timeout": CONNECT_TIMEOUT_SECONDS},
+            async_connect_args={"timeout": CONNECT_TIMEOUT_SECONDS},
+        )
+        self.Session = sessionmaker(autoflush=False, bind=self.engine)
+        self.AsyncSession = async_sessionmaker(
+            bind=self.async_engine, autoflush=False, expire_on_commit=False
+        )
+        # Out of rotation until its first check passes
+        self.healthy: Optional[bool] = None
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.reads = 0
+        self.behind = 0
+        self.failures = 0
+
+    def _set_health(self, healthy: bool, error: Optional[str]) -> None:
+        if healthy and not self.healthy:
+            logger.info("Read replica %s in rotation (lag %.1fs)", self.name, self.lag)
+        elif not healthy and self.healthy is not False:
+            logger.warning("Read replica %s out of rotation: %s", self.name, error)
+        self.healthy = healthy
+        self.error = error
+
+    def failed(self, error: Exception) -> None:
+        """A request could not use it: out of rotation until the next check passes."""
+        self.failures += 1
+        self._set_health(False, f"{type(error).__name__}: {error}")
+
+    async def check(self, max_lag_seconds: float, timeout: float, primary_lsn: Optional[str]) -> None:
+        async def query():
+            async with self.async_engine.connect() as conn:
+                return (await conn.execute(REPLICATION_SQL, {"primary_lsn": primary_lsn})).one()
+
+        try:
+            row = await asyncio.wait_for(query(), timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.lag = None
+            self._set_health(False, f"{type(e).__name__}: {e}")
+            return
+        self.lag = replication_lag(*row)
+        if self.lag is None:
+            self._set_health(False, "not streaming from the primary")
+        elif self.lag > max_lag_seconds:
+            self._set_health(False, f"{self.lag:.1f}s behind")
+        else:
+            self._set_health(True, None)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "healthy": self.healthy,
+            "lag_seconds": None if self.lag is None else round(self.lag, 3),
+            "error": self.error,
+            "reads": self.reads,
+            "behind": self.behind,
+            "failures": self.failures,
+        }
+
+
+class ReplicaSet:
+    """Routes read-only sessions to replicas (see the module docstring)."""
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        sticky_seconds: float,
+        max_lag_seconds: float,
+        check_seconds: float,
+    ):
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self._turn = itertools.count()
+        # The primary's LOCALTIMESTAMP (what users.updated_at is written
+        # in) minus this process's utcnow()
+        self.clock_offset = timedelta(0)
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def pick(self) -> Optional[Replica]:
+        """The next healthy replica in turn, or None."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def is_sticky(self, user, now: Optional[datetime] = None) -> bool:
+        """Whether ``user``'s row changed too recently for any replica to be trusted with it."""
+        if user.updated_at is None:
+            return False
+        now = now or datetime.utcnow() + self.clock_offset
+        return now - user.updated_at < timedelta(seconds=self.sticky_seconds)
+
+    def _route(self, user) -> Optional[Replica]:
+        if not self.replicas:
+            return None
+        if self.is_sticky(user):
+            self.sticky_reads += 1
+            return None
+        return self.pick()
+
+    def session(self, user) -> Session:
+        """A session for a read-only route acting for ``user``."""
+        replica = self._route(user)
+        if replica is not None:
+            db = replica.Session()
+            try:
+                if caught_up(db.execute(USER_VERSION_SQL, {"id": str(user.id)}).first(), user):
+                    replica.reads += 1
+                    return db
+                replica.behind += 1
+            except Exception as e:
+                replica.failed(e)
+            db.close()
+        self.primary_reads += 1
+        return SessionLocal()
+
+    async def async_session(self, user) -> AsyncSession:
+        """``session`` for async routes."""
+        replica = self._route(user)
+        if replica is not None:
+            db = replica.AsyncSession()
+            try:
+                row = (await db.execute(USER_VERSION_SQL, {"id": str(user.id)})).first()
+                if caught_up(row, user):
+                    replica.reads += 1
+                    return db
+                replica.behind += 1
+            except Exception as e:
+                replica.failed(e)
+            await db.close()
+        self.primary_reads += 1
+        return AsyncSessionLocal()
+
+    async def check(self) -> None:
+        """Health-check every replica against the primary's WAL position and clock."""
+        primary_lsn = None
+        try:
+            async with async_engine.connect() as conn:
+                primary_now, primary_lsn = (await conn.execute(PRIMARY_SQL)).one()
+            self.clock_offset = primary_now - datetime.utcnow()
+        except Exception as e:
+            logger.warning("Could not read the primary's WAL position: %s", e)
+        await asyncio.gather(
+            *(
+                replica.check(self.max_lag_seconds, self.check_seconds, primary_lsn)
+                for replica in self.replicas
+            )
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_seconds)
+
+    async def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            # asyncpg connections belong to this event loop
+            await replica.async_engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+            "clock_offset_seconds": round(self.clock_offset.total_seconds(), 3),
+            "replicas": [replica.stats() for replica in self.replicas],
+        }
+
+
+replica_set = ReplicaSet(
+    [
+        Replica(f"replica{n}", url)
+        for n, url in enumerate(parse_replica_urls(settings.DATABASE_REPLICA_URLS), 1)
+    ],
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_seconds=settings.REPLICA_CHECK_SECONDS,
+)
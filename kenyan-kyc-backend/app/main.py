@@ -1,10 +1,16 @@
 # main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
-from app.core.database import check_db_connection
+from app.core.database import async_engine, check_db_connection
+from app.core.metrics import QueryMetricsMiddleware, metrics
+from app.core.replicas import replica_set
 from app.api.routes import auth, users, receipts, verification, admin
+from app.services.principal_cache import principal_listener
+from app.services.token_revocation import revocation_listener
 import logging
+import secrets
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,8 +37,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(QueryMetricsMiddleware)
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting application...")
@@ -40,6 +50,18 @@ async def startup_event():
         logger.info("Database connected")
     else:
         logger.error("Database failed!")
+    if settings.PRINCIPAL_CACHE_LISTEN and settings.PRINCIPAL_CACHE_TTL_SECONDS > 0:
+        await principal_listener.start()
+    await revocation_listener.start()
+    await replica_set.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await principal_listener.stop()
+    await revocation_listener.stop()
+    await replica_set.stop()
+    # asyncpg connections belong to this event loop
+    await async_engine.dispose()
 
 @app.get("/")
 def root():
@@ -50,6 +72,17 @@ def health_check():
     db_status = "connected" if check_db_connection() else "disconnected"
     return {"status": "healthy", "database": db_status}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    # async: still answers when every threadpool thread is stuck
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404)
+    if settings.METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(users.router, prefix="/api/v1")
 app.include_router(receipts.router, prefix="/api/v1")
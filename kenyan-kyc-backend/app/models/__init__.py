@@ -1,3 +1,31 @@
-from .models import User, Receipt, VerificationScore, AuditLog
+from .models import (
+    User,
+    RefreshToken,
+    RevokedToken,
+    Receipt,
+    ReceiptExtraction,
+    ReceiptBlob,
+    ArchiveSegment,
+    ArchivedBlob,
+    UserReceiptAggregate,
+    VerificationScore,
+    PlatformStats,
+    PlatformStatsDaily,
+    AuditLog,
+)
 
-__all__ = ["User", "Receipt", "VerificationScore", "AuditLog"]
+__all__ = [
+    "User",
+    "RefreshToken",
+    "RevokedToken",
+    "Receipt",
+    "ReceiptExtraction",
+    "ReceiptBlob",
+    "ArchiveSegment",
+    "ArchivedBlob",
+    "UserReceiptAggregate",
+    "VerificationScore",
+    "PlatformStats",
+    "PlatformStatsDaily",
+    "AuditLog",
+]
@@ -2,7 +2,7 @@
 SQLAlchemy ORM Models
 """
 
-from sqlalchemy import Column, String, Integer, Numeric, Boolean, DateTime, Date, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, BigInteger, Numeric, Boolean, DateTime, Date, Text, ForeignKey, Index, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID, JSONB, INET
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -24,6 +24,8 @@ class User(Base):
     kyc_status = Column(String(20), default='pending')
     kyc_score = Column(Numeric(5, 2), default=0.00)
     verification_date = Column(DateTime)
+    # Bumped whenever the user's receipts or score change; keys cached score reads
+    receipts_version = Column(BigInteger, nullable=False, default=0)
     
     account_type = Column(String(20), default='investor')
     is_active = Column(Boolean, default=True)
@@ -34,6 +36,45 @@ class User(Base):
     
     receipts = relationship("Receipt", back_populates="user", cascade="all, delete-orphan")
     verification_score = relationship("VerificationScore", back_populates="user", uselist=False)
+    
+    # Keyset pagination of the admin user listing
+    __table_args__ = (
+        Index("idx_users_account_created", account_type, created_at.desc(), id.desc()),
+    )
+
+
+class RefreshToken(Base):
+    """Refresh token, rotated on every use; one family per login"""
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)  # sha256 of the token
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+    used_at = Column(DateTime)  # Set when exchanged for the next token
+    revoked_at = Column(DateTime)
+
+
+class RevokedToken(Base):
+    """Access token revoked before it expires, by JWT id"""
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'))
+    expires_at = Column(DateTime, nullable=False, index=True)  # The token's exp; the row can go after it
+    revoked_at = Column(DateTime, default=func.now())
+
+
+class Merchant(Base):
+    """Canonical merchant that extracted company names resolve to"""
+    __tablename__ = "merchants"
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    normalized_name = Column(String(255), nullable=False, unique=True)
+    created_at = Column(DateTime, default=func.now())
 
 
 class Receipt(Base):
@@ -47,6 +88,8 @@ class Receipt(Base):
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer)
     file_type = Column(String(50))
+    content_hash = Column(String(64), index=True)
+    original_content_hash = Column(String(64))
     
     status = Column(String(20), default='pending', index=True)
     processing_started_at = Column(DateTime)
@@ -54,9 +97,12 @@ class Receipt(Base):
     error_message = Column(Text)
     
     company_name = Column(String(255), index=True)
+    merchant_id = Column(Integer, ForeignKey('merchants.id'), index=True)
     receipt_date = Column(Date)
     receipt_address = Column(Text)
+    locality_id = Column(Integer)  # Gazetteer locality named in receipt_address
     total_amount = Column(Numeric(10, 2))
+    amount_outlier_score = Column(Numeric(6, 2))  # Robust z-score vs the user's earlier receipts
     currency = Column(String(3), default='KES')
     
     confidence_company = Column(Numeric(3, 2))
@@ -65,12 +111,102 @@ class Receipt(Base):
     confidence_total = Column(Numeric(3, 2))
     overall_confidence = Column(Numeric(3, 2))
     
-    raw_extraction_json = Column(JSONB)
+    raw_extraction_json = Column(JSONB)  # Model's fields; tokens are in receipt_extractions
     
     uploaded_at = Column(DateTime, default=func.now(), index=True)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     user = relationship("User", back_populates="receipts")
+    
+    # Keyset pagination of a user's receipts, newest first
+    __table_args__ = (
+        Index("idx_receipts_user_uploaded", user_id, uploaded_at.desc(), id.desc()),
+    )
+
+
+class ReceiptExtraction(Base):
+    """The model's token-level output for a receipt, zlib-compressed JSON"""
+    __tablename__ = "receipt_extractions"
+    
+    receipt_id = Column(UUID(as_uuid=True), ForeignKey('receipts.id', ondelete='CASCADE'), primary_key=True)
+    payload = Column(LargeBinary, nullable=False)
+    raw_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+
+
+class ReceiptBlob(Base):
+    """Content-addressed receipt file, shared by every receipt with identical bytes"""
+    __tablename__ = "receipt_blobs"
+    
+    content_hash = Column(String(64), primary_key=True)
+    tier = Column(String(10), primary_key=True, default='hot')
+    size_bytes = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=func.now())
+
+
+class ArchiveSegment(Base):
+    """Immutable file of packed receipt blobs moved out of hot storage"""
+    __tablename__ = "archive_segments"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    storage_key = Column(String(500), nullable=False, unique=True)
+    entry_count = Column(Integer, nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    raw_bytes = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+    
+    entries = relationship("ArchivedBlob", back_populates="segment")
+
+
+class ArchivedBlob(Base):
+    """Where an archived blob sits inside its segment (one ranged read)"""
+    __tablename__ = "archived_blobs"
+    
+    content_hash = Column(String(64), primary_key=True)
+    segment_id = Column(UUID(as_uuid=True), ForeignKey('archive_segments.id'), nullable=False, index=True)
+    offset = Column(BigInteger, nullable=False)
+    length = Column(Integer, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    codec = Column(String(10), nullable=False, default='none')
+    archived_at = Column(DateTime, default=func.now())
+    
+    segment = relationship("ArchiveSegment", back_populates="entries")
+
+
+class UserReceiptAggregate(Base):
+    """Running per-user sums over completed receipts, kept in step with every receipt change"""
+    __tablename__ = "user_receipt_aggregates"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    rules_key = Column(String(64), nullable=False)
+    
+    trusted_count = Column(Integer, nullable=False, default=0)
+    dropped_count = Column(Integer, nullable=False, default=0)
+    total_spending = Column(Numeric(14, 2), nullable=False, default=0)
+    
+    overall_conf_sum = Column(Numeric(12, 2), nullable=False, default=0)
+    overall_conf_count = Column(Integer, nullable=False, default=0)
+    conf_amount_sum = Column(Numeric(14, 2), nullable=False, default=0)
+    conf_amount_count = Column(Integer, nullable=False, default=0)
+    conf_weighted_amount_sum = Column(Numeric(16, 4), nullable=False, default=0)
+    
+    date_count = Column(Integer, nullable=False, default=0)
+    min_receipt_date = Column(Date)
+    max_receipt_date = Column(Date)
+    date_conf_sum = Column(Numeric(12, 2), nullable=False, default=0)
+    date_conf_count = Column(Integer, nullable=False, default=0)
+    
+    company_conf_sum = Column(Numeric(12, 2), nullable=False, default=0)
+    company_conf_count = Column(Integer, nullable=False, default=0)
+    address_conf_sum = Column(Numeric(12, 2), nullable=False, default=0)
+    address_conf_count = Column(Integer, nullable=False, default=0)
+    
+    merchant_counts = Column(JSONB, nullable=False, default=dict)
+    address_counts = Column(JSONB, nullable=False, default=dict)
+    amount_histogram = Column(JSONB, nullable=False, default=dict)
+    
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
 
 class VerificationScore(Base):
@@ -101,6 +237,43 @@ class VerificationScore(Base):
     user = relationship("User", back_populates="verification_score")
 
 
+class PlatformStats(Base):
+    """Platform-wide totals behind GET /admin/statistics (a single row, id 1)"""
+    __tablename__ = "platform_stats"
+    
+    id = Column(Integer, primary_key=True, default=1)
+    
+    total_users = Column(Integer, nullable=False, default=0)
+    verified_users = Column(Integer, nullable=False, default=0)
+    pending_users = Column(Integer, nullable=False, default=0)
+    under_review_users = Column(Integer, nullable=False, default=0)
+    
+    total_receipts = Column(BigInteger, nullable=False, default=0)
+    processed_receipts = Column(BigInteger, nullable=False, default=0)
+    failed_receipts = Column(BigInteger, nullable=False, default=0)
+    total_platform_spending = Column(Numeric(16, 2), nullable=False, default=0)
+    unique_merchants = Column(Integer, nullable=False, default=0)
+    
+    average_kyc_score = Column(Numeric(5, 2), nullable=False, default=0)
+    
+    refreshed_at = Column(DateTime, nullable=False, default=func.now())
+    refresh_ms = Column(Integer)  # How long the last refresh took
+
+
+class PlatformStatsDaily(Base):
+    """Per-day activity series for the admin dashboard"""
+    __tablename__ = "platform_stats_daily"
+    
+    day = Column(Date, primary_key=True)
+    
+    new_users = Column(Integer, nullable=False, default=0)
+    verified_users = Column(Integer, nullable=False, default=0)  # By verification_date
+    receipts_uploaded = Column(Integer, nullable=False, default=0)
+    receipts_processed = Column(Integer, nullable=False, default=0)
+    receipts_failed = Column(Integer, nullable=False, default=0)
+    spending = Column(Numeric(16, 2), nullable=False, default=0)  # Processed receipts uploaded that day
+
+
 class AuditLog(Base):
     """Audit Log Model"""
     __tablename__ = "audit_logs"
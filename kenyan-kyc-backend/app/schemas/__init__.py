@@ -55,9 +55,12 @@ class ReceiptResponse(BaseModel):
     file_path: str
     status: str
     company_name: Optional[str] = None
+    merchant_id: Optional[int] = None
     receipt_date: Optional[date] = None
     receipt_address: Optional[str] = None
+    locality_id: Optional[int] = None
     total_amount: Optional[Decimal] = None
+    amount_outlier_score: Optional[Decimal] = None
     currency: str = "KES"
     overall_confidence: Optional[Decimal] = None
     accuracy: Optional[float] = None 
@@ -126,6 +129,11 @@ class AdminStatistics(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
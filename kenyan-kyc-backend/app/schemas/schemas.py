@@ -60,9 +60,12 @@ class ReceiptResponse(BaseModel):
     file_path: str
     status: str
     company_name: Optional[str] = None
+    merchant_id: Optional[int] = None
     receipt_date: Optional[date] = None
     receipt_address: Optional[str] = None
+    locality_id: Optional[int] = None
     total_amount: Optional[Decimal] = None
+    amount_outlier_score: Optional[Decimal] = None
     currency: str = 'KES'
     overall_confidence: Optional[Decimal] = None
     accuracy: Optional[float] = None  # <-- ADDED
@@ -115,6 +118,17 @@ class UserDashboard(BaseModel):
     pending_receipts: int
 
 
+class UserBootstrap(BaseModel):
+    user: UserResponse
+    verification_score: Optional[VerificationScoreResponse] = None
+    breakdown: Optional[dict] = None  # As GET /verification/breakdown
+    receipts: List[ReceiptResponse]  # First page of GET /receipts
+    next_cursor: Optional[str] = None
+    total_receipts: int
+    processed_receipts: int
+    pending_receipts: int
+
+
 # -----------------------------
 # Admin Statistics Schema
 # -----------------------------
@@ -128,6 +142,62 @@ class AdminStatistics(BaseModel):
     failed_receipts: int
     total_platform_spending: Decimal
     average_kyc_score: Decimal
+    unique_merchants: int = 0
+    refreshed_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DailyStatistics(BaseModel):
+    day: date
+    new_users: int = 0
+    verified_users: int = 0
+    receipts_uploaded: int = 0
+    receipts_processed: int = 0
+    receipts_failed: int = 0
+    spending: Decimal = Decimal("0.00")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# -----------------------------
+# Scoring Calibration Schemas
+# -----------------------------
+class ScoringWeights(BaseModel):
+    document_quality: float = Field(..., ge=0)
+    spending_pattern: float = Field(..., ge=0)
+    consistency: float = Field(..., ge=0)
+    diversity: float = Field(..., ge=0)
+
+
+class ScoringSweepRequest(BaseModel):
+    min_confidences: List[Decimal] = Field(default_factory=lambda: [Decimal("0.95")])
+    # None = no outlier cap
+    max_amounts: List[Optional[Decimal]] = Field(default_factory=lambda: [Decimal("200000")])
+    weights: List[ScoringWeights] = Field(default_factory=list)
+    # Alternative to listing weights: every set on this lattice summing to 1
+    weight_step: Optional[Decimal] = Field(default=None, gt=0, le=1)
+    verification_thresholds: List[Decimal] = Field(default_factory=lambda: [Decimal("75.00")])
+    refresh_snapshot: bool = False
+
+
+class ScoringSweepPoint(BaseModel):
+    min_confidence: Decimal
+    max_amount: Optional[Decimal] = None
+    weights: dict
+    verification_threshold: Decimal
+    verified: int
+    under_review: int
+    pending: int
+
+
+class ScoringSweepResponse(BaseModel):
+    users: int
+    receipts: int
+    snapshot_loaded_at: datetime
+    grid_points: int
+    seconds: float
+    points: List[ScoringSweepPoint]
 
 
 # -----------------------------
@@ -136,6 +206,11 @@ class AdminStatistics(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -0,0 +1,61 @@
+"""
+Pack processed receipt files into cold archive segments.
+
+Run from the backend root after applying migrations/003_receipt_archive.sql,
+e.g. nightly from cron:
+    python -m app.scripts.archive_receipts [--older-than-days N] [--max-segments N] [--dry-run]
+
+Only blobs whose receipts are all completed are archived. The script is
+safe to re-run: archived blobs drop out of the candidate query.
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.archive import receipt_archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--older-than-days",
+        type=int,
+        default=settings.ARCHIVE_AFTER_DAYS,
+        help="Archive receipts completed at least this many days ago",
+    )
+    parser.add_argument(
+        "--segment-max-bytes",
+        type=int,
+        default=settings.ARCHIVE_SEGMENT_MAX_BYTES,
+        help="Seal a segment once it reaches this size",
+    )
+    parser.add_argument("--max-segments", type=int, help="Stop after writing this many segments")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would move")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        removed = 0 if args.dry_run else receipt_archive.remove_empty_segments(db)
+        stats = receipt_archive.archive(
+            db,
+            older_than_days=args.older_than_days,
+            segment_max_bytes=args.segment_max_bytes,
+            max_segments=args.max_segments,
+            dry_run=args.dry_run,
+        )
+    finally:
+        db.close()
+
+    if args.dry_run:
+        print(f" Blobs eligible: {stats.blobs} ({stats.raw_bytes:,} bytes, unreadable: {stats.skipped})")
+        return
+
+    print(f" Blobs archived: {stats.blobs} into {stats.segments} segment(s) (unreadable: {stats.skipped})")
+    print(f" Bytes moved out of hot storage: {stats.raw_bytes:,}  stored in segments: {stats.stored_bytes:,}")
+    if removed:
+        print(f" Empty segments removed: {removed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark the sync and async database stacks under concurrent reads.
+
+Run from the backend root (needs a database; the seeded user is removed):
+    python -m app.scripts.benchmark_async_reads [--concurrency 1,8,32,64,128,256]
+        [--receipts 200] [--requests 2000] [--db-latency-ms 0]
+
+A throwaway user is seeded and served the dashboard queries by two routes
+of an in-process app: one a plain ``def`` on ``get_db`` (Starlette runs it
+in its threadpool), the other ``async def`` on ``get_async_db`` calling the
+real /users/dashboard handler. Each concurrency level sends the same number
+of requests through httpx and prints latency percentiles and throughput
+for both stacks.
+
+--db-latency-ms adds a pg_sleep to every request, standing in for a remote
+database or a slow query. Pools come from DB_POOL_SIZE/DB_MAX_OVERFLOW and
+DB_ASYNC_POOL_SIZE/DB_ASYNC_MAX_OVERFLOW, so raise those to see what each
+stack does once the pool is not the bottleneck.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.api.routes.users import get_dashboard
+from app.core.database import (
+    SessionLocal,
+    async_engine,
+    engine,
+    get_async_db,
+    get_db,
+)
+from app.models.models import Receipt, User, VerificationScore
+from app.scripts.benchmark_scoring import _seed
+from app.services.kyc_scoring import KYCScorer
+
+
+def _bench_app(user_id, latency_s: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_dashboard(db: Session = Depends(get_db)):
+        user = db.get(User, user_id)
+        if latency_s:
+            db.execute(text("SELECT pg_sleep(:s)"), {"s": latency_s})
+        score = db.query(VerificationScore).filter(VerificationScore.user_id == user.id).first()
+        recent = (
+            db.query(Receipt)
+            .filter(Receipt.user_id == user.id)
+            .order_by(Receipt.uploaded_at.desc())
+            .limit(10)
+            .all()
+        )
+        counts = db.execute(
+            select(
+                func.count(Receipt.id),
+                func.count(Receipt.id).filter(Receipt.status == 'completed'),
+                func.count(Receipt.id).filter(Receipt.status.in_(['pending', 'processing'])),
+            ).where(Receipt.user_id == user.id)
+        ).one()
+        return {"score": score.final_score if score else None, "recent": len(recent), "total": counts[0]}
+
+    @app.get("/async")
+    async def async_dashboard(db: AsyncSession = Depends(get_async_db)):
+        user = await db.get(User, user_id)
+        if latency_s:
+            await db.execute(text("SELECT pg_sleep(:s)"), {"s": latency_s})
+        dashboard = await get_dashboard(current_user=user, db=db)
+        score = dashboard["verification_score"]
+        return {
+            "score": score.final_score if score else None,
+            "recent": len(dashboard["recent_receipts"]),
+            "total": dashboard["total_receipts"],
+        }
+
+    return app
+
+
+async def _run_level(client: httpx.AsyncClient, path: str, concurrency: int, total: int):
+    samples = []
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await client.get(path)
+            samples.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return statistics.median(samples), p95, len(samples) / elapsed
+
+
+async def _benchmark(app: FastAPI, levels: list[int], total: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm both pools and check the stacks agree
+        sync_body = (await client.get("/sync")).json()
+        async_body = (await client.get("/async")).json()
+        assert sync_body == async_body, "stacks disagree"
+
+        print(f" {'concurrency':>11}{'stack':>7}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>10}")
+        for concurrency in levels:
+            for stack in ("sync", "async"):
+                p50, p95, rps = await _run_level(client, f"/{stack}", concurrency, total)
+                print(f" {concurrency:>11}{stack:>7}{p50:>10.2f}{p95:>10.2f}{rps:>10.0f}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", default="1,8,32,64,128,256")
+    parser.add_argument("--receipts", type=int, default=200, help="Receipts seeded for the user")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per level and stack")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    user_id = _seed(db, args.receipts)
+    try:
+        KYCScorer(db).calculate_user_score(str(user_id))
+        print(
+            f" Pools: sync {engine.pool.size()}+{engine.pool._max_overflow}, "
+            f"async {async_engine.pool.size()}+{async_engine.pool._max_overflow}; "
+            f"added latency {args.db_latency_ms:g} ms"
+        )
+        app = _bench_app(user_id, args.db_latency_ms / 1000)
+        levels = [int(x) for x in args.concurrency.split(",")]
+        asyncio.run(_benchmark(app, levels, args.requests))
+    finally:
+        db.rollback()
+        db.query(User).filter(User.id == user_id).delete()
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark GET /users/bootstrap against the calls it replaces.
+
+Run from the backend root (needs a database; the seeded user is removed):
+    python -m app.scripts.benchmark_bootstrap [--receipts 20,200,2000]
+        [--iterations 50]
+
+For each size a throwaway user is seeded with that many completed
+receipts and scored, and the dashboard is loaded through the real app two
+ways: the four calls the frontend makes today (/users/dashboard,
+/verification/score, /verification/breakdown, /receipts) one after the
+other, and the single bootstrap call. Each is timed
+
+- cold: receipts_version bumped before every load, so nothing is cached
+- warm: cached bodies, as after the first load of a version
+- revalidated: the ETags from the previous load sent back (304s)
+
+with the SQL statements each load sends counted alongside.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import event, update
+
+from app.core.database import SessionLocal, async_engine, engine
+from app.core.security import create_access_token
+from app.main import app
+from app.models.models import User
+from app.scripts.benchmark_scoring import _seed
+from app.services.kyc_scoring import KYCScorer
+
+SEQUENCE = ["/users/dashboard", "/verification/score", "/verification/breakdown", "/receipts"]
+BOOTSTRAP = ["/users/bootstrap"]
+PREFIX = "/api/v1"
+
+
+class _StatementCounter:
+    def __init__(self):
+        self.count = 0
+        for target in (engine, async_engine.sync_engine):
+            event.listen(target, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def _bump_version(user_id) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(receipts_version=User.receipts_version + 1)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _load(client, paths, etags: dict) -> int:
+    """One dashboard load; returns the response bytes received."""
+    received = 0
+    for path in paths:
+        headers = {"If-None-Match": etags[path]} if path in etags else {}
+        response = await client.get(PREFIX + path, headers=headers)
+        assert response.status_code in (200, 304), (path, response.status_code)
+        if "etag" in response.headers:
+            etags[path] = response.headers["etag"]
+        received += len(response.content)
+    return received
+
+
+async def _time(client, user_id, paths, mode: str, iterations: int, counter):
+    timings, statements, received = [], 0, 0
+    etags: dict = {}
+    await _load(client, paths, etags)  # warm the pool and the cache
+    for _ in range(iterations):
+        if mode == "cold":
+            await asyncio.to_thread(_bump_version, user_id)
+        if mode != "revalidated":
+            etags = {}
+        before = counter.count
+        started = time.perf_counter()
+        received = await _load(client, paths, etags)
+        timings.append((time.perf_counter() - started) * 1000)
+        statements += counter.count - before
+    return statistics.median(timings), statements / iterations, received
+
+
+async def _run(sizes, iterations: int):
+    counter = _StatementCounter()
+    transport = httpx.ASGITransport(app=app)
+    print(
+        f" {'receipts':>8} {'mode':<12}"
+        f"{'4 calls ms':>12}{'stmts':>7}{'bytes':>9}"
+        f"{'bootstrap ms':>14}{'stmts':>7}{'bytes':>9}"
+    )
+    for size in sizes:
+        db = SessionLocal()
+        user_id = _seed(db, size)
+        KYCScorer(db).calculate_user_score(str(user_id))
+        db.close()
+        token = create_access_token({"sub": str(user_id)})
+        try:
+            async with httpx.AsyncClient(
+                transport=transport,
+                base_url="http://bench",
+                headers={"Authorization": f"Bearer {token}"},
+            ) as client:
+                for mode in ("cold", "warm", "revalidated"):
+                    seq_ms, seq_stmts, seq_bytes = await _time(
+                        client, user_id, SEQUENCE, mode, iterations, counter
+                    )
+                    boot_ms, boot_stmts, boot_bytes = await _time(
+                        client, user_id, BOOTSTRAP, mode, iterations, counter
+                    )
+                    print(
+                        f" {size:>8,} {mode:<12}"
+                        f"{seq_ms:>12.2f}{seq_stmts:>7.0f}{seq_bytes:>9,}"
+                        f"{boot_ms:>14.2f}{boot_stmts:>7.0f}{boot_bytes:>9,}"
+                    )
+        finally:
+            db = SessionLocal()
+            db.query(User).filter(User.id == user_id).delete()
+            db.commit()
+            db.close()
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--receipts", default="20,200,2000")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(_run([int(x) for x in args.receipts.split(",")], args.iterations))
+
+
+if __name__ == "__main__":
+    main()
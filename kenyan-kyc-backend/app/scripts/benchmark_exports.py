@@ -0,0 +1,137 @@
+"""
+Benchmark streaming admin exports against building them in memory.
+
+Run from the backend root (needs a database; the seeded users are removed):
+    python -m app.scripts.benchmark_exports [--users 200000]
+        [--receipts-per-user 2] [--datasets users,scores,receipts]
+        [--format csv] [--buffered]
+
+Throwaway users (each with a score and a few receipts) are seeded with
+INSERT ... SELECT generate_series, then every dataset is exported through
+``stream_export`` - the generator behind GET /admin/exports/{dataset} -
+and the peak Python heap (tracemalloc) is reported next to the bytes
+written and the time taken. --buffered also builds each export the way a
+plain JSON route would (fetch every row, encode, return), to show what
+streaming saves.
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy import text
+
+from app.core.database import SessionLocal, async_engine
+from app.services.admin_exports import DATASETS, ENCODERS, stream_export
+
+SEED_EMAIL = "export-bench-%"
+
+
+def _seed(users: int, receipts_per_user: int) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(
+            text("""
+            INSERT INTO users (id, email, password_hash, full_name, kyc_status,
+                               kyc_score, account_type, is_active, receipts_version, created_at)
+            SELECT gen_random_uuid(), 'export-bench-' || n || '@example.com', 'x',
+                   'Export Benchmark ' || n, 'pending', 0, 'investor', true, 0,
+                   now() - n * interval '1 second'
+            FROM generate_series(1, :users) AS n
+            """),
+            {"users": users},
+        )
+        db.execute(
+            text("""
+            INSERT INTO verification_scores (id, user_id, final_score, is_verified,
+                                             total_receipts, total_spending)
+            SELECT gen_random_uuid(), id, 50 + random() * 50, false, :per_user, 1000
+            FROM users WHERE email LIKE :pattern
+            """),
+            {"per_user": receipts_per_user, "pattern": SEED_EMAIL},
+        )
+        db.execute(
+            text("""
+            INSERT INTO receipts (id, user_id, file_name, file_path, status,
+                                  company_name, total_amount, currency, uploaded_at)
+            SELECT gen_random_uuid(), u.id, 'r.jpg', 'blobs/bench', 'completed',
+                   'NAIVAS LTD', round((random() * 5000)::numeric, 2), 'KES',
+                   now() - r * interval '1 hour'
+            FROM users u CROSS JOIN generate_series(1, :per_user) AS r
+            WHERE u.email LIKE :pattern
+            """),
+            {"per_user": receipts_per_user, "pattern": SEED_EMAIL},
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _cleanup() -> None:
+    db = SessionLocal()
+    try:
+        db.execute(text("DELETE FROM users WHERE email LIKE :pattern"), {"pattern": SEED_EMAIL})
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _streamed(dataset: str, fmt: str) -> tuple[int, int]:
+    chunks = size = 0
+    async for chunk in stream_export(dataset, fmt):
+        chunks += 1
+        size += len(chunk)
+    return chunks, size
+
+
+async def _buffered(dataset: str, fmt: str) -> tuple[int, int]:
+    stmt = DATASETS[dataset]()
+    async with async_engine.connect() as conn:
+        rows = (await conn.execute(stmt)).all()
+    body = ENCODERS[fmt](list(stmt.selected_columns.keys()), rows, True)
+    return 1, len(body)
+
+
+async def _measure(export, dataset: str, fmt: str) -> tuple[float, int, float]:
+    # Timed and traced in separate runs: tracemalloc slows allocation down
+    started = time.perf_counter()
+    _, size = await export(dataset, fmt)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    await export(dataset, fmt)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, peak / 1024 / 1024
+
+
+async def _run(args) -> None:
+    print(f" {'dataset':<10}{'mode':<10}{'seconds':>9}{'MB out':>9}{'peak heap MB':>14}")
+    for dataset in args.datasets.split(","):
+        modes = [("streamed", _streamed)]
+        if args.buffered:
+            modes.append(("buffered", _buffered))
+        for mode, export in modes:
+            elapsed, size, peak = await _measure(export, dataset, args.format)
+            print(f" {dataset:<10}{mode:<10}{elapsed:>9.2f}{size / 1024 / 1024:>9.1f}{peak:>14.1f}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--receipts-per-user", type=int, default=2)
+    parser.add_argument("--datasets", default="users,scores,receipts")
+    parser.add_argument("--format", choices=sorted(ENCODERS), default="csv")
+    parser.add_argument("--buffered", action="store_true")
+    args = parser.parse_args()
+
+    _seed(args.users, args.receipts_per_user)
+    try:
+        asyncio.run(_run(args))
+    finally:
+        _cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark where receipts keep the model's token-level output.
+
+Run from the backend root (needs a database with the receipts and
+receipt_extractions tables; everything is written to temp tables):
+    python -m app.scripts.benchmark_extraction_storage [--receipts 5000] [--users 50]
+
+The same synthetic predict() results (170-370 tokens with labels and
+decoded text, like real receipts) are written, one transaction per
+receipt as uploads do, to three copies of the receipts table:
+
+- gin:    whole result in raw_extraction_json, GIN index on it (before 015)
+- inline: whole result in raw_extraction_json, no GIN index
+- split:  summary inline, tokens compressed into a receipt_extractions
+          copy (app.services.extractions, after 015)
+
+For each it reports the insert cost, the table, TOAST, index and side
+table sizes, the stored size of raw_extraction_json, and the time to load
+every column of a user's receipts (what db.query(Receipt) does).
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.services.extractions import pack, split_extraction
+
+WORDS = (
+    "NAIVAS LTD WESTLANDS BRANCH P.O.BOX 61600-00100 NAIROBI TEL PIN VAT "
+    "CASH SALE TILL NO DATE TIME ITEM QTY PRICE AMOUNT FRESH MILK 500ML "
+    "BREAD WHITE 400G SUGAR 2KG EVEREADY BATT AAA TOTAL CHANGE MPESA "
+    "THANK YOU WELCOME AGAIN SERVED BY RECEIPT"
+).split()
+LABELS = ["B-company", "I-company", "B-address", "I-address", "B-date", "B-total"]
+
+
+def _prediction(rng: random.Random) -> dict:
+    words = [rng.choice(WORDS) if rng.random() < 0.7 else str(rng.randint(1, 99999)) for _ in range(rng.randint(90, 180))]
+    tokens = []
+    for word in words:
+        pieces = [word[i:i + 3] for i in range(0, len(word), 3)]
+        tokens.append("Ġ" + pieces[0])
+        tokens.extend(pieces[1:])
+    labels = ["O" if rng.random() < 0.85 else rng.choice(LABELS) for _ in tokens]
+    return {
+        "company_name": "NAIVAS LTD WESTLANDS BRANCH",
+        "receipt_date": (date(2024, 1, 1) + timedelta(days=rng.randint(0, 365))).isoformat(),
+        "receipt_address": "P.O.BOX 61600-00100 NAIROBI",
+        "total_amount": rng.randint(50, 250_000) / 100,
+        "currency": "KES",
+        "confidence": rng.uniform(0.85, 0.99),
+        "raw_tokens": tokens,
+        "raw_labels": labels,
+        "raw_text": " " + " ".join(words),
+    }
+
+
+def _setup(conn) -> None:
+    for name in ("bench_gin", "bench_inline", "bench_split"):
+        conn.execute(text(f"CREATE TEMP TABLE {name} (LIKE receipts INCLUDING DEFAULTS INCLUDING INDEXES)"))
+        for (index,) in conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :t AND indexdef LIKE '%USING gin%'"),
+            {"t": name},
+        ):
+            conn.execute(text(f'DROP INDEX "{index}"'))
+    conn.execute(text("CREATE INDEX ON bench_gin USING GIN (raw_extraction_json)"))
+    conn.execute(text("CREATE TEMP TABLE bench_split_extractions (LIKE receipt_extractions INCLUDING ALL)"))
+    conn.execute(text("ALTER TABLE bench_split_extractions ALTER COLUMN payload SET STORAGE EXTERNAL"))
+    conn.commit()
+
+
+INSERT = """
+    INSERT INTO {table} (id, user_id, file_name, file_path, status, company_name,
+                         total_amount, currency, overall_confidence, raw_extraction_json, uploaded_at)
+    VALUES (:id, :user_id, 'r.jpg', 'blobs/bench', 'completed', :company, :total, 'KES', 0.95,
+            CAST(:extraction AS jsonb), :uploaded_at)
+"""
+
+
+def _insert(conn, table: str, rows) -> float:
+    insert_receipt = text(INSERT.format(table=table))
+    insert_side = text(
+        "INSERT INTO bench_split_extractions (receipt_id, payload, raw_bytes) VALUES (:id, :payload, :raw_bytes)"
+    )
+    started = time.perf_counter()
+    for receipt_id, user_id, prediction in rows:
+        params = {
+            "id": receipt_id,
+            "user_id": user_id,
+            "company": prediction["company_name"],
+            "total": prediction["total_amount"],
+            "uploaded_at": datetime.utcnow(),
+        }
+        if table == "bench_split":
+            summary, bulky = split_extraction(prediction)
+            payload, raw_bytes = pack(bulky)
+            conn.execute(insert_receipt, {**params, "extraction": json.dumps(summary)})
+            conn.execute(insert_side, {"id": receipt_id, "payload": payload, "raw_bytes": raw_bytes})
+        else:
+            conn.execute(insert_receipt, {**params, "extraction": json.dumps(prediction)})
+        conn.commit()
+    return (time.perf_counter() - started) / len(rows) * 1000
+
+
+def _sizes(conn, table: str) -> dict:
+    row = conn.execute(
+        text(f"""
+        SELECT pg_relation_size(c.oid),
+               COALESCE(pg_total_relation_size(NULLIF(c.reltoastrelid, 0)), 0),
+               pg_indexes_size(c.oid),
+               (SELECT avg(pg_column_size(raw_extraction_json)) FROM {table}),
+               (SELECT count(*) FROM {table})
+        FROM pg_class c WHERE c.oid = '{table}'::regclass
+        """)
+    ).one()
+    side = 0
+    if table == "bench_split":
+        side = conn.execute(text("SELECT pg_total_relation_size('bench_split_extractions')")).scalar()
+    return {"heap": row[0], "toast": row[1], "indexes": row[2], "json": float(row[3]), "rows": row[4], "side": side}
+
+
+def _load_ms(conn, table: str, user_ids) -> float:
+    samples = []
+    for user_id in user_ids:
+        started = time.perf_counter()
+        conn.execute(text(f"SELECT * FROM {table} WHERE user_id = :u"), {"u": user_id}).all()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--receipts", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(50)
+    user_ids = [str(uuid.uuid4()) for _ in range(args.users)]
+    rows = [(str(uuid.uuid4()), rng.choice(user_ids), _prediction(rng)) for _ in range(args.receipts)]
+    raw = statistics.mean(len(json.dumps(prediction)) for _, _, prediction in rows)
+    print(f" {args.receipts} receipts, predict() result {raw:.0f} bytes of JSON on average")
+
+    with engine.connect() as conn:
+        _setup(conn)
+        print(
+            f" {'layout':<8}{'insert ms':>11}{'heap B/row':>12}{'toast B/row':>13}"
+            f"{'index B/row':>13}{'side B/row':>12}{'json B':>8}{'load ms':>9}"
+        )
+        for table in ("bench_gin", "bench_inline", "bench_split"):
+            insert_ms = _insert(conn, table, rows)
+            sizes = _sizes(conn, table)
+            load_ms = _load_ms(conn, table, user_ids)
+            n = sizes["rows"]
+            print(
+                f" {table[6:]:<8}{insert_ms:>11.2f}{sizes['heap'] / n:>12.0f}{sizes['toast'] / n:>13.0f}"
+                f"{sizes['indexes'] / n:>13.0f}{sizes['side'] / n:>12.0f}{sizes['json']:>8.0f}{load_ms:>9.2f}"
+            )
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
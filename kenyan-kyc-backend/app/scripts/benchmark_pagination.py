@@ -0,0 +1,90 @@
+"""
+Benchmark OFFSET against keyset pagination of a user's receipts.
+
+Run from the backend root (needs a database; the seeded user is removed):
+    python -m app.scripts.benchmark_pagination [--receipts 25000] [--page-size 20]
+        [--pages 1,10,100,1000]
+
+A throwaway user is seeded and the query behind GET /receipts is timed at
+each page depth, once with OFFSET and once from a cursor, listing the same
+columns the route does. Apply migrations/010_keyset_pagination.sql first
+on an existing database.
+"""
+
+import argparse
+
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+
+from app.core.database import SessionLocal
+from app.models.models import Receipt, User
+from app.schemas import ReceiptResponse
+from app.scripts.benchmark_scoring import _seed, _time
+from app.utils.pagination import encode_cursor, keyset_page
+
+# The columns GET /receipts loads
+LISTED_COLUMNS = [name for name in ReceiptResponse.model_fields if name in Receipt.__table__.c]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--receipts", type=int, default=25_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--pages", default="1,10,100,1000")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    user_id = _seed(db, args.receipts)
+    try:
+        db.execute(Receipt.__table__.select().limit(0))  # warm the connection
+        listing = select(Receipt).options(
+            load_only(*(getattr(Receipt, name) for name in LISTED_COLUMNS))
+        ).where(Receipt.user_id == user_id)
+        size = args.page_size
+
+        print(f" {'page':>6}{'offset ms':>12}{'keyset ms':>12}")
+        for page in (int(x) for x in args.pages.split(",")):
+            skip = (page - 1) * size
+            if skip >= args.receipts:
+                break
+            cursor = None
+            if skip:
+                # The cursor page `page - 1` would have handed out
+                last = db.execute(
+                    select(Receipt.uploaded_at, Receipt.id)
+                    .where(Receipt.user_id == user_id)
+                    .order_by(Receipt.uploaded_at.desc(), Receipt.id.desc())
+                    .offset(skip - 1)
+                    .limit(1)
+                ).one()
+                cursor = encode_cursor(last.uploaded_at, last.id)
+
+            def offset_page():
+                rows = db.execute(
+                    listing.order_by(Receipt.uploaded_at.desc(), Receipt.id.desc())
+                    .offset(skip)
+                    .limit(size)
+                ).scalars().all()
+                db.expunge_all()
+                return [r.id for r in rows]
+
+            def keyset():
+                rows = db.execute(
+                    keyset_page(listing, Receipt.uploaded_at, Receipt.id, cursor, size)
+                ).scalars().all()[:size]
+                db.expunge_all()
+                return [r.id for r in rows]
+
+            offset_ms, offset_ids = _time(offset_page, 10)
+            keyset_ms, keyset_ids = _time(keyset, 10)
+            assert offset_ids == keyset_ids, "pages disagree"
+            print(f" {page:>6,}{offset_ms:>12.2f}{keyset_ms:>12.2f}")
+    finally:
+        db.rollback()
+        db.query(User).filter(User.id == user_id).delete()
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark the KYC scoring paths against each other.
+
+Run from the backend root (needs a database; the seeded user is removed):
+    python -m app.scripts.benchmark_scoring [--sizes 10,1000,50000]
+
+For each size a throwaway user is seeded with that many completed
+receipts (a realistic raw_extraction_json included, some of them failing
+the drop rules) and the scoring inputs are computed three ways:
+
+- orm:       load full Receipt rows and aggregate in Python (pre-SQL path)
+- sql:       one FILTER-aggregate query (KYCScorer.load_scoring_inputs)
+- aggregate: read the maintained user_receipt_aggregates row
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app.core.database import SessionLocal
+from app.models.models import Receipt, User
+from app.services.gazetteer import gazetteer
+from app.services.kyc_scoring import (
+    SCORED_RECEIPT_FILTERS,
+    KYCScorer,
+    ScoringInputs,
+    receipt_drop_reasons,
+)
+
+MERCHANTS = ["NAIVAS LTD", "CARREFOUR", "QUICKMART", "JAVA HOUSE", "CHANDARANA", "unknown"]
+LOCATIONS = ["Westlands, Nairobi", "CBD Nairobi", "Mombasa Rd", "Kisumu", None]
+INSERT_BATCH = 5000
+
+
+def _seed(db, n: int) -> uuid.UUID:
+    user_id = uuid.uuid4()
+    db.add(
+        User(
+            id=user_id,
+            email=f"bench-{user_id.hex[:12]}@example.com",
+            password_hash="x",
+            full_name="Scoring Benchmark",
+        )
+    )
+    db.flush()
+
+    rng = random.Random(n)
+    tokens = [f"tok{i}" for i in range(300)]
+    rows = []
+    for i in range(n):
+        confidence = Decimal(rng.choice(["0.90", "0.96", "0.97", "0.99", "1.00"]))
+        address = rng.choice(LOCATIONS)
+        rows.append(
+            {
+                "id": uuid.uuid4(),
+                "user_id": user_id,
+                "file_name": f"r{i}.jpg",
+                "file_path": f"blobs/bench/{i}",
+                "status": "completed",
+                "company_name": rng.choice(MERCHANTS),
+                "receipt_address": address,
+                "locality_id": gazetteer.match_id(address),
+                "receipt_date": date(2024, 1, 1) + timedelta(days=rng.randint(0, 365)),
+                "total_amount": Decimal(rng.randint(5000, 25_000_000)) / 100,
+                "currency": "KES",
+                "overall_confidence": confidence,
+                "confidence_company": confidence,
+                "confidence_date": confidence,
+                "confidence_address": confidence,
+                "confidence_total": confidence,
+                "raw_extraction_json": {"raw_tokens": tokens, "raw_labels": ["O"] * len(tokens)},
+                "uploaded_at": datetime.utcnow(),
+            }
+        )
+        if len(rows) == INSERT_BATCH:
+            db.execute(insert(Receipt), rows)
+            rows = []
+    if rows:
+        db.execute(insert(Receipt), rows)
+    db.commit()
+    return user_id
+
+
+def _orm_inputs(db, user_id) -> ScoringInputs:
+    receipts = db.query(Receipt).filter(Receipt.user_id == user_id, *SCORED_RECEIPT_FILTERS).all()
+    trusted = [r for r in receipts if not receipt_drop_reasons(r)]
+    return ScoringInputs.from_receipts(trusted)
+
+
+def _time(fn, repeat: int) -> tuple[float, object]:
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10,1000,50000")
+    args = parser.parse_args()
+
+    print(f" {'receipts':>9}{'orm ms':>12}{'sql ms':>12}{'aggregate ms':>15}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        db = SessionLocal()
+        user_id = _seed(db, n)
+        scorer = KYCScorer(db)
+        repeat = 20 if n <= 1000 else 3
+        try:
+            def orm():
+                inputs = _orm_inputs(db, user_id)
+                db.expunge_all()
+                return inputs
+
+            def sql():
+                return scorer.load_scoring_inputs(str(user_id))[0]
+
+            def aggregate():
+                return ScoringInputs.from_aggregate(scorer._get_aggregate(str(user_id)))
+
+            orm_ms, orm_inputs = _time(orm, repeat)
+            sql_ms, sql_inputs = _time(sql, repeat)
+            scorer.rebuild_aggregate(str(user_id))
+            db.commit()
+            agg_ms, agg_inputs = _time(aggregate, repeat)
+
+            assert orm_inputs == sql_inputs == agg_inputs, "scoring paths disagree"
+            print(f" {n:>9,}{orm_ms:>12.2f}{sql_ms:>12.2f}{agg_ms:>15.2f}")
+        finally:
+            db.rollback()
+            db.query(User).filter(User.id == user_id).delete()
+            db.commit()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark the cost of access token revocation checks on the hot path.
+
+Run from the backend root (needs a database with
+migrations/014_token_revocation.sql; the seeded rows are removed):
+    python -m app.scripts.benchmark_token_revocation [--revoked 100000]
+        [--users 100] [--requests 5000] [--concurrency 16]
+
+--revoked throwaway jtis are written to revoked_tokens and the revocation
+listener is started, which loads them into this worker's Bloom filter.
+The script reports the load time, the filter's size, the cost of one
+filter check and the false positive rate seen over 100,000 unrevoked jtis.
+Then GET /auth/me (principal cache on, so nothing else queries) is run
+through the real app three ways: tokens without a jti (no check at all),
+tokens checked against the filter, and tokens checked in the database on
+every request (the filter switched off).
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+from jose import jwt
+from sqlalchemy import event, insert, text
+
+from app.core.config import settings
+from app.core.database import SessionLocal, async_engine
+from app.core.security import create_access_token
+from app.main import app
+from app.models.models import User
+from app.services.principal_cache import principal_cache
+from app.services.token_revocation import revocation_filter, revocation_listener
+
+SEED_JTI = "revocation-bench-"
+
+
+async def _run(tokens, requests: int, concurrency: int) -> tuple[list, int]:
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(random.choice(tokens))
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        async def worker():
+            while not queue.empty():
+                token = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.get(
+                    "/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"}
+                )
+                latencies.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.text
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+    return latencies, statements
+
+
+def _filter_costs() -> None:
+    jtis = [uuid.uuid4().hex for _ in range(100_000)]
+    started = time.perf_counter()
+    false_positives = sum(revocation_filter.might_be_revoked(jti) for jti in jtis)
+    elapsed = time.perf_counter() - started
+    stats = revocation_filter.stats()
+    print(
+        f" filter: {stats['entries']} jtis in {stats['bytes'] / 1024:.0f} KiB, "
+        f"{stats['hashes']} hashes, {elapsed / len(jtis) * 1e6:.2f} us per check"
+    )
+    print(
+        f" false positives: {false_positives / len(jtis):.4%} seen, "
+        f"{stats['expected_false_positive_rate']:.4%} expected"
+    )
+
+
+async def _compare(user_ids, args) -> None:
+    started = time.perf_counter()
+    await revocation_listener.start()
+    while not revocation_filter.listening:
+        await asyncio.sleep(0.01)
+    print(f" listener up and filter loaded in {(time.perf_counter() - started) * 1000:.0f} ms")
+    _filter_costs()
+
+    expire = datetime.utcnow() + timedelta(minutes=30)
+    without_jti = [
+        jwt.encode({"sub": str(u), "exp": expire}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        for u in user_ids
+    ]
+    with_jti = [create_access_token({"sub": str(u)}) for u in user_ids]
+
+    print(f" {'check':<10}{'p50 ms':>9}{'p95 ms':>9}{'req/s':>9}{'stmts/req':>11}")
+    for label, tokens, filtered in (
+        ("none", without_jti, True),
+        ("bloom", with_jti, True),
+        ("database", with_jti, False),
+    ):
+        if not filtered:
+            await revocation_listener.stop()
+        principal_cache.clear()
+        started = time.perf_counter()
+        latencies, statements = await _run(tokens, args.requests, args.concurrency)
+        elapsed = time.perf_counter() - started
+        cuts = statistics.quantiles(latencies, n=20)
+        print(
+            f" {label:<10}{cuts[9]:>9.2f}{cuts[18]:>9.2f}"
+            f"{args.requests / elapsed:>9.0f}{statements / args.requests:>11.2f}"
+        )
+    await revocation_listener.stop()
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--revoked", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    user_ids = [uuid.uuid4() for _ in range(args.users)]
+    db = SessionLocal()
+    db.execute(
+        insert(User),
+        [
+            {
+                "id": user_id,
+                "email": f"revocation-bench-{user_id.hex[:12]}@example.com",
+                "password_hash": "x",
+                "full_name": "Revocation Benchmark",
+            }
+            for user_id in user_ids
+        ],
+    )
+    db.execute(
+        text("""
+        INSERT INTO revoked_tokens (jti, expires_at)
+        SELECT :prefix || md5(n::text), now() + interval '1 hour'
+        FROM generate_series(1, :revoked) AS n
+        """),
+        {"prefix": SEED_JTI, "revoked": args.revoked},
+    )
+    db.commit()
+    principal_cache.require_listener = False
+    try:
+        asyncio.run(_compare(user_ids, args))
+    finally:
+        db.execute(text("DELETE FROM revoked_tokens WHERE jti LIKE :p"), {"p": SEED_JTI + "%"})
+        db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Check incremental score aggregates against a full recompute.
+
+Run from the backend root:
+    python -m app.scripts.check_score_aggregates [--user-id ID] [--repair]
+
+Prints every user whose aggregate row disagrees with their receipts.
+With --repair, those rows (and missing ones) are rebuilt and the user is
+re-scored. Exits non-zero when drift was found, so it can run from cron.
+"""
+
+import argparse
+import sys
+
+from app.core.database import SessionLocal
+from app.models.models import User
+from app.services.kyc_scoring import KYCScorer
+
+BATCH_SIZE = 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--user-id", help="Only check this user")
+    parser.add_argument("--repair", action="store_true", help="Rebuild rows that drifted")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    checked = drifted = 0
+    last_id = None
+    try:
+        while True:
+            query = db.query(User.id)
+            if args.user_id:
+                query = query.filter(User.id == args.user_id)
+            elif last_id is not None:
+                query = query.filter(User.id > last_id)
+            user_ids = [uid for (uid,) in query.order_by(User.id).limit(BATCH_SIZE).all()]
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+
+            for user_id in user_ids:
+                scorer = KYCScorer(db)
+                mismatches = scorer.check_aggregate_consistency(str(user_id))
+                checked += 1
+                if mismatches:
+                    drifted += 1
+                    print(f" User {user_id}:")
+                    for name, (incremental, full) in mismatches.items():
+                        print(f"   {name}: incremental={incremental} full={full}")
+                    if args.repair:
+                        scorer.rebuild_aggregate(str(user_id))
+                        scorer.calculate_user_score(str(user_id))
+                        db.commit()
+                        continue
+                db.rollback()
+
+            if args.user_id:
+                break
+    finally:
+        db.close()
+
+    print(f" Users checked: {checked}  drifted: {drifted}{'  (repaired)' if args.repair and drifted else ''}")
+    sys.exit(1 if drifted and not args.repair else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Load test: latency of other endpoints while a login storm is running.
+
+Run from the backend root (needs a database; the seeded users are removed):
+    python -m app.scripts.loadtest_login_storm [--users 200]
+        [--storm-concurrency 64] [--probes 4] [--seconds 15]
+
+Throwaway users are seeded and, through the real app, --probes clients
+call GET /users/profile (a sync route, so it needs a request threadpool
+thread) back to back while --storm-concurrency clients log in as fast as
+they can, waiting out Retry-After on a 503. The storm is run twice:
+against the login as it used to be - a sync route verifying with bcrypt
+on the shared request threadpool, mounted here for the comparison - and
+against POST /auth/login, which verifies on the bounded password hashing
+executor. A run without any storm gives the baseline.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+from fastapi import Depends, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, async_engine, get_db
+from app.core.security import create_access_token, get_password_hash, password_hasher, verify_password
+from app.main import app
+from app.models.models import User
+from app.schemas.schemas import UserLogin
+from app.services.principal_cache import principal_cache
+
+PASSWORD = "login-storm-password"
+LEGACY_LOGIN = "/loadtest/threadpool-login"
+
+
+def legacy_login(credentials: UserLogin, db: Session = Depends(get_db)):
+    # The login route before the hashing executor: bcrypt on a request thread
+    user = db.query(User).filter(User.email == credentials.email).first()
+    if not user or not verify_password(credentials.password, user.password_hash):
+        raise HTTPException(status_code=401)
+    return {"access_token": create_access_token({"sub": str(user.id)})}
+
+
+async def _run(emails, probe_token, login_path, args) -> dict:
+    latencies = []
+    logins = busy = 0
+    deadline = time.perf_counter() + args.seconds
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=None
+    ) as client:
+        async def probe():
+            headers = {"Authorization": f"Bearer {probe_token}"}
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get("/api/v1/users/profile", headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.text
+
+        async def storm():
+            nonlocal logins, busy
+            while time.perf_counter() < deadline:
+                response = await client.post(
+                    login_path, json={"email": random.choice(emails), "password": PASSWORD}
+                )
+                if response.status_code == 503:
+                    busy += 1
+                    await asyncio.sleep(float(response.headers["Retry-After"]))
+                    continue
+                assert response.status_code == 200, response.text
+                if time.perf_counter() < deadline:
+                    logins += 1
+
+        storms = [storm() for _ in range(args.storm_concurrency)] if login_path else []
+        await asyncio.gather(*(probe() for _ in range(args.probes)), *storms)
+
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "p50": cuts[49],
+        "p95": cuts[94],
+        "p99": cuts[98],
+        "probes": len(latencies) / args.seconds,
+        "logins": logins / args.seconds,
+        "busy": busy,
+    }
+
+
+async def _compare(emails, probe_token, args) -> None:
+    print(
+        f" {'storm':<12}{'probe p50 ms':>14}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'probes/s':>10}{'logins/s':>10}{'503s':>7}"
+    )
+    for label, login_path in (
+        ("none", None),
+        ("threadpool", LEGACY_LOGIN),
+        ("executor", "/api/v1/auth/login"),
+    ):
+        result = await _run(emails, probe_token, login_path, args)
+        print(
+            f" {label:<12}{result['p50']:>14.1f}{result['p95']:>9.1f}{result['p99']:>9.1f}"
+            f"{result['probes']:>10.0f}{result['logins']:>10.1f}{result['busy']:>7}"
+        )
+    print(f" password hashing: {password_hasher.stats()}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--storm-concurrency", type=int, default=64)
+    parser.add_argument("--probes", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=15)
+    args = parser.parse_args()
+
+    app.add_api_route(LEGACY_LOGIN, legacy_login, methods=["POST"])
+    # One hash for every seeded user: only verifying is being measured
+    password_hash = get_password_hash(PASSWORD)
+    user_ids = [uuid.uuid4() for _ in range(args.users)]
+    emails = [f"login-storm-{user_id.hex[:12]}@example.com" for user_id in user_ids]
+    db = SessionLocal()
+    db.execute(
+        insert(User),
+        [
+            {"id": user_id, "email": email, "password_hash": password_hash, "full_name": "Login Storm"}
+            for user_id, email in zip(user_ids, emails)
+        ],
+    )
+    db.commit()
+    principal_cache.require_listener = False
+    try:
+        asyncio.run(_compare(emails, create_access_token({"sub": str(user_ids[0])}), args))
+    finally:
+        db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
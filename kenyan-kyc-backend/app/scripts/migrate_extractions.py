@@ -0,0 +1,115 @@
+"""
+Move existing receipts' model tokens out of raw_extraction_json.
+
+Run from the backend root after applying migrations/015_receipt_extractions.sql:
+    python -m app.scripts.migrate_extractions [--dry-run] [--batch-size 500]
+
+The tokens, labels and text of every receipt that still has them inline
+are compressed into receipt_extractions and raw_extraction_json is cut
+down to the summary new uploads get (app.services.extractions). Each
+batch commits on its own and moved rows no longer match, so the script is
+safe to re-run after an interruption. Run VACUUM on receipts afterwards
+to make the freed space reusable.
+
+The move is not a change to the receipt, so its updated_at is kept: each
+batch runs with session_replication_role = replica, which skips the
+update_receipts_updated_at trigger (and needs a superuser, or on
+Postgres 15+ a role granted SET on it). Without that privilege the
+receipts are moved anyway and the trigger stamps them as usual.
+"""
+
+import argparse
+import json
+
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import array, insert
+from sqlalchemy.exc import DBAPIError
+
+from app.core.database import SessionLocal
+from app.models.models import Receipt, ReceiptExtraction
+from app.services.extractions import BULKY_KEYS, pack, split_extraction
+
+
+def _skip_triggers(db) -> bool:
+    """Start a transaction whose updates leave updated_at alone, if allowed."""
+    try:
+        db.execute(text("SET LOCAL session_replication_role = replica"))
+        return True
+    except DBAPIError:
+        db.rollback()
+        return False
+
+
+def migrate(dry_run: bool = False, batch_size: int = 500) -> dict:
+    db = SessionLocal()
+    stats = {"moved": 0, "inline_bytes_before": 0, "inline_bytes_after": 0, "side_bytes": 0}
+    last_id = None
+    keep_updated_at = None
+
+    try:
+        while True:
+            if not dry_run:
+                skipped = _skip_triggers(db)
+                if keep_updated_at is None and not skipped:
+                    print(" Not allowed to set session_replication_role: updated_at will change")
+                keep_updated_at = skipped
+            query = (
+                select(Receipt.id, Receipt.raw_extraction_json, Receipt.updated_at)
+                .where(Receipt.raw_extraction_json.has_any(array(BULKY_KEYS)))
+                .order_by(Receipt.id)
+                .limit(batch_size)
+                # Foreign keys are not checked with triggers skipped: a
+                # receipt deleted meanwhile would leave its side row behind
+                .with_for_update()
+            )
+            if last_id is not None:
+                query = query.where(Receipt.id > last_id)
+            rows = db.execute(query).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            side_rows, summaries = [], []
+            for receipt_id, extraction, updated_at in rows:
+                summary, bulky = split_extraction(extraction)
+                payload, raw_bytes = pack(bulky)
+                stats["moved"] += 1
+                stats["inline_bytes_before"] += len(json.dumps(extraction))
+                stats["inline_bytes_after"] += len(json.dumps(summary))
+                stats["side_bytes"] += len(payload)
+                if dry_run:
+                    continue
+                side_rows.append({"receipt_id": receipt_id, "payload": payload, "raw_bytes": raw_bytes})
+                summary_row = {"id": receipt_id, "raw_extraction_json": summary}
+                if keep_updated_at:
+                    summary_row["updated_at"] = updated_at
+                summaries.append(summary_row)
+
+            if side_rows:
+                db.execute(insert(ReceiptExtraction).on_conflict_do_nothing(), side_rows)
+                db.execute(update(Receipt), summaries)
+            db.commit()
+            print(f" {stats['moved']} receipts{' (dry run)' if dry_run else ''}")
+    finally:
+        db.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    stats = migrate(dry_run=args.dry_run, batch_size=args.batch_size)
+    print(f" Moved {stats['moved']} extractions")
+    if stats["moved"]:
+        print(
+            f" inline JSON: {stats['inline_bytes_before'] / stats['moved']:.0f} -> "
+            f"{stats['inline_bytes_after'] / stats['moved']:.0f} bytes per receipt; "
+            f"side table: {stats['side_bytes'] / stats['moved']:.0f} bytes compressed"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Move existing receipt files into the content-addressed blob store.
+
+Run from the backend root after applying migrations/001_content_addressed_storage.sql:
+    python -m app.scripts.migrate_uploads_to_cas [--dry-run] [--keep-originals]
+
+Receipts that already have a content_hash are skipped, so the script is
+safe to re-run after an interruption.
+"""
+
+import argparse
+import os
+
+from app.core.database import SessionLocal
+from app.models.models import Receipt
+from app.services.storage import blob_store
+
+BATCH_SIZE = 200
+
+
+def migrate(dry_run: bool = False, keep_originals: bool = False) -> dict:
+    db = SessionLocal()
+    stats = {"migrated": 0, "missing": 0, "bytes_before": 0, "bytes_after": 0}
+    seen_hashes = set()
+    last_id = None
+
+    try:
+        while True:
+            query = db.query(Receipt).filter(Receipt.content_hash.is_(None))
+            if last_id is not None:
+                query = query.filter(Receipt.id > last_id)
+            receipts = query.order_by(Receipt.id.asc()).limit(BATCH_SIZE).all()
+            if not receipts:
+                break
+            last_id = receipts[-1].id
+
+            old_paths = []
+            for receipt in receipts:
+                if not receipt.file_path or not os.path.exists(receipt.file_path):
+                    print(f" Missing file for receipt {receipt.id}: {receipt.file_path}")
+                    stats["missing"] += 1
+                    continue
+
+                stats["bytes_before"] += os.path.getsize(receipt.file_path)
+                stats["migrated"] += 1
+                if dry_run:
+                    continue
+
+                with open(receipt.file_path, "rb") as f:
+                    stored = blob_store.save(f, db=db)
+
+                if stored.content_hash not in seen_hashes:
+                    seen_hashes.add(stored.content_hash)
+                    stats["bytes_after"] += stored.size
+
+                blob_store.add_reference(db, stored)
+                old_paths.append(receipt.file_path)
+                receipt.file_path = stored.key
+                receipt.content_hash = stored.content_hash
+
+            if dry_run:
+                db.rollback()
+                continue
+
+            db.commit()
+
+            if not keep_originals:
+                for path in old_paths:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+    finally:
+        db.close()
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would move")
+    parser.add_argument(
+        "--keep-originals",
+        action="store_true",
+        help="Leave the old files in place after copying them into the store",
+    )
+    args = parser.parse_args()
+
+    stats = migrate(dry_run=args.dry_run, keep_originals=args.keep_originals)
+    print(f" Receipts migrated: {stats['migrated']} (missing files: {stats['missing']})")
+    if not args.dry_run:
+        saved = stats["bytes_before"] - stats["bytes_after"]
+        print(
+            f" Bytes before: {stats['bytes_before']:,}  after: {stats['bytes_after']:,}  "
+            f"saved by dedup: {saved:,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
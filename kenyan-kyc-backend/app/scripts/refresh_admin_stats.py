@@ -0,0 +1,50 @@
+"""
+Refresh the admin statistics rollups.
+
+Run from the backend root after applying migrations/011_admin_stats_rollups.sql:
+    python -m app.scripts.refresh_admin_stats [--full]
+
+Recomputes platform_stats and the last ADMIN_STATS_DAILY_WINDOW_DAYS days
+of platform_stats_daily, or every day with --full (once after the
+migration, then nightly is plenty). Run it from cron more often than
+ADMIN_STATS_MAX_AGE_SECONDS and admin reads never wait on or trigger a
+refresh themselves.
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import PlatformStats, PlatformStatsDaily
+from app.services.admin_stats import refresh_platform_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Recompute every day of the series, not only the recent window",
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        window = None if args.full else settings.ADMIN_STATS_DAILY_WINDOW_DAYS
+        refresh_ms = refresh_platform_stats(db, window_days=window)
+        if refresh_ms is None:
+            print(" Another refresh is running; nothing done")
+            return
+
+        stats = db.get(PlatformStats, 1)
+        days = db.query(PlatformStatsDaily).count()
+        print(f" Refreshed in {refresh_ms:,} ms ({'every day' if args.full else f'last {window} days'})")
+        print(f" Users: {stats.total_users:,} ({stats.verified_users:,} verified)")
+        print(f" Receipts: {stats.total_receipts:,} ({stats.processed_receipts:,} processed)")
+        print(f" Days in the series: {days:,}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Report bytes saved (and decode time) by upload normalization.
+
+Run from the backend root:
+    python -m app.scripts.report_normalization_savings [directory]
+
+Uses the NORMALIZE_* settings, so different caps/codecs can be compared
+by exporting e.g. NORMALIZE_FORMAT=jpeg before running.
+"""
+
+import argparse
+import io
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from app.core.config import settings
+from app.services.imaging import normalize_image
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def _decode_ms(data: bytes, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("directory", nargs="?", default="tests/test_receipts")
+    args = parser.parse_args()
+
+    paths = sorted(
+        p for p in Path(args.directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+    )
+    if not paths:
+        print(f" No images found in {args.directory}")
+        return
+
+    print(
+        f" format={settings.NORMALIZE_FORMAT} max_dim={settings.NORMALIZE_MAX_DIMENSION} "
+        f"quality={settings.NORMALIZE_QUALITY}"
+    )
+    print(f" {'file':<14}{'original':>12}{'canonical':>12}{'saved':>8}{'decode ms':>16}")
+
+    total_before = total_after = 0
+    for path in paths:
+        raw = path.read_bytes()
+        canonical = normalize_image(
+            io.BytesIO(raw),
+            max_dim=settings.NORMALIZE_MAX_DIMENSION,
+            fmt=settings.NORMALIZE_FORMAT.lower(),
+            quality=settings.NORMALIZE_QUALITY,
+        )
+        if canonical is None:
+            print(f" {path.name:<14} skipped (not a decodable image)")
+            continue
+
+        total_before += len(raw)
+        total_after += len(canonical)
+        saved = 100 * (1 - len(canonical) / len(raw))
+        print(
+            f" {path.name:<14}{len(raw):>12,}{len(canonical):>12,}{saved:>7.1f}%"
+            f"{_decode_ms(raw):>8.1f} -> {_decode_ms(canonical):<6.1f}"
+        )
+
+    saved_total = total_before - total_after
+    print(
+        f" {'total':<14}{total_before:>12,}{total_after:>12,}"
+        f"{100 * saved_total / total_before:>7.1f}%   ({saved_total:,} bytes saved)"
+    )
+
+
+if __name__ == "__main__":
+    main()
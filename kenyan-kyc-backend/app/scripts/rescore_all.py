@@ -0,0 +1,42 @@
+"""
+Rescore every user after a change to the KYC scoring settings.
+
+Run from the backend root once WEIGHT_*, VERIFICATION_THRESHOLD,
+MIN_RECEIPT_CONFIDENCE or MAX_SINGLE_RECEIPT_KES have changed:
+    python -m app.scripts.rescore_all [--chunk-rows N] [--dry-run]
+
+The status transitions are printed and recorded in audit_logs
+(action_type "bulk_rescore"). A dry run computes the transitions without
+writing scores or statuses.
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.services.bulk_rescoring import run_bulk_rescore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=settings.RESCORE_CHUNK_ROWS,
+        help="Receipt rows per chunk (chunks are cut at user boundaries)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only report the status transitions")
+    args = parser.parse_args()
+
+    summary = run_bulk_rescore(dry_run=args.dry_run, chunk_rows=args.chunk_rows)
+
+    print(f" Users rescored: {summary.users:,} from {summary.receipts:,} receipts in {summary.chunks} chunk(s)")
+    print(f" Time: {summary.seconds:.1f}s  (exact Decimal fallbacks: {summary.exact_fallbacks})")
+    if not args.dry_run:
+        print(f" Scores written: {summary.scores_written:,}  users changed: {summary.users_updated:,}")
+    print(" Status transitions:")
+    for transition, count in summary.transitions.items():
+        print(f"   {transition:<28}{count:>10,}")
+
+
+if __name__ == "__main__":
+    main()
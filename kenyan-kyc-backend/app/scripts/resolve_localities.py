@@ -0,0 +1,97 @@
+"""
+Match existing receipts' addresses against the locality gazetteer.
+
+Run from the backend root after applying migrations/008_receipt_localities.sql:
+    python -m app.scripts.resolve_localities [--all] [--dry-run]
+
+Every distinct address is matched once, its receipts are pointed at the
+locality and the affected users' aggregates are rebuilt and re-scored.
+New uploads are matched at ingest; pass --all after editing
+app/data/kenya_localities.csv to re-match receipts that already have one.
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from sqlalchemy import bindparam, update
+
+from app.core.database import SessionLocal
+from app.models.models import Receipt
+from app.services.gazetteer import gazetteer
+from app.services.kyc_scoring import KYCScorer
+
+BATCH_SIZE = 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Re-match every address, not only those without a locality",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the localities addresses map to (receipts and scores untouched)",
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Receipt.receipt_address, Receipt.locality_id).filter(
+            Receipt.receipt_address.isnot(None), Receipt.receipt_address != ""
+        )
+        if not args.all:
+            query = query.filter(Receipt.locality_id.is_(None))
+        pairs = query.distinct().all()
+
+        started = time.perf_counter()
+        matched = {address: gazetteer.match_id(address) for address in {a for a, _ in pairs}}
+        match_us = (time.perf_counter() - started) * 1e6 / max(len(matched), 1)
+        changed = {
+            address for address, locality_id in pairs if matched[address] != locality_id
+        }
+
+        if args.dry_run:
+            by_locality = Counter(matched[address] for address in changed)
+            for locality_id, count in by_locality.most_common(20):
+                locality = gazetteer.get(locality_id)
+                label = f"@{locality_id} {locality.name} ({locality.kind})" if locality else "unmatched"
+                print(f" {label}: {count:,} addresses")
+        elif changed:
+            stmt = (
+                update(Receipt.__table__)
+                .where(Receipt.__table__.c.receipt_address == bindparam("address"))
+                .values(locality_id=bindparam("locality_id"))
+            )
+            params = [{"address": a, "locality_id": matched[a]} for a in changed]
+            addresses = list(changed)
+            user_ids = set()
+            for start in range(0, len(params), BATCH_SIZE):
+                db.execute(stmt, params[start:start + BATCH_SIZE])
+                user_ids.update(
+                    uid
+                    for (uid,) in db.query(Receipt.user_id)
+                    .filter(Receipt.receipt_address.in_(addresses[start:start + BATCH_SIZE]))
+                    .distinct()
+                )
+            db.commit()
+
+            # Aggregates count locations by locality id now; rebuild and re-score
+            for user_id in user_ids:
+                scorer = KYCScorer(db)
+                scorer.rebuild_aggregate(str(user_id))
+                scorer.calculate_user_score(str(user_id))
+            print(f" Users re-scored: {len(user_ids):,}")
+
+        resolved = sum(1 for locality_id in matched.values() if locality_id is not None)
+        print(f" Addresses: {len(matched):,} -> matched: {resolved:,} ({match_us:.1f} us per address)")
+        print(f" Addresses with a new locality: {len(changed):,}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
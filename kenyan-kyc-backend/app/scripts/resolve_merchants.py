@@ -0,0 +1,86 @@
+"""
+Resolve existing receipts' company names to canonical merchants.
+
+Run from the backend root after applying migrations/007_merchants.sql:
+    python -m app.scripts.resolve_merchants [--dry-run]
+
+Every distinct unresolved company name is resolved once (creating
+merchants as needed), its receipts are pointed at the merchant and the
+affected users' aggregates are rebuilt and re-scored. New uploads are
+resolved at ingest, so this only needs to run once.
+"""
+
+import argparse
+import time
+from collections import defaultdict
+
+from sqlalchemy import bindparam, update
+
+from app.core.database import SessionLocal
+from app.models.models import Merchant, Receipt
+from app.services.kyc_scoring import KYCScorer
+from app.services.merchants import merchant_resolver
+
+BATCH_SIZE = 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print how names group (merchants are created, receipts and scores untouched)",
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        unresolved = (Receipt.merchant_id.is_(None), Receipt.company_name.isnot(None))
+        names = [name for (name,) in db.query(Receipt.company_name).filter(*unresolved).distinct()]
+        user_ids = [uid for (uid,) in db.query(Receipt.user_id).filter(*unresolved).distinct()]
+        merchants_before = db.query(Merchant).count()
+
+        started = time.perf_counter()
+        resolved = {name: merchant_resolver.resolve(db, name) for name in names}
+        resolve_ms = (time.perf_counter() - started) * 1000 / max(len(names), 1)
+        resolved = {name: merchant_id for name, merchant_id in resolved.items() if merchant_id}
+
+        if args.dry_run:
+            spellings = defaultdict(list)
+            for name, merchant_id in resolved.items():
+                spellings[merchant_id].append(name)
+            display = dict(db.query(Merchant.id, Merchant.name).filter(Merchant.id.in_(spellings)))
+            for merchant_id, group in sorted(spellings.items()):
+                if len(group) > 1:
+                    print(f" #{merchant_id} {display[merchant_id]}: {', '.join(sorted(group))}")
+        else:
+            stmt = (
+                update(Receipt.__table__)
+                .where(
+                    Receipt.__table__.c.merchant_id.is_(None),
+                    Receipt.__table__.c.company_name == bindparam("name"),
+                )
+                .values(merchant_id=bindparam("merchant_id"))
+            )
+            params = [{"name": name, "merchant_id": mid} for name, mid in resolved.items()]
+            for start in range(0, len(params), BATCH_SIZE):
+                db.execute(stmt, params[start:start + BATCH_SIZE])
+            db.commit()
+
+            # Aggregates count merchants by id now; rebuild and re-score
+            for user_id in user_ids:
+                scorer = KYCScorer(db)
+                scorer.rebuild_aggregate(str(user_id))
+                scorer.calculate_user_score(str(user_id))
+
+        merchants = len(set(resolved.values()))
+        print(f" Names: {len(names):,} -> merchants: {merchants:,} ({resolve_ms:.3f} ms per name)")
+        print(f" New merchants: {db.query(Merchant).count() - merchants_before:,}")
+        if not args.dry_run:
+            print(f" Users re-scored: {len(user_ids):,}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
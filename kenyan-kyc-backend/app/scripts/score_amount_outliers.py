@@ -0,0 +1,100 @@
+"""
+Score existing receipts' amounts against each user's own history.
+
+Run from the backend root after applying migrations/009_amount_outliers.sql:
+    python -m app.scripts.score_amount_outliers [--user-id ID] [--dry-run]
+
+Each user's receipts are replayed in upload order as the upload route
+would have seen them: every amount is scored against the histogram of the
+trusted receipts before it, and added to it when the receipt is trusted.
+Users whose scores changed get their aggregates rebuilt and are re-scored.
+New uploads are scored at ingest; rerun after changing
+AMOUNT_OUTLIER_MIN_HISTORY or AMOUNT_OUTLIER_Z.
+"""
+
+import argparse
+import time
+
+from sqlalchemy.orm import load_only
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import Receipt
+from app.services.amount_outliers import AmountSketch, outlier_score
+from app.services.kyc_scoring import (
+    SCORED_RECEIPT_FILTERS,
+    SCORING_COLUMNS,
+    KYCScorer,
+    is_amount_outlier,
+    receipt_drop_reasons,
+)
+
+
+def replay_user(db, user_id) -> tuple[int, int, int]:
+    """Re-score one user's receipts in place: (receipts, changed, flagged)."""
+    receipts = (
+        db.query(Receipt)
+        .options(load_only(*SCORING_COLUMNS))
+        .filter(Receipt.user_id == user_id, *SCORED_RECEIPT_FILTERS)
+        .order_by(Receipt.uploaded_at, Receipt.id)
+        .all()
+    )
+    sketch = AmountSketch()
+    changed = flagged = 0
+    for r in receipts:
+        score = outlier_score(sketch, r.total_amount, settings.AMOUNT_OUTLIER_MIN_HISTORY)
+        if score != r.amount_outlier_score:
+            r.amount_outlier_score = score
+            changed += 1
+        if is_amount_outlier(score):
+            flagged += 1
+        if not receipt_drop_reasons(r):
+            sketch.add(r.total_amount)
+    return len(receipts), changed, flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--user-id", help="Only replay this user")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Count what would be flagged (receipts and scores untouched)",
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    receipts = changed = flagged = rescored = 0
+    try:
+        query = db.query(Receipt.user_id).filter(*SCORED_RECEIPT_FILTERS)
+        if args.user_id:
+            query = query.filter(Receipt.user_id == args.user_id)
+        user_ids = [uid for (uid,) in query.distinct()]
+
+        started = time.perf_counter()
+        for user_id in user_ids:
+            n, user_changed, user_flagged = replay_user(db, user_id)
+            receipts += n
+            changed += user_changed
+            flagged += user_flagged
+            if args.dry_run or not user_changed:
+                db.rollback()
+                continue
+            db.commit()
+            scorer = KYCScorer(db)
+            scorer.rebuild_aggregate(str(user_id))
+            scorer.calculate_user_score(str(user_id))
+            rescored += 1
+        elapsed = time.perf_counter() - started
+
+        print(f" Users: {len(user_ids):,}, receipts: {receipts:,} ({elapsed:.1f}s)")
+        print(f" Scores changed: {changed:,}")
+        print(f" Flagged as unusual for their user (z > {settings.AMOUNT_OUTLIER_Z}): {flagged:,}")
+        if not args.dry_run:
+            print(f" Users re-scored: {rescored:,}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
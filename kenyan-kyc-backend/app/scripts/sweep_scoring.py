@@ -0,0 +1,75 @@
+"""
+Sweep scoring settings and report how users would be classified.
+
+Read-only: loads every scored receipt into memory once, then evaluates the
+full grid. Run from the backend root, e.g.:
+    python -m app.scripts.sweep_scoring --min-confidence 0.90,0.95,0.97 \\
+        --max-amount 100000,200000,none --weight-step 0.05 --thresholds 70,75,80
+
+Without --weights / --weight-step the current WEIGHT_* settings are used.
+"""
+
+import argparse
+from decimal import Decimal
+
+from app.core.database import SessionLocal
+from app.services.bulk_rescoring import current_weights
+from app.services.score_calibration import ScoringSnapshot, sweep, weight_grid
+
+
+def _decimals(value: str) -> list:
+    return [None if v.strip().lower() == "none" else Decimal(v) for v in value.split(",")]
+
+
+def _weight_sets(value: str) -> list:
+    return [tuple(float(w) for w in ws.split(",")) for ws in value.split(";")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--min-confidence", type=_decimals, default=[Decimal("0.95")])
+    parser.add_argument(
+        "--max-amount",
+        type=_decimals,
+        default=[Decimal("200000")],
+        help="Outlier caps in KES; 'none' disables the cap",
+    )
+    parser.add_argument(
+        "--weights",
+        type=_weight_sets,
+        default=[],
+        help="quality,spending,consistency,diversity sets separated by ';'",
+    )
+    parser.add_argument("--weight-step", type=Decimal, help="Every weight set on this lattice")
+    parser.add_argument("--thresholds", type=_decimals, default=[Decimal("75.00")])
+    args = parser.parse_args()
+
+    weight_sets = args.weights + (weight_grid(args.weight_step) if args.weight_step else [])
+    weight_sets = weight_sets or [current_weights()]
+
+    db = SessionLocal()
+    try:
+        snapshot = ScoringSnapshot.load(db)
+    finally:
+        db.close()
+
+    result = sweep(snapshot, args.min_confidence, args.max_amount, weight_sets, args.thresholds)
+
+    print(
+        f" {'min_conf':>8}{'max_kes':>10}{'weights (q/s/c/d)':>26}{'threshold':>11}"
+        f"{'verified':>10}{'review':>10}{'pending':>10}"
+    )
+    for p in result.points:
+        weights = "/".join(f"{w:.2f}" for w in p["weights"].values())
+        cap = "none" if p["max_amount"] is None else f"{p['max_amount']}"
+        print(
+            f" {p['min_confidence']:>8}{cap:>10}{weights:>26}{p['verification_threshold']:>11}"
+            f"{p['verified']:>10,}{p['under_review']:>10,}{p['pending']:>10,}"
+        )
+    per_point = result.seconds * 1000 / max(result.grid_points, 1)
+    print(f" Snapshot: {result.users:,} users, {result.receipts:,} receipts loaded in {snapshot.load_seconds:.1f}s")
+    print(f" Sweep: {result.grid_points:,} settings in {result.seconds * 1000:.0f} ms ({per_point:.3f} ms each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Admin statistics rollups - platform totals and a daily activity series
+
+GET /admin/statistics reads one row of ``platform_stats`` instead of
+counting users, receipts and scores on every request, and
+GET /admin/statistics/daily reads ``platform_stats_daily`` by its primary
+key. Both are refreshed here:
+
+- on read, stale-while-revalidate: a rollup older than
+  ADMIN_STATS_MAX_AGE_SECONDS is served as is while a background task
+  refreshes it; one older than that plus ADMIN_STATS_STALE_SECONDS is
+  refreshed before answering
+- on a schedule, by ``python -m app.scripts.refresh_admin_stats``
+
+A refresh recomputes the totals exactly and the last
+ADMIN_STATS_DAILY_WINDOW_DAYS days of the series; older days only change
+when receipts are deleted or reprocessed, and a ``--full`` refresh
+recomputes them. A transaction-scoped advisory lock keeps concurrent
+refreshes from several API workers down to one.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import PlatformStats, PlatformStatsDaily, Receipt, User, VerificationScore
+
+logger = logging.getLogger(__name__)
+
+# pg_try_advisory_xact_lock key shared by every refresher
+_REFRESH_LOCK_KEY = 4_202_001
+
+DAILY_COUNTERS = (
+    "new_users",
+    "verified_users",
+    "receipts_uploaded",
+    "receipts_processed",
+    "receipts_failed",
+    "spending",
+)
+
+_investor = User.account_type == 'investor'
+
+
+def _totals(db: Session) -> dict:
+    # One pass over each table, counts split with FILTER
+    users = db.execute(
+        select(
+            func.count(User.id),
+            func.count(User.id).filter(User.kyc_status == 'verified'),
+            func.count(User.id).filter(User.kyc_status == 'pending'),
+            func.count(User.id).filter(User.kyc_status == 'under_review'),
+        ).where(_investor)
+    ).one()
+    receipts = db.execute(
+        select(
+            func.count(Receipt.id),
+            func.count(Receipt.id).filter(Receipt.status == 'completed'),
+            func.count(Receipt.id).filter(Receipt.status == 'failed'),
+            func.sum(Receipt.total_amount).filter(Receipt.status == 'completed'),
+            func.count(func.distinct(Receipt.merchant_id)),
+        )
+    ).one()
+    avg_score = db.execute(select(func.avg(VerificationScore.final_score))).scalar() or 0
+
+    return {
+        "total_users": users[0],
+        "verified_users": users[1],
+        "pending_users": users[2],
+        "under_review_users": users[3],
+        "total_receipts": receipts[0],
+        "processed_receipts": receipts[1],
+        "failed_receipts": receipts[2],
+        "total_platform_spending": receipts[3] or 0,
+        "unique_merchants": receipts[4],
+        "average_kyc_score": round(avg_score, 2),
+    }
+
+
+def _daily(db: Session, since: Optional[date]) -> dict[date, dict]:
+    """Counters by day from ``since`` (every day when None); idle days are absent."""
+    days: dict[date, dict] = defaultdict(lambda: dict.fromkeys(DAILY_COUNTERS, 0))
+
+    created = func.date(User.created_at)
+    query = select(created, func.count(User.id)).where(_investor)
+    if since:
+        query = query.where(User.created_at >= since)
+    for day, count in db.execute(query.group_by(created)):
+        days[day]["new_users"] = count
+
+    verified = func.date(User.verification_date)
+    query = select(verified, func.count(User.id)).where(
+        _investor, User.kyc_status == 'verified', User.verification_date.isnot(None)
+    )
+    if since:
+        query = query.where(User.verification_date >= since)
+    for day, count in db.execute(query.group_by(verified)):
+        days[day]["verified_users"] = count
+
+    uploaded = func.date(Receipt.uploaded_at)
+    query = select(
+        uploaded,
+        func.count(Receipt.id),
+        func.count(Receipt.id).filter(Receipt.status == 'completed'),
+        func.count(Receipt.id).filter(Receipt.status == 'failed'),
+        func.sum(Receipt.total_amount).filter(Receipt.status == 'completed'),
+    ).where(Receipt.uploaded_at.isnot(None))
+    if since:
+        query = query.where(Receipt.uploaded_at >= since)
+    for day, uploads, processed, failed, spending in db.execute(query.group_by(uploaded)):
+        days[day].update(
+            receipts_uploaded=uploads,
+            receipts_processed=processed,
+            receipts_failed=failed,
+            spending=spending or 0,
+        )
+
+    return days
+
+
+def refresh_platform_stats(
+    db: Session,
+    window_days: Optional[int] = settings.ADMIN_STATS_DAILY_WINDOW_DAYS,
+) -> Optional[int]:
+    """
+    Recompute the totals and the last ``window_days`` days of the series
+    (every day when None) and commit. Returns the refresh time in ms, or
+    None when another session is refreshing already.
+    """
+    started = time.perf_counter()
+    if not db.execute(select(func.pg_try_advisory_xact_lock(_REFRESH_LOCK_KEY))).scalar():
+        db.rollback()
+        return None
+
+    totals = _totals(db)
+    since = None
+    if window_days is not None:
+        today = db.execute(select(func.current_date())).scalar()
+        since = today - timedelta(days=max(window_days, 1) - 1)
+    days = _daily(db, since)
+
+    clear = delete(PlatformStatsDaily)
+    if since:
+        clear = clear.where(PlatformStatsDaily.day >= since)
+    db.execute(clear)
+    if days:
+        db.execute(
+            insert(PlatformStatsDaily),
+            [{"day": day, **counters} for day, counters in sorted(days.items())],
+        )
+
+    refresh_ms = round((time.perf_counter() - started) * 1000)
+    values = {**totals, "refreshed_at": func.now(), "refresh_ms": refresh_ms}
+    db.execute(
+        pg_insert(PlatformStats)
+        .values(id=1, **values)
+        .on_conflict_do_update(index_elements=[PlatformStats.id], set_=values)
+    )
+    db.commit()
+    return refresh_ms
+
+
+_background_refresh = threading.Lock()
+
+
+def refresh_in_background() -> None:
+    """BackgroundTasks entry point; at most one refresh per process at a time."""
+    if not _background_refresh.acquire(blocking=False):
+        return
+    db = SessionLocal()
+    try:
+        refresh_ms = refresh_platform_stats(db)
+        if refresh_ms is not None:
+            logger.info("Admin statistics refreshed in %s ms", refresh_ms)
+    except Exception:
+        db.rollback()
+        logger.exception("Admin statistics refresh failed")
+    finally:
+        db.close()
+        _background_refresh.release()
+
+
+def refresh_now() -> None:
+    """Blocking refresh for a read that cannot be served stale."""
+    db = SessionLocal()
+    try:
+        if refresh_platform_stats(db) is None:
+            # Another worker holds the lock: wait for its refresh instead
+            db.execute(select(func.pg_advisory_xact_lock(_REFRESH_LOCK_KEY)))
+            db.rollback()
+    finally:
+        db.close()
+
+
+async def read_platform_stats(db: AsyncSession) -> tuple[Optional[PlatformStats], float]:
+    """The rollup row and its age in seconds (measured by the database clock)."""
+    row = (
+        await db.execute(
+            select(
+                PlatformStats,
+                func.extract("epoch", func.now() - PlatformStats.refreshed_at),
+            )
+            .where(PlatformStats.id == 1)
+            .execution_options(populate_existing=True)
+        )
+    ).first()
+    if row is None:
+        return None, float("inf")
+    return row[0], float(row[1])
+
+
+def contiguous_days(rows: dict, since: date, days: int) -> list:
+    """Stored rows for ``days`` days from ``since``, with ``{"day": day}`` for idle ones."""
+    return [
+        rows.get(day) or {"day": day}
+        for day in (since + timedelta(days=n) for n in range(days))
+    ]
+
+
+def cache_control(age_seconds: float) -> str:
+    """Lets browsers reuse the response for the rest of the rollup's freshness."""
+    fresh_for = max(0, int(settings.ADMIN_STATS_MAX_AGE_SECONDS - age_seconds))
+    return (
+        f"private, max-age={fresh_for}, "
+        f"stale-while-revalidate={settings.ADMIN_STATS_STALE_SECONDS}"
+    )
@@ -0,0 +1,101 @@
+"""
+Per-user amount outliers - a robust z-score against the user's own history
+
+Each user's aggregate row keeps a histogram of their trusted receipt
+amounts on a log scale (BUCKETS_PER_DECADE buckets per factor of ten,
+about 12% wide). Adding or removing a receipt touches one bucket, and the
+median and MAD (median absolute deviation) read off the histogram cost at
+most a few hundred buckets whatever the number of receipts.
+
+At upload a receipt's amount is scored against the histogram as it stood
+before the receipt arrived: a modified z-score 0.6745 * (x - median) / MAD
+in log space. The score is stored on the receipt, so whether a receipt is
+trusted stays a function of the receipt alone and the aggregates, their
+SQL twin and the bulk rescorer keep agreeing.
+"""
+
+import math
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Optional
+
+BUCKETS_PER_DECADE = 20
+
+# MAD of a normal distribution is 0.6745 standard deviations
+_MAD_SCALE = 0.6745
+
+# Spread floor in buckets (a factor of about 1.8), so a user whose
+# receipts are nearly all the same amount is not flagged for any change
+MIN_SPREAD_BUCKETS = 5
+
+# receipts.amount_outlier_score is NUMERIC(6,2)
+_MAX_SCORE = Decimal("9999.99")
+
+
+def amount_position(amount) -> float:
+    """Amount on the histogram's log scale (amounts below 1 KES count as 1)."""
+    return BUCKETS_PER_DECADE * math.log10(max(float(amount), 1.0))
+
+
+def amount_bucket(amount) -> int:
+    return int(amount_position(amount))
+
+
+class AmountSketch:
+    """Log-scale amount histogram, stored as ``{"bucket": count}`` JSONB."""
+
+    def __init__(self, histogram: Optional[dict] = None):
+        self.counts = {int(bucket): count for bucket, count in (histogram or {}).items()}
+
+    def add(self, amount, sign: int = 1) -> None:
+        bucket = amount_bucket(amount)
+        count = self.counts.get(bucket, 0) + sign
+        if count > 0:
+            self.counts[bucket] = count
+        else:
+            self.counts.pop(bucket, None)
+
+    def as_json(self) -> dict:
+        return {str(bucket): count for bucket, count in sorted(self.counts.items())}
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def median(self) -> Optional[float]:
+        """Median position, interpolated within its bucket."""
+        half = self.count / 2
+        seen = 0
+        for bucket, count in sorted(self.counts.items()):
+            if seen + count >= half:
+                return bucket + (half - seen) / count
+            seen += count
+        return None
+
+    def mad(self, median: float) -> float:
+        """Median distance of bucket centres from ``median``."""
+        deviations = sorted(
+            (abs(bucket + 0.5 - median), count) for bucket, count in self.counts.items()
+        )
+        half = self.count / 2
+        seen = 0
+        for deviation, count in deviations:
+            seen += count
+            if seen >= half:
+                return deviation
+        return 0.0
+
+    def robust_z(self, amount) -> Optional[float]:
+        """Modified z-score of ``amount``; None for an empty history."""
+        median = self.median()
+        if median is None:
+            return None
+        spread = max(self.mad(median), MIN_SPREAD_BUCKETS)
+        return _MAD_SCALE * (amount_position(amount) - median) / spread
+
+
+def outlier_score(sketch: AmountSketch, amount, min_history: int) -> Optional[Decimal]:
+    """The score stored on a new receipt (None until the user has min_history receipts)."""
+    if amount is None or sketch.count < max(min_history, 1):
+        return None
+    score = Decimal(str(sketch.robust_z(amount))).quantize(Decimal("0.01"), ROUND_HALF_EVEN)
+    return max(min(score, _MAX_SCORE), -_MAX_SCORE)
@@ -0,0 +1,353 @@
+"""
+Receipt Archive - packed cold storage for processed receipt files
+
+Once a receipt is completed and scored its file is rarely read again.
+The archival job packs those blobs into append-only segment files
+(``archive/segments/<id>.seg``) and deletes the hot copy. Each entry is
+written as
+
+    header (magic, SHA-256 digest, codec, payload length) + payload
+
+and ``archived_blobs`` maps the content hash to (segment, offset, length),
+so one receipt is read back with a single ranged read. The header makes a
+segment self-describing, so the index can be rebuilt from the files.
+
+Payloads are zlib-compressed only when that actually shrinks them: JPEG
+and WebP are stored as-is and can be range-streamed straight out of the
+segment. Segments are never rewritten; forgotten entries leave dead space
+and a segment is deleted once its last entry is gone.
+"""
+
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, delete, func
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.models import ArchivedBlob, ArchiveSegment, Receipt, ReceiptBlob
+from app.services.storage import (
+    ContentAddressedStore,
+    StorageBackend,
+    blob_store,
+    storage_backend,
+)
+
+logger = logging.getLogger(__name__)
+
+ENTRY_MAGIC = b"KRA1"
+# magic, raw SHA-256 digest, codec id, payload length
+ENTRY_HEADER = struct.Struct(">4s32sBI")
+CODEC_IDS = {"none": 0, "zlib": 1}
+
+# Compressed payload is kept only if it saves at least this fraction
+MIN_COMPRESSION_GAIN = 0.05
+
+
+class SegmentWriter:
+    """Appends entries to a local staging file until the segment is sealed."""
+
+    def __init__(self, staging_dir: str):
+        self.segment_id = uuid.uuid4()
+        fd, self.path = tempfile.mkstemp(dir=staging_dir, suffix=".seg")
+        self._file = os.fdopen(fd, "wb")
+        self.size = 0
+        self.raw_bytes = 0
+        self.entries: list[dict] = []
+
+    def append(self, content_hash: str, data: bytes) -> None:
+        codec, payload = "none", data
+        packed = zlib.compress(data, 6)
+        if len(packed) <= len(data) * (1 - MIN_COMPRESSION_GAIN):
+            codec, payload = "zlib", packed
+
+        header = ENTRY_HEADER.pack(
+            ENTRY_MAGIC, bytes.fromhex(content_hash), CODEC_IDS[codec], len(payload)
+        )
+        self._file.write(header)
+        self._file.write(payload)
+
+        self.entries.append(
+            {
+                "content_hash": content_hash,
+                "offset": self.size + len(header),
+                "length": len(payload),
+                "size_bytes": len(data),
+                "codec": codec,
+            }
+        )
+        self.size += len(header) + len(payload)
+        self.raw_bytes += len(data)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def discard(self) -> None:
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@dataclass
+class ArchiveRunStats:
+    blobs: int = 0
+    segments: int = 0
+    raw_bytes: int = 0
+    stored_bytes: int = 0
+    skipped: int = 0
+
+
+class ReceiptArchive:
+    def __init__(
+        self,
+        backend: StorageBackend,
+        source: ContentAddressedStore,
+        prefix: str = "archive/segments",
+    ):
+        self.backend = backend
+        self.source = source
+        self.prefix = prefix
+
+    def segment_key(self, segment_id: uuid.UUID) -> str:
+        return f"{self.prefix}/{segment_id}.seg"
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    def lookup(self, db: Session, content_hash: str) -> Optional[ArchivedBlob]:
+        return (
+            db.query(ArchivedBlob)
+            .options(joinedload(ArchivedBlob.segment))
+            .filter(ArchivedBlob.content_hash == content_hash)
+            .first()
+        )
+
+    def read(self, entry: ArchivedBlob) -> bytes:
+        data = b"".join(
+            self.backend.stream_range(entry.segment.storage_key, entry.offset, entry.length)
+        )
+        if entry.codec == "zlib":
+            data = zlib.decompress(data)
+        return data
+
+    def forget(self, db: Session, content_hash: str) -> None:
+        """
+        Drop the index entry for a blob (runs inside the caller's
+        transaction): its last receipt was deleted, or the same bytes were
+        uploaded again and the hot copy is authoritative once more.
+        """
+        db.execute(delete(ArchivedBlob).where(ArchivedBlob.content_hash == content_hash))
+
+    # -------------------------------------------------
+    # Archival job
+    # -------------------------------------------------
+    @staticmethod
+    def _settled(cutoff: datetime):
+        """HAVING clause: every receipt of the blob completed before ``cutoff``."""
+        return func.coalesce(
+            func.bool_and(
+                and_(
+                    Receipt.status == "completed",
+                    func.coalesce(Receipt.processing_completed_at, Receipt.uploaded_at) < cutoff,
+                )
+            ),
+            False,
+        )
+
+    def candidates(
+        self, db: Session, cutoff: datetime, after: str = "", limit: int = 500
+    ) -> list[str]:
+        """
+        Hot blobs whose every receipt completed processing before ``cutoff``,
+        in content-hash order (keyset pagination via ``after``).
+        """
+        rows = (
+            db.query(Receipt.content_hash)
+            .outerjoin(ArchivedBlob, ArchivedBlob.content_hash == Receipt.content_hash)
+            .filter(
+                Receipt.content_hash.isnot(None),
+                Receipt.content_hash > after,
+                ArchivedBlob.content_hash.is_(None),
+            )
+            .group_by(Receipt.content_hash)
+            .having(self._settled(cutoff))
+            .order_by(Receipt.content_hash)
+            .limit(limit)
+            .all()
+        )
+        return [content_hash for (content_hash,) in rows]
+
+    def _read_source(self, content_hash: str) -> Optional[bytes]:
+        try:
+            with self.source.local_path(content_hash) as path:
+                with open(path, "rb") as f:
+                    data = f.read()
+        except Exception as e:
+            logger.warning("Cannot read blob %s for archival: %s", content_hash, e)
+            return None
+
+        if hashlib.sha256(data).hexdigest() != content_hash:
+            logger.error("Blob %s failed its digest check; not archived", content_hash)
+            return None
+        return data
+
+    def _seal(
+        self, db: Session, writer: SegmentWriter, stats: ArchiveRunStats, cutoff: datetime
+    ) -> None:
+        """Upload a finished segment, index it, then drop the hot copies."""
+        writer.close()
+        hashes = [e["content_hash"] for e in writer.entries]
+
+        # Lock the refcount rows so a concurrent delete cannot release a blob
+        # between this check and the commit; blobs whose receipts are already
+        # gone are left out of the index.
+        locked = {
+            content_hash
+            for (content_hash,) in db.query(ReceiptBlob.content_hash)
+            .filter(
+                ReceiptBlob.content_hash.in_(hashes),
+                ReceiptBlob.tier == self.source.tier,
+            )
+            .with_for_update()
+            .all()
+        }
+        # An upload of the same bytes since candidates() adds a receipt still
+        # processing (its reference committed before the lock was granted,
+        # or waits for this commit and then forgets the entry): only blobs
+        # still settled are indexed.
+        live = {
+            content_hash
+            for (content_hash,) in db.query(Receipt.content_hash)
+            .filter(Receipt.content_hash.in_(locked))
+            .group_by(Receipt.content_hash)
+            .having(self._settled(cutoff))
+            .all()
+        } if locked else set()
+        entries = [e for e in writer.entries if e["content_hash"] in live]
+        if not entries:
+            db.rollback()
+            writer.discard()
+            return
+
+        key = self.segment_key(writer.segment_id)
+        try:
+            self.backend.put_file(key, writer.path, content_type="application/octet-stream")
+            db.add(
+                ArchiveSegment(
+                    id=writer.segment_id,
+                    storage_key=key,
+                    entry_count=len(entries),
+                    size_bytes=writer.size,
+                    raw_bytes=writer.raw_bytes,
+                )
+            )
+            db.add_all(ArchivedBlob(segment_id=writer.segment_id, **e) for e in entries)
+            db.commit()
+        except Exception:
+            db.rollback()
+            writer.discard()
+            self.backend.delete(key)
+            raise
+
+        for e in entries:
+            self._drop_hot_copy(db, e["content_hash"])
+
+        stats.segments += 1
+        stats.blobs += len(entries)
+        stats.raw_bytes += sum(e["size_bytes"] for e in entries)
+        stats.stored_bytes += writer.size
+        logger.info("Sealed archive segment %s (%d blobs, %d bytes)", key, len(entries), writer.size)
+
+    def _drop_hot_copy(self, db: Session, content_hash: str) -> None:
+        # Under the blob's lock (see ContentAddressedStore.lock): a re-upload
+        # of the same bytes since the commit above forgot the entry and
+        # serves the hot copy again, so it stays
+        try:
+            self.source.lock(db, content_hash)
+            still_archived = (
+                db.query(ArchivedBlob.content_hash)
+                .filter(ArchivedBlob.content_hash == content_hash)
+                .first()
+            )
+            if still_archived:
+                self.source.remove(content_hash)
+        finally:
+            db.commit()
+
+    def archive(
+        self,
+        db: Session,
+        older_than_days: int,
+        segment_max_bytes: int,
+        max_segments: Optional[int] = None,
+        dry_run: bool = False,
+    ) -> ArchiveRunStats:
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        stats = ArchiveRunStats()
+        writer: Optional[SegmentWriter] = None
+        last_hash = ""
+
+        try:
+            while max_segments is None or stats.segments < max_segments:
+                batch = self.candidates(db, cutoff, after=last_hash)
+                if not batch:
+                    break
+
+                for content_hash in batch:
+                    last_hash = content_hash
+                    data = self._read_source(content_hash)
+                    if data is None:
+                        stats.skipped += 1
+                        continue
+                    if dry_run:
+                        stats.blobs += 1
+                        stats.raw_bytes += len(data)
+                        continue
+
+                    if writer is None:
+                        writer = SegmentWriter(str(self.source.tmp_dir))
+                    writer.append(content_hash, data)
+
+                    if writer.size >= segment_max_bytes:
+                        self._seal(db, writer, stats, cutoff)
+                        writer = None
+                        if max_segments is not None and stats.segments >= max_segments:
+                            break
+
+            if writer is not None and writer.entries:
+                self._seal(db, writer, stats, cutoff)
+                writer = None
+        finally:
+            if writer is not None:
+                writer.discard()
+
+        return stats
+
+    def remove_empty_segments(self, db: Session) -> int:
+        """Delete segments whose every entry has been forgotten."""
+        empty = (
+            db.query(ArchiveSegment)
+            .outerjoin(ArchivedBlob, ArchivedBlob.segment_id == ArchiveSegment.id)
+            .filter(ArchivedBlob.content_hash.is_(None))
+            .all()
+        )
+        keys = [segment.storage_key for segment in empty]
+        for segment in empty:
+            db.delete(segment)
+        db.commit()
+
+        for key in keys:
+            self.backend.delete(key)
+            logger.info("Removed empty archive segment %s", key)
+        return len(keys)
+
+
+receipt_archive = ReceiptArchive(storage_backend, blob_store)
@@ -0,0 +1,624 @@
+"""
+Population-wide KYC rescoring.
+
+Re-applies the current scoring settings (weights, thresholds, drop rules)
+to every user with scored receipts. Receipts are streamed through a
+server-side cursor in user-ordered chunks and reduced to per-user sums with
+NumPy; the component formulas of ``KYCScorer`` are then evaluated for all
+users of a chunk at once and written back with batched upserts.
+
+Money and confidences are summed as exact integers (cents, hundredths), so
+the inputs match ``KYCScorer.load_scoring_inputs``. The formulas run in
+float64; users with a value on (or within float noise of) a .xx5 rounding
+tie are re-scored through the Decimal path, so results match
+``KYCScorer._score_data`` to the cent.
+"""
+
+import logging
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import ROUND_CEILING, Decimal
+from typing import Iterator, Optional
+
+import numpy as np
+from sqlalchemy import BigInteger, Integer, String, cast, func, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.models import AuditLog, Receipt, User, VerificationScore
+from app.services.kyc_scoring import (
+    SCORED_RECEIPT_FILTERS,
+    KYCScorer,
+    ScoringInputs,
+    _amount_outlier_sql,
+    _location_key_sql,
+    _merchant_key_sql,
+    _merchant_rule,
+    _trust_rules,
+    kyc_status_for,
+)
+from app.services.principal_cache import invalidate_on_commit
+
+logger = logging.getLogger(__name__)
+
+EPOCH = date(1970, 1, 1)
+UPSERT_BATCH = 1000
+# |fraction - 0.5| below this (in hundredths) may round differently in float
+TIE_TOLERANCE = 1e-6
+
+COMPONENTS = (
+    "document_quality_score",
+    "spending_pattern_score",
+    "consistency_score",
+    "diversity_score",
+)
+
+SCORE_FIELDS = (
+    "document_quality_score",
+    "spending_pattern_score",
+    "consistency_score",
+    "diversity_score",
+    "final_score",
+    "is_verified",
+    "total_receipts",
+    "total_spending",
+    "unique_companies",
+    "unique_locations",
+    "date_range_days",
+    "average_transaction_amount",
+)
+
+# One narrow row per scored receipt; numbers come back as integer cents,
+# hundredths and days so the sums below are exact. The user id is read as
+# text: building a UUID object per receipt row costs more than the query.
+_STREAM_COLUMNS = (
+    cast(Receipt.user_id, String).label("user_id"),
+    func.coalesce(_trust_rules(), False).label("trusted"),
+    func.coalesce(_merchant_rule(), False).label("named"),
+    _amount_outlier_sql().label("outlier"),
+    cast(Receipt.total_amount * 100, BigInteger).label("amount_cents"),
+    cast(Receipt.overall_confidence * 100, Integer).label("overall_conf"),
+    cast(Receipt.confidence_total * 100, Integer).label("total_conf"),
+    cast(Receipt.confidence_date * 100, Integer).label("date_conf"),
+    cast(Receipt.confidence_company * 100, Integer).label("company_conf"),
+    cast(Receipt.confidence_address * 100, Integer).label("address_conf"),
+    (Receipt.receipt_date - literal(EPOCH)).label("receipt_day"),
+    _merchant_key_sql().label("merchant_key"),
+    _location_key_sql().label("location_key"),
+)
+
+
+@dataclass
+class RescoreSummary:
+    users: int = 0
+    receipts: int = 0
+    chunks: int = 0
+    scores_written: int = 0
+    users_updated: int = 0
+    exact_fallbacks: int = 0
+    transitions: dict = field(default_factory=dict)
+    seconds: float = 0.0
+    dry_run: bool = False
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _hundredths(value) -> int:
+    return int((Decimal(str(value)) * 100).to_integral_value(ROUND_CEILING))
+
+
+def _near_tie(values: np.ndarray) -> np.ndarray:
+    scaled = values * 100
+    return np.abs(scaled - np.floor(scaled) - 0.5) < TIE_TOLERANCE
+
+
+def _to_decimal(hundredths) -> Decimal:
+    return Decimal(int(hundredths)).scaleb(-2)
+
+
+class ReceiptColumns:
+    """
+    Columnar copy of user-ordered scored receipt rows (as yielded by
+    ``stream_receipt_chunks``). Confidences are kept as hundredths with a
+    separate presence mask, so per-user sums can be taken under any trust
+    mask without going back to the database.
+    """
+
+    def __init__(self, rows: list):
+        (
+            user_col,
+            trusted,
+            named,
+            outlier,
+            cents,
+            overall,
+            total_conf,
+            date_conf,
+            company_conf,
+            address_conf,
+            days,
+            merchants,
+            locations,
+        ) = zip(*rows)
+        n = len(user_col)
+        self.row_count = n
+
+        users = np.array(user_col)
+        boundary = np.ones(n, dtype=bool)
+        boundary[1:] = users[1:] != users[:-1]
+        self.starts = np.flatnonzero(boundary)
+        self.user_ids = [uuid.UUID(user_col[i]) for i in self.starts]
+        self.row_user = (np.cumsum(boundary) - 1).astype(np.int32)
+        self.size = len(self.user_ids)
+
+        self.trusted = np.array(trusted, dtype=bool)
+        self.named = np.array(named, dtype=bool)
+        self.outlier = np.array(outlier, dtype=bool)
+        self.cents = np.array(cents, dtype=np.int64)
+        self.overall, self.overall_ok = _nullable(overall, np.int16)
+        self.total_conf, self.total_conf_ok = _nullable(total_conf, np.int16)
+        self.date_conf, self.date_conf_ok = _nullable(date_conf, np.int16)
+        self.company_conf, self.company_conf_ok = _nullable(company_conf, np.int16)
+        self.address_conf, self.address_conf_ok = _nullable(address_conf, np.int16)
+        self.days, self.days_ok = _nullable(days, np.int32)
+
+        self.company_pair, self.company_pair_user = self._pairs(merchants)
+        self.address_pair, self.address_pair_user = self._pairs(locations)
+
+    def _pairs(self, column) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Dense id per distinct (user, value) pair (-1 for None / ""), plus the
+        user of each pair, so distinct counts under a mask are two bincounts.
+        """
+        codes: dict = {None: 0, "": 0}
+        coded = np.fromiter(
+            (codes.setdefault(value, len(codes) - 1) for value in column),
+            dtype=np.int64,
+            count=self.row_count,
+        )
+        present = coded > 0
+        keys = self.row_user.astype(np.int64) * len(codes) + coded
+        unique, inverse = np.unique(keys[present], return_inverse=True)
+        pair = np.full(self.row_count, -1, dtype=np.int32)
+        pair[present] = inverse
+        return pair, (unique // len(codes)).astype(np.int32)
+
+    @classmethod
+    def concat(cls, parts: list["ReceiptColumns"]) -> "ReceiptColumns":
+        """Join chunks into one snapshot; a user never spans two chunks."""
+        merged = cls.__new__(cls)
+        merged.row_count = sum(p.row_count for p in parts)
+        merged.size = sum(p.size for p in parts)
+        merged.user_ids = [user_id for p in parts for user_id in p.user_ids]
+
+        row_offset = user_offset = company_offset = address_offset = 0
+        starts, row_user = [], []
+        company_pair, company_pair_user, address_pair, address_pair_user = [], [], [], []
+        for p in parts:
+            starts.append(p.starts + row_offset)
+            row_user.append(p.row_user + user_offset)
+            company_pair.append(np.where(p.company_pair >= 0, p.company_pair + company_offset, -1))
+            company_pair_user.append(p.company_pair_user + user_offset)
+            address_pair.append(np.where(p.address_pair >= 0, p.address_pair + address_offset, -1))
+            address_pair_user.append(p.address_pair_user + user_offset)
+            row_offset += p.row_count
+            user_offset += p.size
+            company_offset += len(p.company_pair_user)
+            address_offset += len(p.address_pair_user)
+
+        merged.starts = np.concatenate(starts)
+        merged.row_user = np.concatenate(row_user).astype(np.int32)
+        merged.company_pair = np.concatenate(company_pair).astype(np.int32)
+        merged.company_pair_user = np.concatenate(company_pair_user).astype(np.int32)
+        merged.address_pair = np.concatenate(address_pair).astype(np.int32)
+        merged.address_pair_user = np.concatenate(address_pair_user).astype(np.int32)
+        for name in (
+            "trusted",
+            "named",
+            "outlier",
+            "cents",
+            "overall",
+            "overall_ok",
+            "total_conf",
+            "total_conf_ok",
+            "date_conf",
+            "date_conf_ok",
+            "company_conf",
+            "company_conf_ok",
+            "address_conf",
+            "address_conf_ok",
+            "days",
+            "days_ok",
+        ):
+            setattr(merged, name, np.concatenate([getattr(p, name) for p in parts]))
+        return merged
+
+    @property
+    def nbytes(self) -> int:
+        return sum(v.nbytes for v in vars(self).values() if isinstance(v, np.ndarray))
+
+    def sums(self, trusted: Optional[np.ndarray] = None) -> "UserSums":
+        return UserSums(self, self.trusted if trusted is None else trusted)
+
+
+def _nullable(column, dtype) -> tuple[np.ndarray, np.ndarray]:
+    raw = np.array(column, dtype=float)  # None -> nan
+    ok = ~np.isnan(raw)
+    return np.nan_to_num(raw).astype(dtype), ok
+
+
+class UserSums:
+    """Per-user scoring sums over the receipts selected by ``trusted``."""
+
+    def __init__(self, cols: ReceiptColumns, trusted: np.ndarray):
+        self.size = cols.size
+        self.starts = cols.starts
+
+        self.receipt_count = self._sum(trusted)
+        self.total_cents = self._sum(np.where(trusted, cols.cents, 0))
+        self.overall_sum, self.overall_count = self._conf_sums(cols.overall, cols.overall_ok & trusted)
+        ct_ok = cols.total_conf_ok & trusted
+        self.conf_amount_cents = self._sum(np.where(ct_ok, cols.cents, 0))
+        self.conf_amount_count = self._sum(ct_ok)
+        # Units of 1/10000 KES: hundredths of confidence times cents
+        self.conf_weighted = self._sum(np.where(ct_ok, cols.total_conf * cols.cents, 0))
+        self.date_conf_sum, self.date_conf_count = self._conf_sums(
+            cols.date_conf, cols.date_conf_ok & trusted
+        )
+        self.company_conf_sum, self.company_conf_count = self._conf_sums(
+            cols.company_conf, cols.company_conf_ok & trusted
+        )
+        self.address_conf_sum, self.address_conf_count = self._conf_sums(
+            cols.address_conf, cols.address_conf_ok & trusted
+        )
+
+        d_ok = cols.days_ok & trusted
+        self.date_count = self._sum(d_ok)
+        big = np.iinfo(np.int32).max
+        self.min_day = np.minimum.reduceat(np.where(d_ok, cols.days, big), self.starts)
+        self.max_day = np.maximum.reduceat(np.where(d_ok, cols.days, -big), self.starts)
+        self.date_range = np.where(self.date_count > 0, self.max_day.astype(np.int64) - self.min_day, 0)
+
+        self.unique_companies = self._distinct(cols.company_pair, cols.company_pair_user, trusted)
+        self.unique_locations = self._distinct(cols.address_pair, cols.address_pair_user, trusted)
+
+    def _sum(self, values: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(values, self.starts, dtype=np.int64)
+
+    def _conf_sums(self, values, ok) -> tuple[np.ndarray, np.ndarray]:
+        return self._sum(np.where(ok, values, 0)), self._sum(ok)
+
+    def _distinct(self, pair: np.ndarray, pair_user: np.ndarray, trusted: np.ndarray) -> np.ndarray:
+        keep = trusted & (pair >= 0)
+        seen = np.bincount(pair[keep], minlength=len(pair_user)) > 0
+        return np.bincount(pair_user[seen], minlength=self.size)
+
+    def inputs(self, i: int) -> ScoringInputs:
+        """Exact Decimal inputs for user ``i`` (used for the tie fallback)."""
+        has_dates = self.date_count[i] > 0
+        return ScoringInputs(
+            receipt_count=int(self.receipt_count[i]),
+            total_spending=_to_decimal(self.total_cents[i]),
+            overall_conf_sum=_to_decimal(self.overall_sum[i]),
+            overall_conf_count=int(self.overall_count[i]),
+            conf_amount_sum=_to_decimal(self.conf_amount_cents[i]),
+            conf_amount_count=int(self.conf_amount_count[i]),
+            conf_weighted_amount_sum=Decimal(int(self.conf_weighted[i])).scaleb(-4),
+            date_count=int(self.date_count[i]),
+            min_receipt_date=EPOCH + timedelta(days=int(self.min_day[i])) if has_dates else None,
+            max_receipt_date=EPOCH + timedelta(days=int(self.max_day[i])) if has_dates else None,
+            date_conf_sum=_to_decimal(self.date_conf_sum[i]),
+            date_conf_count=int(self.date_conf_count[i]),
+            company_conf_sum=_to_decimal(self.company_conf_sum[i]),
+            company_conf_count=int(self.company_conf_count[i]),
+            address_conf_sum=_to_decimal(self.address_conf_sum[i]),
+            address_conf_count=int(self.address_conf_count[i]),
+            unique_companies=int(self.unique_companies[i]),
+            unique_locations=int(self.unique_locations[i]),
+        )
+
+
+def _mean_conf(total: np.ndarray, count: np.ndarray) -> np.ndarray:
+    # Average of hundredths as a 0-1 confidence; 0.50 when nothing was read
+    safe = np.maximum(count, 1)
+    return np.where(count > 0, total / safe / 100, 0.5)
+
+
+def component_scores(sums: UserSums) -> dict[str, np.ndarray]:
+    """
+    The four ``KYCScorer`` components (unrounded float64) plus the average
+    transaction amount for every user at once.
+    """
+    n = sums.receipt_count
+    has = n > 0
+
+    # Document quality
+    doc = np.where(
+        sums.overall_count > 0,
+        np.minimum(sums.overall_sum / np.maximum(sums.overall_count, 1), 100.0),
+        0.0,
+    )
+
+    # Spending pattern
+    total_conf = np.where(
+        (sums.conf_amount_count > 0) & (sums.conf_amount_cents > 0),
+        sums.conf_weighted / np.maximum(sums.conf_amount_cents, 1) / 100,
+        0.5,
+    )
+    cents = sums.total_cents
+    spending_score = np.select(
+        [cents >= 10_000_000, cents >= 5_000_000, cents >= 2_500_000],
+        [60.0, 45.0, 30.0],
+        default=cents / 100 / 1000 * 0.6,
+    )
+    frequency_score = np.select([n >= 20, n >= 10, n >= 5], [40.0, 30.0, 20.0], default=n * 4.0)
+    spending = np.minimum((spending_score + frequency_score) * total_conf, 100.0)
+
+    # Consistency
+    span = sums.date_range
+    consistent = has & (sums.date_count >= 2) & (span > 0)
+    per_week = n / np.maximum(span, 1) * 7
+    consistency = np.select(
+        [per_week >= 2, per_week >= 1, per_week >= 0.5], [100.0, 75.0, 50.0], default=per_week * 50
+    )
+    consistency = np.select(
+        [span >= 90, span >= 60],
+        [np.minimum(consistency + 10, 100.0), np.minimum(consistency + 5, 100.0)],
+        default=consistency,
+    )
+    date_conf = _mean_conf(sums.date_conf_sum, sums.date_conf_count)
+    consistency = np.minimum(consistency * np.maximum(date_conf, 0.5), 100.0)
+    consistency = np.where(consistent, consistency, 0.0)
+
+    # Diversity
+    uc, ul = sums.unique_companies, sums.unique_locations
+    company_score = np.select([uc >= 5, uc >= 3, uc >= 2], [60.0, 45.0, 30.0], default=15.0)
+    location_score = np.select([ul >= 3, ul >= 2], [40.0, 25.0], default=10.0)
+    avg_conf = (
+        _mean_conf(sums.company_conf_sum, sums.company_conf_count)
+        + _mean_conf(sums.address_conf_sum, sums.address_conf_count)
+    ) / 2
+    diversity = np.minimum((company_score + location_score) * avg_conf, 100.0)
+
+    return {
+        "document_quality_score": np.where(has, doc, 0.0),
+        "spending_pattern_score": np.where(has, spending, 0.0),
+        "consistency_score": consistency,
+        "diversity_score": np.where(has, diversity, 0.0),
+        "average_transaction_amount": np.where(has, cents / np.maximum(n, 1) / 100, 0.0),
+    }
+
+
+def current_weights() -> tuple[float, float, float, float]:
+    """Component weights in COMPONENTS order."""
+    return (
+        float(settings.WEIGHT_DOCUMENT_QUALITY),
+        float(settings.WEIGHT_SPENDING_PATTERN),
+        float(settings.WEIGHT_CONSISTENCY),
+        float(settings.WEIGHT_DIVERSITY),
+    )
+
+
+def vector_scores(sums: UserSums) -> dict[str, np.ndarray]:
+    """
+    ``KYCScorer._score_data`` for every user at once. Returns unrounded
+    float values plus ``ambiguous``: users whose rounding cannot be trusted
+    in float and must go through the Decimal path.
+    """
+    scores = component_scores(sums)
+    scores["final_score"] = sum(
+        scores[name] * weight for name, weight in zip(COMPONENTS, current_weights())
+    )
+
+    ambiguous = np.zeros(sums.size, dtype=bool)
+    for values in scores.values():
+        ambiguous |= _near_tie(values)
+    scores["ambiguous"] = ambiguous
+    return scores
+
+
+def stream_receipt_chunks(db: Session, chunk_rows: int) -> Iterator[ReceiptColumns]:
+    """
+    Stream every scored receipt ordered by user, cut only at user
+    boundaries so each user's receipts land in exactly one chunk.
+    """
+    stmt = (
+        select(*_STREAM_COLUMNS)
+        .where(*SCORED_RECEIPT_FILTERS)
+        .order_by(Receipt.user_id)
+    )
+    # A separate connection keeps the server-side cursor open while the
+    # session commits between chunks
+    with db.get_bind().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(stmt)
+        carry: list = []
+        for rows in result.partitions():
+            rows = carry + rows
+            cut = len(rows) - 1
+            last_user = rows[cut].user_id
+            while cut > 0 and rows[cut - 1].user_id == last_user:
+                cut -= 1
+            if cut == 0:
+                carry = rows
+                continue
+            carry = rows[cut:]
+            yield ReceiptColumns(rows[:cut])
+        if carry:
+            yield ReceiptColumns(carry)
+
+
+class BulkRescorer:
+    """Rescore every user with scored receipts under the current settings."""
+
+    def __init__(self, db: Session, chunk_rows: int = settings.RESCORE_CHUNK_ROWS):
+        self.db = db
+        self.chunk_rows = chunk_rows
+        self.threshold = _hundredths(settings.VERIFICATION_THRESHOLD)
+
+    def score_chunk(self, chunk: ReceiptColumns) -> tuple[list[dict], int]:
+        """Score rows (keyed like ``_score_data``) plus the number of exact fallbacks."""
+        sums = chunk.sums()
+        vec = vector_scores(sums)
+        rounded = {
+            name: np.rint(vec[name] * 100).astype(np.int64)
+            for name in (*COMPONENTS, "final_score", "average_transaction_amount")
+        }
+        exact = KYCScorer(self.db)
+        rows, fallbacks = [], 0
+        for i, user_id in enumerate(chunk.user_ids):
+            if vec["ambiguous"][i]:
+                fallbacks += 1
+                data = exact._score_data(sums.inputs(i))
+            else:
+                data = {name: _to_decimal(values[i]) for name, values in rounded.items()}
+                count = int(sums.receipt_count[i])
+                data.update(
+                    is_verified=bool(count) and int(rounded["final_score"][i]) >= self.threshold,
+                    total_receipts=count,
+                    total_spending=_to_decimal(sums.total_cents[i]),
+                    unique_companies=int(sums.unique_companies[i]) if count else 0,
+                    unique_locations=int(sums.unique_locations[i]) if count else 0,
+                    date_range_days=int(sums.date_range[i]) if count else 0,
+                )
+            data["user_id"] = user_id
+            rows.append(data)
+        return rows, fallbacks
+
+    def _user_updates(self, rows: list[dict], transitions: Counter) -> list[dict]:
+        """Mirror ``KYCScorer._persist_score``; only changed users are returned."""
+        current = {
+            user_id: (status, score, verified_at)
+            for user_id, status, score, verified_at in self.db.query(
+                User.id, User.kyc_status, User.kyc_score, User.verification_date
+            ).filter(User.id.in_([row["user_id"] for row in rows]))
+        }
+        now = datetime.utcnow()
+        updates = []
+        for row in rows:
+            if row["user_id"] not in current:
+                continue
+            old_status, old_score, verified_at = current[row["user_id"]]
+            score = row["final_score"]
+            status = kyc_status_for(score, row["is_verified"])
+            if status == "verified":
+                verified_at = verified_at or now
+            transitions[f"{old_status}->{status}"] += 1
+            if status != old_status or old_score is None or Decimal(old_score) != score:
+                updates.append(
+                    {
+                        "id": row["user_id"],
+                        "kyc_score": score,
+                        "kyc_status": status,
+                        "verification_date": verified_at,
+                    }
+                )
+        return updates
+
+    def _upsert_scores(self, rows: list[dict]) -> set:
+        """Write the scores; returns the users whose stored score row changed."""
+        # executemany: compiled once, sent as multi-row VALUES pages.
+        # Unchanged rows are skipped by the conflict WHERE and not returned.
+        now = datetime.utcnow()
+        table = VerificationScore.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={name: stmt.excluded[name] for name in (*SCORE_FIELDS, "calculated_at")},
+            where=tuple_(*(table.c[name] for name in SCORE_FIELDS)).is_distinct_from(
+                tuple_(*(stmt.excluded[name] for name in SCORE_FIELDS))
+            ),
+        ).returning(table.c.user_id)
+        changed = set()
+        for start in range(0, len(rows), UPSERT_BATCH):
+            batch = [
+                {**row, "id": uuid.uuid4(), "calculated_at": now}
+                for row in rows[start:start + UPSERT_BATCH]
+            ]
+            changed.update(self.db.execute(stmt, batch).scalars())
+        return changed
+
+    def _bump_versions(self, user_ids) -> None:
+        # Same invalidation KYCScorer._persist_score does for cached score reads
+        user_ids = sorted(user_ids)
+        for start in range(0, len(user_ids), UPSERT_BATCH):
+            self.db.execute(
+                update(User)
+                .where(User.id.in_(user_ids[start:start + UPSERT_BATCH]))
+                .values(receipts_version=User.receipts_version + 1)
+                .execution_options(synchronize_session=False)
+            )
+
+    def run(self, dry_run: bool = False) -> RescoreSummary:
+        summary = RescoreSummary(dry_run=dry_run)
+        transitions: Counter = Counter()
+        started = time.perf_counter()
+
+        for chunk in stream_receipt_chunks(self.db, self.chunk_rows):
+            scores, fallbacks = self.score_chunk(chunk)
+            updates = self._user_updates(scores, transitions)
+
+            summary.chunks += 1
+            summary.receipts += chunk.row_count
+            summary.users += chunk.size
+            summary.exact_fallbacks += fallbacks
+            if dry_run:
+                continue
+
+            changed = self._upsert_scores(scores)
+            if updates:
+                self.db.execute(update(User), updates)
+            touched = changed | {row["id"] for row in updates}
+            self._bump_versions(touched)
+            invalidate_on_commit(self.db, *touched)
+            self.db.commit()
+            summary.scores_written += len(scores)
+            summary.users_updated += len(updates)
+            logger.info(
+                "BulkRescorer: chunk %d users=%d receipts=%d updated=%d",
+                summary.chunks,
+                chunk.size,
+                chunk.row_count,
+                len(updates),
+            )
+
+        summary.transitions = dict(sorted(transitions.items()))
+        summary.seconds = round(time.perf_counter() - started, 3)
+        return summary
+
+
+def run_bulk_rescore(
+    requested_by: Optional[str] = None,
+    dry_run: bool = False,
+    chunk_rows: int = settings.RESCORE_CHUNK_ROWS,
+) -> RescoreSummary:
+    """Rescore everyone in a fresh session and record the summary in audit_logs."""
+    db = SessionLocal()
+    try:
+        summary = BulkRescorer(db, chunk_rows=chunk_rows).run(dry_run=dry_run)
+        db.add(
+            AuditLog(
+                user_id=requested_by,
+                action_type="bulk_rescore",
+                entity_type="verification_scores",
+                action_description=(
+                    f"{'Dry run: ' if dry_run else ''}rescored {summary.users} users "
+                    f"from {summary.receipts} receipts in {summary.seconds}s"
+                ),
+                new_value=summary.as_dict(),
+            )
+        )
+        db.commit()
+        logger.info("BulkRescorer: %s", summary.as_dict())
+        return summary
+    except Exception:
+        db.rollback()
+        logger.exception("BulkRescorer: rescoring failed")
+        raise
+    finally:
+        db.close()
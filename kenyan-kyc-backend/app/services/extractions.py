@@ -0,0 +1,71 @@
+"""
+Receipt extractions - the model's token-level output, kept off the receipts row
+
+``predict()`` returns the extracted fields along with every token, its
+label and the decoded text: several KB per receipt that nothing but
+debugging and retraining reads. ``receipts.raw_extraction_json`` keeps the
+fields as the model returned them (before they are cleaned into the typed
+columns) plus the token count; the tokens, labels and text are stored as
+zlib-compressed JSON in ``receipt_extractions``
+(migrations/015_receipt_extractions.sql) and read back only by
+``load_extraction`` (GET /receipts/{id}/extraction).
+
+Every receipts row the scorer, the listings and the admin pages load is a
+few hundred bytes instead of a TOASTed JSON document, and inserts no
+longer maintain a GIN index over every token.
+"""
+
+import json
+import zlib
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.models import Receipt, ReceiptExtraction
+
+# predict() keys that go to the side table
+BULKY_KEYS = ("raw_tokens", "raw_labels", "raw_text")
+
+
+def split_extraction(parsed: dict) -> tuple[dict, Optional[dict]]:
+    """The inline summary and the bulky rest (None if empty) of a JSON-safe predict() result."""
+    summary = {key: value for key, value in parsed.items() if key not in BULKY_KEYS}
+    bulky = {key: parsed[key] for key in BULKY_KEYS if key in parsed}
+    if isinstance(parsed.get("raw_tokens"), list):
+        summary["token_count"] = len(parsed["raw_tokens"])
+    return summary, bulky or None
+
+
+def pack(bulky: dict) -> tuple[bytes, int]:
+    """Compressed payload and uncompressed size of the bulky part."""
+    raw = json.dumps(bulky, separators=(",", ":"), ensure_ascii=False).encode()
+    return zlib.compress(raw, 6), len(raw)
+
+
+def unpack(payload: bytes) -> dict:
+    return json.loads(zlib.decompress(payload))
+
+
+def store_extraction(db: Session, receipt: Receipt, parsed: dict) -> None:
+    """
+    Keep a JSON-safe predict() result for ``receipt``: the summary inline,
+    the rest in a side row added to the caller's transaction.
+    """
+    summary, bulky = split_extraction(parsed)
+    receipt.raw_extraction_json = summary
+    if bulky is not None:
+        payload, raw_bytes = pack(bulky)
+        db.add(ReceiptExtraction(receipt_id=receipt.id, payload=payload, raw_bytes=raw_bytes))
+
+
+def load_extraction(db: Session, receipt: Receipt) -> Optional[dict]:
+    """The receipt's full predict() result, as it was before the split."""
+    if receipt.raw_extraction_json is None:
+        return None
+    extraction = dict(receipt.raw_extraction_json)
+    side = db.get(ReceiptExtraction, receipt.id)
+    if side is not None:
+        extraction.pop("token_count", None)
+        extraction.update(unpack(side.payload))
+    # Rows not yet moved by app.scripts.migrate_extractions hold it all inline
+    return extraction
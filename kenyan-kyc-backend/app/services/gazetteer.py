@@ -0,0 +1,167 @@
+"""
+Kenyan locality gazetteer - extracted receipt addresses to locality ids
+
+``app/data/kenya_localities.csv`` lists the 47 counties (ids are the
+official county codes), towns and Nairobi neighbourhoods, and major malls,
+each with aliases and its parent locality. All names are compiled into one
+Aho-Corasick automaton, so an address is matched in a single pass over its
+characters however large the gazetteer grows, with no network access.
+
+Names are matched on whole words (text is lowercased, apostrophes dropped
+and any other non-alphanumeric run collapsed to one space). When several
+localities occur in one address the most specific wins - mall over town
+over county, then the longest name - so "Sarit Centre, Westlands,
+Nairobi" resolves to the mall and "Ngong Road" to the Nairobi road rather
+than Ngong town.
+"""
+
+import csv
+import re
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+GAZETTEER_PATH = Path(__file__).resolve().parent.parent / "data" / "kenya_localities.csv"
+
+# Higher is more specific
+KIND_RANK = {"county": 0, "town": 1, "mall": 2}
+
+_APOSTROPHES_RE = re.compile(r"['’`]")
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_place_text(value: str) -> str:
+    """Lowercased words separated (and surrounded) by single spaces."""
+    words = _NON_ALNUM_RE.sub(" ", _APOSTROPHES_RE.sub("", value.lower())).strip()
+    return f" {words} " if words else ""
+
+
+@dataclass(frozen=True)
+class Locality:
+    id: int
+    kind: str
+    name: str
+    parent_id: Optional[int]
+
+    @property
+    def rank(self) -> int:
+        return KIND_RANK[self.kind]
+
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher: matches of every pattern in a text in
+    time linear in the text plus the number of matches.
+    """
+
+    def __init__(self, patterns: Iterable[tuple[str, object]]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[int, object]]] = [[]]
+
+        for pattern, value in patterns:
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(pattern), value))
+
+        # Breadth-first so a state's failure link is final before its
+        # children's; depth-one states fail to the root
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, int, object]]:
+        """(start, end, value) for every occurrence, overlapping ones included."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in out[state]:
+                yield end - length, end, value
+
+
+class Gazetteer:
+    """Localities by id plus the automaton over their names and aliases."""
+
+    def __init__(self, localities: Iterable[Locality], names: Iterable[tuple[str, int]]):
+        self.localities = {locality.id: locality for locality in localities}
+        patterns = {}
+        for name, locality_id in names:
+            normalized = normalize_place_text(name)
+            if normalized:
+                patterns.setdefault(normalized, set()).add(locality_id)
+        self.automaton = AhoCorasick(
+            (pattern, tuple(sorted(ids))) for pattern, ids in patterns.items()
+        )
+
+    @classmethod
+    def load(cls, path: Path = GAZETTEER_PATH) -> "Gazetteer":
+        localities, names = [], []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                locality = Locality(
+                    id=int(row["id"]),
+                    kind=row["kind"],
+                    name=row["name"],
+                    parent_id=int(row["parent_id"]) if row["parent_id"] else None,
+                )
+                if locality.kind not in KIND_RANK:
+                    raise RuntimeError(f"Unknown locality kind in {path.name}: {locality.kind}")
+                localities.append(locality)
+                names.append((locality.name, locality.id))
+                names.extend((alias, locality.id) for alias in row["aliases"].split("|") if alias)
+        return cls(localities, names)
+
+    def __len__(self) -> int:
+        return len(self.localities)
+
+    def get(self, locality_id: Optional[int]) -> Optional[Locality]:
+        return self.localities.get(locality_id)
+
+    def match(self, address: Optional[str]) -> Optional[Locality]:
+        """Most specific locality named in an address, or None."""
+        if not address:
+            return None
+        best, best_key = None, None
+        for start, end, ids in self.automaton.iter_matches(normalize_place_text(address)):
+            for locality_id in ids:
+                locality = self.localities[locality_id]
+                # Most specific kind, then longest name, then earliest in the text
+                key = (locality.rank, end - start, -start, -locality_id)
+                if best_key is None or key > best_key:
+                    best, best_key = locality, key
+        return best
+
+    def match_id(self, address: Optional[str]) -> Optional[int]:
+        locality = self.match(address)
+        return locality.id if locality is not None else None
+
+    def county_of(self, locality_id: Optional[int]) -> Optional[Locality]:
+        locality = self.get(locality_id)
+        while locality is not None and locality.parent_id is not None:
+            locality = self.get(locality.parent_id)
+        return locality
+
+
+gazetteer = Gazetteer.load()
@@ -0,0 +1,192 @@
+"""
+Receipt Image Processing
+
+- Upload normalization: an optional ingest stage that rewrites image
+  uploads as one canonical, compressed copy (orientation applied, EXIF
+  and other metadata stripped, resolution capped) used for OCR and viewing.
+- Derivatives: small WebP renditions of each stored blob for list views
+  and previews. They are keyed by the source blob's content hash, so once
+  written they never change and can be cached by clients indefinitely.
+"""
+
+import io
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.storage import StoredBlob, blob_store, cold_store, storage_backend
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each derivative
+DERIVATIVE_SIZES = {
+    "thumb": 320,
+    "preview": 1280,
+}
+DERIVATIVE_MEDIA_TYPE = "image/webp"
+WEBP_QUALITY = 78
+
+NORMALIZED_MEDIA_TYPES = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+
+# -------------------------------------------------
+# Upload normalization
+# -------------------------------------------------
+class ImageTooLarge(ValueError):
+    """An upload that decodes to more pixels than Pillow's MAX_IMAGE_PIXELS."""
+
+
+def normalize_image(
+    fileobj: BinaryIO,
+    max_dim: int,
+    fmt: str = "webp",
+    quality: int = 82,
+) -> Optional[bytes]:
+    """
+    Return the canonical encoding of an uploaded image, or None when the
+    upload is not a raster image Pillow can decode (e.g. PDF). Raises
+    ImageTooLarge for decompression bombs.
+    """
+    try:
+        with Image.open(fileobj) as img:
+            img.draft("RGB", (max_dim, max_dim))
+            img = ImageOps.exif_transpose(img)
+
+            if img.mode in ("RGBA", "LA", "P"):
+                # Screenshots with transparency: flatten onto white paper
+                rgba = img.convert("RGBA")
+                img = Image.new("RGB", rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.getchannel("A"))
+            elif img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+
+            img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+
+            # Nothing from the source (EXIF, ICC, XMP) is passed to save()
+            out = io.BytesIO()
+            if fmt == "jpeg":
+                img.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+            else:
+                img.save(out, format="WEBP", quality=quality, method=4)
+            return out.getvalue()
+    except Image.DecompressionBombError as e:
+        # Not an OSError: would otherwise surface as a 500
+        raise ImageTooLarge(str(e)) from e
+    except (UnidentifiedImageError, OSError) as e:
+        # Not an image, or truncated/corrupt: store the upload untouched
+        logger.info("Upload not normalized: %s", e)
+        return None
+
+
+@dataclass(frozen=True)
+class IngestedFile:
+    blob: StoredBlob
+    media_type: Optional[str]
+    original: Optional[StoredBlob] = None
+
+
+def ingest_upload(
+    fileobj: BinaryIO, content_type: Optional[str] = None, db: Optional[Session] = None
+) -> IngestedFile:
+    """
+    Store an upload. With NORMALIZE_UPLOADS enabled, image uploads are
+    replaced by their canonical encoding and the raw bytes are kept in the
+    cold tier or dropped according to ORIGINAL_RETENTION. ``db`` is the
+    session that will add the references (see ``ContentAddressedStore.save``).
+    """
+    if not settings.NORMALIZE_UPLOADS:
+        return IngestedFile(blob_store.save(fileobj, content_type=content_type, db=db), content_type)
+
+    fmt = settings.NORMALIZE_FORMAT.lower()
+    canonical = normalize_image(
+        fileobj,
+        max_dim=settings.NORMALIZE_MAX_DIMENSION,
+        fmt=fmt,
+        quality=settings.NORMALIZE_QUALITY,
+    )
+    fileobj.seek(0)
+
+    if canonical is None:
+        return IngestedFile(blob_store.save(fileobj, content_type=content_type, db=db), content_type)
+
+    original = None
+    if settings.ORIGINAL_RETENTION.lower() == "cold":
+        original = cold_store.save(fileobj, content_type=content_type, db=db)
+
+    media_type = NORMALIZED_MEDIA_TYPES.get(fmt, "image/webp")
+    blob = blob_store.save(io.BytesIO(canonical), content_type=media_type, db=db)
+    return IngestedFile(blob, media_type, original)
+
+
+# -------------------------------------------------
+# Derivatives
+# -------------------------------------------------
+def derivative_key(content_hash: str, size: str) -> str:
+    return f"derivatives/{size}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.webp"
+
+
+def render_derivative(src_path: str, max_dim: int) -> bytes:
+    """Decode ``src_path`` and return a WebP no larger than ``max_dim`` on either edge."""
+    with Image.open(src_path) as img:
+        # JPEG can decode directly at a reduced scale, which is far cheaper
+        # than decoding the full image and resizing afterwards
+        img.draft("RGB", (max_dim, max_dim))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGB")
+        img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+
+        out = io.BytesIO()
+        img.save(out, format="WEBP", quality=WEBP_QUALITY, method=4)
+        return out.getvalue()
+
+
+def ensure_derivative(content_hash: str, size: str) -> Optional[str]:
+    """
+    Return the storage key of the ``size`` derivative for a blob, rendering
+    and caching it first if needed. Returns None for sources that are not
+    images (e.g. PDFs), so callers can fall back to the original.
+    """
+    key = derivative_key(content_hash, size)
+    if storage_backend.exists(key):
+        return key
+
+    if not blob_store.exists(content_hash):
+        # Source archived (or removed): callers fall back to the original
+        return None
+
+    try:
+        with blob_store.local_path(content_hash) as src_path:
+            data = render_derivative(src_path, DERIVATIVE_SIZES[size])
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        logger.info("No %s derivative for blob %s: %s", size, content_hash, e)
+        return None
+
+    fd, tmp_path = tempfile.mkstemp(dir=blob_store.tmp_dir)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    storage_backend.put_file(key, tmp_path, content_type=DERIVATIVE_MEDIA_TYPE)
+    return key
+
+
+def generate_derivatives(content_hash: str) -> None:
+    """Render every derivative size at ingest; failures are non-fatal."""
+    for size in DERIVATIVE_SIZES:
+        try:
+            ensure_derivative(content_hash, size)
+        except Exception as e:
+            logger.warning("Derivative %s failed for blob %s: %s", size, content_hash, e)
+
+
+def remove_derivatives(content_hash: str) -> None:
+    for size in DERIVATIVE_SIZES:
+        storage_backend.delete(derivative_key(content_hash, size))
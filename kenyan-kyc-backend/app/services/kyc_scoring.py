@@ -1,10 +1,18 @@
 from decimal import Decimal
-from datetime import datetime
+from datetime import date, datetime
+from dataclasses import dataclass, fields
+from typing import Optional
+import hashlib
 import logging
-from sqlalchemy.orm import Session
+import uuid
+from sqlalchemy import String, and_, case, cast, false, func, literal, not_, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, load_only
 
-from app.models.models import User, Receipt, VerificationScore
+from app.models.models import User, Receipt, UserReceiptAggregate, VerificationScore
 from app.core.config import settings
+from app.services.amount_outliers import AmountSketch, outlier_score
+from app.services.principal_cache import invalidate_on_commit
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +25,342 @@ MAX_SINGLE_RECEIPT_KES = (
     Decimal(str(_max_single_raw)) if _max_single_raw is not None else None
 )
 
+# Per-user outlier cut on receipts.amount_outlier_score (None = off)
+AMOUNT_OUTLIER_Z = (
+    Decimal(str(settings.AMOUNT_OUTLIER_Z)) if settings.AMOUNT_OUTLIER_Z else None
+)
+
+# Aggregate rows built under different filter thresholds are rebuilt
+# (VARCHAR(64))
+RULES_KEY = (
+    f"conf>={MIN_RECEIPT_CONFIDENCE};max={MAX_SINGLE_RECEIPT_KES};z={AMOUNT_OUTLIER_Z};"
+    "keys=merchant,locality"
+)
+
+# Everything a stored score depends on besides the user's receipts
+SCORING_CONFIG_KEY = hashlib.sha256(
+    (
+        f"{RULES_KEY};w={settings.WEIGHT_DOCUMENT_QUALITY},{settings.WEIGHT_SPENDING_PATTERN},"
+        f"{settings.WEIGHT_CONSISTENCY},{settings.WEIGHT_DIVERSITY};"
+        f"threshold={settings.VERIFICATION_THRESHOLD}"
+    ).encode()
+).hexdigest()[:16]
+
+# Unverified users at or above this score wait for manual review
+UNDER_REVIEW_SCORE = Decimal("60.00")
+
+
+def _dec(value) -> Optional[Decimal]:
+    # Numeric columns already load as Decimal; only floats need the str() hop
+    if value is None or isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def kyc_status_for(final_score: Decimal, is_verified: bool) -> str:
+    if is_verified:
+        return "verified"
+    if final_score >= UNDER_REVIEW_SCORE:
+        return "under_review"
+    return "pending"
+
+
+def merchant_key(r) -> Optional[str]:
+    """
+    What diversity counts as one merchant: the canonical merchant id, or the
+    raw company name for receipts not resolved yet.
+    """
+    if r.merchant_id is not None:
+        return f"#{r.merchant_id}"
+    return r.company_name or None
+
+
+def location_key(r) -> Optional[str]:
+    """
+    What diversity counts as one location: the gazetteer locality id, or
+    the raw address for addresses that name no known locality.
+    """
+    if r.locality_id is not None:
+        return f"@{r.locality_id}"
+    return r.receipt_address or None
+
+
+def is_amount_outlier(score) -> bool:
+    return AMOUNT_OUTLIER_Z is not None and score is not None and _dec(score) > AMOUNT_OUTLIER_Z
+
+
+def receipt_drop_reasons(r) -> list[str]:
+    """Why a completed receipt is excluded from scoring (empty list = trusted)."""
+    reasons = []
+
+    # 0) Missing or placeholder company name
+    if not r.company_name or str(r.company_name).strip().lower() in (
+        "unknown",
+        "n/a",
+    ):
+        reasons.append("missing_company_name")
+
+    # 1) Confidence filter
+    conf = _dec(r.overall_confidence) or Decimal("0")
+    if conf < MIN_RECEIPT_CONFIDENCE:
+        reasons.append(
+            f"low_confidence ({float(conf):.3f} < {float(MIN_RECEIPT_CONFIDENCE):.3f})"
+        )
+
+    # 2) Outlier filter on total amount
+    if (
+        MAX_SINGLE_RECEIPT_KES is not None
+        and r.total_amount is not None
+        and _dec(r.total_amount) > MAX_SINGLE_RECEIPT_KES
+    ):
+        reasons.append(
+            f"outlier_amount ({r.total_amount} > {float(MAX_SINGLE_RECEIPT_KES):.0f})"
+        )
+
+    # 3) Outlier against the user's own spending history
+    if is_amount_outlier(r.amount_outlier_score):
+        reasons.append(
+            f"unusual_amount_for_user (z={r.amount_outlier_score} > {AMOUNT_OUTLIER_Z})"
+        )
+
+    return reasons
+
+
+@dataclass(frozen=True)
+class ReceiptContribution:
+    """The fields of one scored receipt that feed the per-user aggregates."""
+
+    receipt_id: str
+    trusted: bool
+    amount: Decimal
+    overall_confidence: Optional[Decimal]
+    confidence_total: Optional[Decimal]
+    confidence_date: Optional[Decimal]
+    confidence_company: Optional[Decimal]
+    confidence_address: Optional[Decimal]
+    receipt_date: Optional[date]
+    merchant_key: Optional[str]
+    location_key: Optional[str]
+
+    @classmethod
+    def of(cls, r) -> Optional["ReceiptContribution"]:
+        """None for receipts scoring never looks at (not completed, no total)."""
+        if r.status != "completed" or r.total_amount is None:
+            return None
+        return cls(
+            receipt_id=str(r.id),
+            trusted=not receipt_drop_reasons(r),
+            amount=_dec(r.total_amount),
+            overall_confidence=_dec(r.overall_confidence),
+            confidence_total=_dec(r.confidence_total),
+            confidence_date=_dec(r.confidence_date),
+            confidence_company=_dec(r.confidence_company),
+            confidence_address=_dec(r.confidence_address),
+            receipt_date=r.receipt_date,
+            merchant_key=merchant_key(r),
+            location_key=location_key(r),
+        )
+
+
+@dataclass
+class ScoringInputs:
+    """Everything the component formulas read, whichever way it was gathered."""
+
+    receipt_count: int = 0
+    total_spending: Decimal = Decimal("0.00")
+    overall_conf_sum: Decimal = Decimal("0")
+    overall_conf_count: int = 0
+    conf_amount_sum: Decimal = Decimal("0")
+    conf_amount_count: int = 0
+    conf_weighted_amount_sum: Decimal = Decimal("0")
+    date_count: int = 0
+    min_receipt_date: Optional[date] = None
+    max_receipt_date: Optional[date] = None
+    date_conf_sum: Decimal = Decimal("0")
+    date_conf_count: int = 0
+    company_conf_sum: Decimal = Decimal("0")
+    company_conf_count: int = 0
+    address_conf_sum: Decimal = Decimal("0")
+    address_conf_count: int = 0
+    unique_companies: int = 0
+    unique_locations: int = 0
+
+    @classmethod
+    def from_receipts(cls, receipts) -> "ScoringInputs":
+        """Full recompute over trusted receipts."""
+        inputs = cls(receipt_count=len(receipts))
+        companies, locations, dates = set(), set(), []
+        for r in receipts:
+            amount = _dec(r.total_amount)
+            if amount is not None:
+                inputs.total_spending += amount
+            if r.overall_confidence is not None:
+                inputs.overall_conf_sum += _dec(r.overall_confidence)
+                inputs.overall_conf_count += 1
+            if amount is not None and r.confidence_total is not None:
+                inputs.conf_amount_sum += amount
+                inputs.conf_amount_count += 1
+                inputs.conf_weighted_amount_sum += _dec(r.confidence_total) * amount
+            if r.receipt_date:
+                dates.append(r.receipt_date)
+            if r.confidence_date is not None:
+                inputs.date_conf_sum += _dec(r.confidence_date)
+                inputs.date_conf_count += 1
+            if r.confidence_company is not None:
+                inputs.company_conf_sum += _dec(r.confidence_company)
+                inputs.company_conf_count += 1
+            if r.confidence_address is not None:
+                inputs.address_conf_sum += _dec(r.confidence_address)
+                inputs.address_conf_count += 1
+            if merchant_key(r):
+                companies.add(merchant_key(r))
+            if location_key(r):
+                locations.add(location_key(r))
+
+        inputs.date_count = len(dates)
+        if dates:
+            inputs.min_receipt_date, inputs.max_receipt_date = min(dates), max(dates)
+        inputs.unique_companies = len(companies)
+        inputs.unique_locations = len(locations)
+        return inputs
+
+    @classmethod
+    def from_aggregate(cls, agg: UserReceiptAggregate) -> "ScoringInputs":
+        """O(1): read straight off the maintained aggregate row."""
+        return cls(
+            receipt_count=agg.trusted_count,
+            total_spending=Decimal(agg.total_spending),
+            overall_conf_sum=Decimal(agg.overall_conf_sum),
+            overall_conf_count=agg.overall_conf_count,
+            conf_amount_sum=Decimal(agg.conf_amount_sum),
+            conf_amount_count=agg.conf_amount_count,
+            conf_weighted_amount_sum=Decimal(agg.conf_weighted_amount_sum),
+            date_count=agg.date_count,
+            min_receipt_date=agg.min_receipt_date,
+            max_receipt_date=agg.max_receipt_date,
+            date_conf_sum=Decimal(agg.date_conf_sum),
+            date_conf_count=agg.date_conf_count,
+            company_conf_sum=Decimal(agg.company_conf_sum),
+            company_conf_count=agg.company_conf_count,
+            address_conf_sum=Decimal(agg.address_conf_sum),
+            address_conf_count=agg.address_conf_count,
+            unique_companies=len(agg.merchant_counts or {}),
+            unique_locations=len(agg.address_counts or {}),
+        )
+
+    @property
+    def date_range_days(self) -> int:
+        if not self.date_count:
+            return 0
+        return (self.max_receipt_date - self.min_receipt_date).days
+
+
+# Receipts scoring looks at at all (trusted or dropped)
+SCORED_RECEIPT_FILTERS = (
+    Receipt.status == "completed",
+    Receipt.total_amount.isnot(None),
+)
+
+
+def is_scored_receipt(r) -> bool:
+    """Python twin of SCORED_RECEIPT_FILTERS."""
+    return r.status == "completed" and r.total_amount is not None
+
+
+def partition_receipts(receipts) -> tuple[list, list]:
+    """(trusted receipts, [(dropped receipt, reasons)]) in the order given."""
+    trusted = []
+    dropped = []
+    for r in receipts:
+        reasons = receipt_drop_reasons(r)
+        if reasons:
+            dropped.append((r, "; ".join(reasons)))
+        else:
+            trusted.append(r)
+    return trusted, dropped
+
+
+# Columns the scorer and the breakdown lists read. Loading only these keeps
+# the bulky raw_extraction_json out of scoring queries.
+SCORING_COLUMNS = (
+    Receipt.id,
+    Receipt.file_name,
+    Receipt.status,
+    Receipt.error_message,
+    Receipt.company_name,
+    Receipt.merchant_id,
+    Receipt.receipt_date,
+    Receipt.receipt_address,
+    Receipt.locality_id,
+    Receipt.total_amount,
+    Receipt.amount_outlier_score,
+    Receipt.currency,
+    Receipt.overall_confidence,
+    Receipt.confidence_total,
+    Receipt.confidence_date,
+    Receipt.confidence_company,
+    Receipt.confidence_address,
+    Receipt.uploaded_at,
+)
+
+
+_SUM_FIELDS = (
+    "total_spending",
+    "overall_conf_sum",
+    "conf_amount_sum",
+    "conf_weighted_amount_sum",
+    "date_conf_sum",
+    "company_conf_sum",
+    "address_conf_sum",
+)
+
+
+def _merchant_rule():
+    """SQL twin of the missing/placeholder company name check."""
+    return and_(
+        Receipt.company_name.isnot(None),
+        Receipt.company_name != "",
+        func.lower(func.btrim(Receipt.company_name, " \t\n\r")).notin_(["unknown", "n/a"]),
+    )
+
+
+def _merchant_key_sql():
+    """SQL twin of ``merchant_key``."""
+    return func.coalesce(
+        literal("#").concat(cast(Receipt.merchant_id, String)), Receipt.company_name
+    )
+
+
+def _location_key_sql():
+    """SQL twin of ``location_key``."""
+    return func.coalesce(
+        literal("@").concat(cast(Receipt.locality_id, String)), Receipt.receipt_address
+    )
+
+
+def _amount_outlier_sql():
+    """SQL twin of ``is_amount_outlier``."""
+    if AMOUNT_OUTLIER_Z is None:
+        return false()
+    return func.coalesce(Receipt.amount_outlier_score > AMOUNT_OUTLIER_Z, False)
+
+
+def _trust_rules():
+    """SQL twin of ``receipt_drop_reasons``: true when no rule drops the receipt."""
+    rules = [
+        _merchant_rule(),
+        func.coalesce(Receipt.overall_confidence, 0) >= MIN_RECEIPT_CONFIDENCE,
+    ]
+    if MAX_SINGLE_RECEIPT_KES is not None:
+        rules.append(Receipt.total_amount <= MAX_SINGLE_RECEIPT_KES)
+    if AMOUNT_OUTLIER_Z is not None:
+        rules.append(not_(_amount_outlier_sql()))
+    return and_(*rules)
+
+
+def _trusted_receipt_filters():
+    return [*SCORED_RECEIPT_FILTERS, _trust_rules()]
+
 
 class KYCScorer:
     """Service for calculating KYC verification scores with confidence + outlier filtering."""
@@ -31,49 +375,13 @@ class KYCScorer:
 
         all_receipts = (
             self.db.query(Receipt)
-            .filter(
-                Receipt.user_id == user_id,
-                Receipt.status == "completed",
-                Receipt.total_amount.isnot(None),
-            )
+            .options(load_only(*SCORING_COLUMNS))
+            .filter(Receipt.user_id == user_id, *SCORED_RECEIPT_FILTERS)
             .order_by(Receipt.uploaded_at.asc())
             .all()
         )
 
-        trusted = []
-        dropped = []
-
-        for r in all_receipts:
-            reasons = []
-
-            # 0) Missing or placeholder company name
-            if not r.company_name or str(r.company_name).strip().lower() in (
-                "unknown",
-                "n/a",
-            ):
-                reasons.append("missing_company_name")
-
-            # 1) Confidence filter
-            conf = Decimal(str(r.overall_confidence or 0.0))
-            if conf < MIN_RECEIPT_CONFIDENCE:
-                reasons.append(
-                    f"low_confidence ({float(conf):.3f} < {float(MIN_RECEIPT_CONFIDENCE):.3f})"
-                )
-
-            # 2) Outlier filter on total amount
-            if (
-                MAX_SINGLE_RECEIPT_KES is not None
-                and r.total_amount is not None
-                and Decimal(str(r.total_amount)) > MAX_SINGLE_RECEIPT_KES
-            ):
-                reasons.append(
-                    f"outlier_amount ({r.total_amount} > {float(MAX_SINGLE_RECEIPT_KES):.0f})"
-                )
-
-            if reasons:
-                dropped.append((r, "; ".join(reasons)))
-            else:
-                trusted.append(r)
+        trusted, dropped = partition_receipts(all_receipts)
 
         logger.info(
             f"KYCScorer.partition_receipts_for_user user={user_id}: "
@@ -82,7 +390,7 @@ class KYCScorer:
             f"max_single={float(MAX_SINGLE_RECEIPT_KES) if MAX_SINGLE_RECEIPT_KES else None}"
         )
         for r, reason in dropped:
-            logger.info(
+            logger.debug(
                 "KYCScorer: dropping receipt id=%s file=%s reason=%s",
                 r.id,
                 r.file_name,
@@ -91,16 +399,103 @@ class KYCScorer:
 
         return trusted, dropped
 
+    def load_scoring_inputs(self, user_id: str) -> tuple[ScoringInputs, int]:
+        """
+        Set-based full recompute: one aggregate query with FILTER clauses
+        applies the drop rules in SQL and returns (inputs, dropped_count)
+        without loading a single receipt row.
+        """
+        trusted = _trust_rules()
+
+        def t_sum(expr):
+            return func.coalesce(func.sum(expr).filter(trusted), 0)
+
+        def t_count(expr):
+            return func.count(expr).filter(trusted)
+
+        row = (
+            self.db.query(
+                func.count().filter(trusted).label("receipt_count"),
+                func.count().filter(not_(trusted)).label("dropped_count"),
+                t_sum(Receipt.total_amount).label("total_spending"),
+                t_sum(Receipt.overall_confidence).label("overall_conf_sum"),
+                t_count(Receipt.overall_confidence).label("overall_conf_count"),
+                func.coalesce(
+                    func.sum(Receipt.total_amount).filter(
+                        and_(trusted, Receipt.confidence_total.isnot(None))
+                    ),
+                    0,
+                ).label("conf_amount_sum"),
+                t_count(Receipt.confidence_total).label("conf_amount_count"),
+                t_sum(Receipt.confidence_total * Receipt.total_amount).label(
+                    "conf_weighted_amount_sum"
+                ),
+                t_count(Receipt.receipt_date).label("date_count"),
+                func.min(Receipt.receipt_date).filter(trusted).label("min_receipt_date"),
+                func.max(Receipt.receipt_date).filter(trusted).label("max_receipt_date"),
+                t_sum(Receipt.confidence_date).label("date_conf_sum"),
+                t_count(Receipt.confidence_date).label("date_conf_count"),
+                t_sum(Receipt.confidence_company).label("company_conf_sum"),
+                t_count(Receipt.confidence_company).label("company_conf_count"),
+                t_sum(Receipt.confidence_address).label("address_conf_sum"),
+                t_count(Receipt.confidence_address).label("address_conf_count"),
+                t_count(_merchant_key_sql().distinct()).label("unique_companies"),
+                func.count(_location_key_sql().distinct())
+                .filter(and_(trusted, _location_key_sql() != ""))
+                .label("unique_locations"),
+            )
+            .filter(Receipt.user_id == user_id, *SCORED_RECEIPT_FILTERS)
+            .one()
+        )
+
+        values = row._asdict()
+        dropped_count = values.pop("dropped_count")
+        # COALESCE(..., 0) comes back as int for users with no receipts
+        for name in _SUM_FIELDS:
+            values[name] = Decimal(values[name])
+        return ScoringInputs(**values), dropped_count
+
     # -------------------------------------------------
     # Main scoring entry point
     # -------------------------------------------------
     def calculate_user_score(self, user_id: str) -> VerificationScore:
-        # Use filtered receipts
-        receipts, dropped = self.partition_receipts_for_user(user_id)
+        """Score a user from their maintained aggregate row (no receipt scan)."""
+        agg = self._current_aggregate(user_id)
+        return self._score_from_inputs(
+            user_id, ScoringInputs.from_aggregate(agg), agg.dropped_count
+        )
+
+    def calculate_user_score_full(self, user_id: str) -> VerificationScore:
+        """Score a user from a full recompute over their receipts (in SQL)."""
+        inputs, dropped_count = self.load_scoring_inputs(user_id)
+        return self._score_from_inputs(user_id, inputs, dropped_count)
+
+    def _score_from_inputs(
+        self, user_id: str, inputs: ScoringInputs, dropped_count: int
+    ) -> VerificationScore:
+        score = self._persist_score(user_id, self._score_data(inputs))
 
+        if not inputs.receipt_count:
+            logger.info(
+                "KYCScorer.calculate_user_score user=%s: no trusted receipts → score=0",
+                user_id,
+            )
+        else:
+            logger.info(
+                "KYCScorer.calculate_user_score user=%s: final_score=%s, verified=%s, "
+                "trusted_receipts=%d, dropped_receipts=%d",
+                user_id,
+                score.final_score,
+                score.is_verified,
+                inputs.receipt_count,
+                dropped_count,
+            )
+        return score
+
+    def _score_data(self, inputs: ScoringInputs) -> dict:
         # If nothing trusted → 0 score
-        if not receipts:
-            zero_data = {
+        if not inputs.receipt_count:
+            return {
                 "document_quality_score": Decimal("0.00"),
                 "spending_pattern_score": Decimal("0.00"),
                 "consistency_score": Decimal("0.00"),
@@ -114,19 +509,12 @@ class KYCScorer:
                 "date_range_days": 0,
                 "average_transaction_amount": Decimal("0.00"),
             }
-            score = self._create_or_update_score(user_id, zero_data)
-            self._update_user_kyc_status(user_id, score.final_score, score.is_verified)
-            logger.info(
-                "KYCScorer.calculate_user_score user=%s: no trusted receipts → score=0",
-                user_id,
-            )
-            return score
 
         # Component scores
-        doc_quality = self._calculate_document_quality_score(receipts)
-        spending_pattern = self._calculate_spending_pattern_score(receipts)
-        consistency = self._calculate_consistency_score(receipts)
-        diversity = self._calculate_diversity_score(receipts)
+        doc_quality = self._calculate_document_quality_score(inputs)
+        spending_pattern = self._calculate_spending_pattern_score(inputs)
+        consistency = self._calculate_consistency_score(inputs)
+        diversity = self._calculate_diversity_score(inputs)
 
         # Weighted final score
         final_score = (
@@ -139,91 +527,46 @@ class KYCScorer:
         is_verified = final_score >= Decimal(str(settings.VERIFICATION_THRESHOLD))
 
         # Aggregate metrics (only on trusted receipts)
-        total_spending = sum(
-            (
-                Decimal(str(r.total_amount))
-                for r in receipts
-                if r.total_amount is not None
-            ),
-            start=Decimal("0.00"),
-        )
-        unique_companies = len({r.company_name for r in receipts if r.company_name})
-        unique_locations = len({r.receipt_address for r in receipts if r.receipt_address})
-        dates = [r.receipt_date for r in receipts if r.receipt_date]
-        date_range_days = (max(dates) - min(dates)).days if dates else 0
-        avg_transaction = (
-            total_spending / len(receipts) if receipts else Decimal("0.00")
-        )
+        avg_transaction = inputs.total_spending / inputs.receipt_count
 
-        score_data = {
+        return {
             "document_quality_score": doc_quality.quantize(Decimal("0.01")),
             "spending_pattern_score": spending_pattern.quantize(Decimal("0.01")),
             "consistency_score": consistency.quantize(Decimal("0.01")),
             "diversity_score": diversity.quantize(Decimal("0.01")),
             "final_score": final_score,
             "is_verified": is_verified,
-            "total_receipts": len(receipts),
-            "total_spending": total_spending.quantize(Decimal("0.01")),
-            "unique_companies": unique_companies,
-            "unique_locations": unique_locations,
-            "date_range_days": date_range_days,
+            "total_receipts": inputs.receipt_count,
+            "total_spending": inputs.total_spending.quantize(Decimal("0.01")),
+            "unique_companies": inputs.unique_companies,
+            "unique_locations": inputs.unique_locations,
+            "date_range_days": inputs.date_range_days,
             "average_transaction_amount": avg_transaction.quantize(Decimal("0.01")),
         }
 
-        score = self._create_or_update_score(user_id, score_data)
-        self._update_user_kyc_status(user_id, final_score, is_verified)
-
-        logger.info(
-            "KYCScorer.calculate_user_score user=%s: final_score=%s, verified=%s, "
-            "trusted_receipts=%d, dropped_receipts=%d",
-            user_id,
-            final_score,
-            is_verified,
-            len(receipts),
-            len(dropped),
-        )
-        return score
-
     # -------------------------------------------------
     # Component calculations
     # -------------------------------------------------
-    def _calculate_document_quality_score(self, receipts) -> Decimal:
-        confidences = [
-            Decimal(str(r.overall_confidence))
-            for r in receipts
-            if r.overall_confidence is not None
-        ]
-        if not confidences:
+    def _calculate_document_quality_score(self, inputs: ScoringInputs) -> Decimal:
+        if not inputs.overall_conf_count:
             return Decimal("0.00")
-        avg_confidence = sum(confidences) / len(confidences)
+        avg_confidence = inputs.overall_conf_sum / inputs.overall_conf_count
         return min(avg_confidence * Decimal("100"), Decimal("100.00"))
 
-    def _calculate_spending_pattern_score(self, receipts) -> Decimal:
-        if not receipts:
+    def _calculate_spending_pattern_score(self, inputs: ScoringInputs) -> Decimal:
+        if not inputs.receipt_count:
             return Decimal("0.00")
 
-        amounts_with_conf = [
-            Decimal(str(r.total_amount))
-            for r in receipts
-            if r.total_amount is not None and r.confidence_total is not None
-        ]
-
-        if not amounts_with_conf:
+        if not inputs.conf_amount_count:
             total_conf = Decimal("0.50")
         else:
-            weighted_sum = sum(
-                Decimal(str(r.confidence_total)) * Decimal(str(r.total_amount))
-                for r in receipts
-                if r.total_amount is not None and r.confidence_total is not None
+            denom = inputs.conf_amount_sum
+            total_conf = (
+                inputs.conf_weighted_amount_sum / denom if denom > 0 else Decimal("0.50")
             )
-            denom = sum(amounts_with_conf)
-            total_conf = weighted_sum / denom if denom > 0 else Decimal("0.50")
 
-        total_spending = sum(
-            (Decimal(str(r.total_amount)) for r in receipts if r.total_amount is not None),
-            start=Decimal("0.00"),
-        )
-        receipt_count = len(receipts)
+        total_spending = inputs.total_spending
+        receipt_count = inputs.receipt_count
 
         # Spending score (0–60)
         if total_spending >= Decimal("100000"):
@@ -248,19 +591,18 @@ class KYCScorer:
         total_score = (spending_score + frequency_score) * total_conf
         return min(total_score, Decimal("100.00"))
 
-    def _calculate_consistency_score(self, receipts) -> Decimal:
-        if not receipts:
+    def _calculate_consistency_score(self, inputs: ScoringInputs) -> Decimal:
+        if not inputs.receipt_count:
             return Decimal("0.00")
 
-        dates = [r.receipt_date for r in receipts if r.receipt_date]
-        if len(dates) < 2:
+        if inputs.date_count < 2:
             return Decimal("0.00")
 
-        date_range_days = (max(dates) - min(dates)).days
+        date_range_days = inputs.date_range_days
         if date_range_days == 0:
             return Decimal("0.00")
 
-        receipts_per_week = (len(receipts) / date_range_days) * 7
+        receipts_per_week = (inputs.receipt_count / date_range_days) * 7
 
         if receipts_per_week >= 2:
             score = Decimal("100.00")
@@ -276,60 +618,44 @@ class KYCScorer:
         elif date_range_days >= 60:
             score = min(score + Decimal("5.00"), Decimal("100.00"))
 
-        date_confidences = [
-            Decimal(str(r.confidence_date))
-            for r in receipts
-            if r.confidence_date is not None
-        ]
         avg_date_conf = (
-            sum(date_confidences) / len(date_confidences)
-            if date_confidences
+            inputs.date_conf_sum / inputs.date_conf_count
+            if inputs.date_conf_count
             else Decimal("0.50")
         )
         score *= max(avg_date_conf, Decimal("0.50"))
         return min(score, Decimal("100.00"))
 
-    def _calculate_diversity_score(self, receipts) -> Decimal:
-        if not receipts:
+    def _calculate_diversity_score(self, inputs: ScoringInputs) -> Decimal:
+        if not inputs.receipt_count:
             return Decimal("0.00")
 
-        unique_companies = {r.company_name for r in receipts if r.company_name}
-        unique_locations = {r.receipt_address for r in receipts if r.receipt_address}
+        unique_companies = inputs.unique_companies
+        unique_locations = inputs.unique_locations
 
-        if len(unique_companies) >= 5:
+        if unique_companies >= 5:
             company_score = Decimal("60.00")
-        elif len(unique_companies) >= 3:
+        elif unique_companies >= 3:
             company_score = Decimal("45.00")
-        elif len(unique_companies) >= 2:
+        elif unique_companies >= 2:
             company_score = Decimal("30.00")
         else:
             company_score = Decimal("15.00")
 
-        if len(unique_locations) >= 3:
+        if unique_locations >= 3:
             location_score = Decimal("40.00")
-        elif len(unique_locations) >= 2:
+        elif unique_locations >= 2:
             location_score = Decimal("25.00")
         else:
             location_score = Decimal("10.00")
 
-        company_confs = [
-            Decimal(str(r.confidence_company))
-            for r in receipts
-            if r.confidence_company is not None
-        ]
-        address_confs = [
-            Decimal(str(r.confidence_address))
-            for r in receipts
-            if r.confidence_address is not None
-        ]
-
-        if company_confs:
-            avg_company_conf = sum(company_confs) / len(company_confs)
+        if inputs.company_conf_count:
+            avg_company_conf = inputs.company_conf_sum / inputs.company_conf_count
         else:
             avg_company_conf = Decimal("0.50")
 
-        if address_confs:
-            avg_address_conf = sum(address_confs) / len(address_confs)
+        if inputs.address_conf_count:
+            avg_address_conf = inputs.address_conf_sum / inputs.address_conf_count
         else:
             avg_address_conf = Decimal("0.50")
 
@@ -338,41 +664,324 @@ class KYCScorer:
         return min(total_score, Decimal("100.00"))
 
     # -------------------------------------------------
-    # Persistence + user status
+    # Incremental per-user aggregates
     # -------------------------------------------------
-    def _create_or_update_score(self, user_id: str, score_data: dict) -> VerificationScore:
-        score = (
-            self.db.query(VerificationScore)
-            .filter(VerificationScore.user_id == user_id)
+    def _lock_user(self, user_id: str) -> None:
+        # Serialises aggregate maintenance and rebuilds for one user, so a
+        # rebuild never misses a change that commits while it is scanning
+        self.db.query(User.id).filter(User.id == user_id).with_for_update().first()
+
+    def _bump_receipts_version(self, user_id: str) -> None:
+        # Invalidates cached score reads; the row lock doubles as _lock_user
+        self.db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(receipts_version=User.receipts_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        invalidate_on_commit(self.db, user_id)
+
+    def _get_aggregate(self, user_id: str) -> Optional[UserReceiptAggregate]:
+        return (
+            self.db.query(UserReceiptAggregate)
+            .filter(UserReceiptAggregate.user_id == user_id)
             .first()
         )
 
-        if score:
-            for key, value in score_data.items():
-                setattr(score, key, value)
-            score.calculated_at = datetime.utcnow()
-        else:
-            score = VerificationScore(user_id=user_id, **score_data)
-            self.db.add(score)
+    def _current_aggregate(self, user_id: str) -> UserReceiptAggregate:
+        agg = self._get_aggregate(user_id)
+        if agg is None or agg.rules_key != RULES_KEY:
+            agg = self.rebuild_aggregate(user_id)
+        return agg
+
+    @staticmethod
+    def _reset_aggregate(agg: UserReceiptAggregate) -> None:
+        agg.rules_key = RULES_KEY
+        for name in (
+            "trusted_count",
+            "dropped_count",
+            "overall_conf_count",
+            "conf_amount_count",
+            "date_count",
+            "date_conf_count",
+            "company_conf_count",
+            "address_conf_count",
+        ):
+            setattr(agg, name, 0)
+        for name in (
+            "total_spending",
+            "overall_conf_sum",
+            "conf_amount_sum",
+            "conf_weighted_amount_sum",
+            "date_conf_sum",
+            "company_conf_sum",
+            "address_conf_sum",
+        ):
+            setattr(agg, name, Decimal("0"))
+        agg.min_receipt_date = None
+        agg.max_receipt_date = None
+        agg.merchant_counts = {}
+        agg.address_counts = {}
+        agg.amount_histogram = {}
+
+    @staticmethod
+    def _fold(agg: UserReceiptAggregate, c: ReceiptContribution, sign: int) -> bool:
+        """
+        Add (sign=1) or remove (sign=-1) one receipt. Returns True when a
+        removal touched the min/max receipt date, which cannot be undone
+        from sums alone.
+        """
+        if not c.trusted:
+            agg.dropped_count += sign
+            return False
+
+        agg.trusted_count += sign
+        agg.total_spending = Decimal(agg.total_spending) + sign * c.amount
+
+        if c.overall_confidence is not None:
+            agg.overall_conf_sum = Decimal(agg.overall_conf_sum) + sign * c.overall_confidence
+            agg.overall_conf_count += sign
+        if c.confidence_total is not None:
+            agg.conf_amount_sum = Decimal(agg.conf_amount_sum) + sign * c.amount
+            agg.conf_amount_count += sign
+            agg.conf_weighted_amount_sum = (
+                Decimal(agg.conf_weighted_amount_sum) + sign * c.confidence_total * c.amount
+            )
+        if c.confidence_date is not None:
+            agg.date_conf_sum = Decimal(agg.date_conf_sum) + sign * c.confidence_date
+            agg.date_conf_count += sign
+        if c.confidence_company is not None:
+            agg.company_conf_sum = Decimal(agg.company_conf_sum) + sign * c.confidence_company
+            agg.company_conf_count += sign
+        if c.confidence_address is not None:
+            agg.address_conf_sum = Decimal(agg.address_conf_sum) + sign * c.confidence_address
+            agg.address_conf_count += sign
+
+        # JSONB columns are reassigned (not mutated) so the change is flushed
+        for column, key in (("merchant_counts", c.merchant_key), ("address_counts", c.location_key)):
+            if not key:
+                continue
+            counts = dict(getattr(agg, column) or {})
+            counts[key] = counts.get(key, 0) + sign
+            if counts[key] <= 0:
+                del counts[key]
+            setattr(agg, column, counts)
+        sketch = AmountSketch(agg.amount_histogram)
+        sketch.add(c.amount, sign)
+        agg.amount_histogram = sketch.as_json()
+
+        if not c.receipt_date:
+            return False
+        agg.date_count += sign
+        if sign > 0:
+            if agg.min_receipt_date is None or c.receipt_date < agg.min_receipt_date:
+                agg.min_receipt_date = c.receipt_date
+            if agg.max_receipt_date is None or c.receipt_date > agg.max_receipt_date:
+                agg.max_receipt_date = c.receipt_date
+            return False
+        return c.receipt_date in (agg.min_receipt_date, agg.max_receipt_date)
+
+    def _recompute_date_bounds(
+        self, agg: UserReceiptAggregate, exclude_receipt_id: Optional[str]
+    ) -> None:
+        query = self.db.query(
+            func.min(Receipt.receipt_date), func.max(Receipt.receipt_date)
+        ).filter(Receipt.user_id == agg.user_id, *_trusted_receipt_filters())
+        if exclude_receipt_id is not None:
+            query = query.filter(Receipt.id != exclude_receipt_id)
+        agg.min_receipt_date, agg.max_receipt_date = query.one()
+
+    def amount_outlier_score(self, user_id: str, amount) -> Optional[Decimal]:
+        """
+        Robust z-score of a new receipt's amount against the user's trusted
+        receipts so far (read from the aggregate row, no receipt scan).
+        """
+        if amount is None:
+            return None
+        agg = self._current_aggregate(user_id)
+        return outlier_score(
+            AmountSketch(agg.amount_histogram), amount, settings.AMOUNT_OUTLIER_MIN_HISTORY
+        )
 
-        self.db.commit()
-        self.db.refresh(score)
-        return score
+    def apply_receipt_change(
+        self,
+        user_id: str,
+        before: Optional[ReceiptContribution] = None,
+        after: Optional[ReceiptContribution] = None,
+    ) -> None:
+        """
+        Fold a receipt insert (after only), update (both) or delete (before
+        only) into the user's aggregate row. Runs inside the caller's
+        transaction so the row commits together with the receipt change.
+        Changes to receipts scoring ignores (both None) still bump
+        ``receipts_version``: the receipt listings cached with it change.
+        """
+        self._bump_receipts_version(user_id)
+        if before is None and after is None:
+            return
 
-    def _update_user_kyc_status(self, user_id: str, score: Decimal, is_verified: bool):
-        user = self.db.query(User).filter(User.id == user_id).first()
-        if not user:
+        agg = self._get_aggregate(user_id)
+        if agg is None or agg.rules_key != RULES_KEY:
+            # Built from scratch (including this change) on the next score
             return
 
-        user.kyc_score = score
+        bounds_stale = False
+        if before is not None:
+            bounds_stale = self._fold(agg, before, -1)
+        if bounds_stale:
+            # The receipt's old row is excluded; its new values are folded below
+            self._recompute_date_bounds(agg, exclude_receipt_id=before.receipt_id)
+        if after is not None:
+            self._fold(agg, after, 1)
+
+    def _amount_histogram(self, user_id: str) -> dict:
+        sketch = AmountSketch()
+        for (amount,) in self.db.query(Receipt.total_amount).filter(
+            Receipt.user_id == user_id, *_trusted_receipt_filters()
+        ):
+            sketch.add(amount)
+        return sketch.as_json()
+
+    def rebuild_aggregate(self, user_id: str) -> UserReceiptAggregate:
+        """Recompute the aggregate row from every receipt of the user."""
+        self._lock_user(user_id)
+        agg = self._get_aggregate(user_id)
+        if agg is None:
+            agg = UserReceiptAggregate(user_id=user_id)
+            self.db.add(agg)
+        self._reset_aggregate(agg)
+
+        inputs, agg.dropped_count = self.load_scoring_inputs(user_id)
+        agg.trusted_count = inputs.receipt_count
+        for f in fields(ScoringInputs):
+            if hasattr(agg, f.name):
+                setattr(agg, f.name, getattr(inputs, f.name))
+
+        def counters(column) -> dict:
+            rows = (
+                self.db.query(column, func.count())
+                .filter(Receipt.user_id == user_id, *_trusted_receipt_filters(), column != "")
+                .group_by(column)
+                .all()
+            )
+            return {key: count for key, count in rows if key}
+
+        agg.merchant_counts = counters(_merchant_key_sql())
+        agg.address_counts = counters(_location_key_sql())
+        agg.amount_histogram = self._amount_histogram(user_id)
+
+        self.db.flush()
+        return agg
+
+    def check_aggregate_consistency(self, user_id: str) -> dict:
+        """
+        Compare the maintained aggregate against a full recompute. Returns
+        {field: (incremental, full)} for every input or score that differs.
+        """
+        agg = self._get_aggregate(user_id)
+        full, _ = self.load_scoring_inputs(user_id)
+        if agg is None:
+            return {"aggregate_row": (None, "missing")}
+
+        incremental = ScoringInputs.from_aggregate(agg)
+        mismatches = {
+            f.name: (getattr(incremental, f.name), getattr(full, f.name))
+            for f in fields(ScoringInputs)
+            if getattr(incremental, f.name) != getattr(full, f.name)
+        }
+        incremental_scores = self._score_data(incremental)
+        full_scores = self._score_data(full)
+        mismatches.update(
+            {
+                key: (value, full_scores[key])
+                for key, value in incremental_scores.items()
+                if value != full_scores[key]
+            }
+        )
+        full_histogram = self._amount_histogram(user_id)
+        if (agg.amount_histogram or {}) != full_histogram:
+            mismatches["amount_histogram"] = (agg.amount_histogram, full_histogram)
+        return mismatches
 
-        if is_verified:
-            user.kyc_status = "verified"
-            if not user.verification_date:
-                user.verification_date = datetime.utcnow()
-        elif score >= Decimal("60.00"):
-            user.kyc_status = "under_review"
-        else:
-            user.kyc_status = "pending"
+    # -------------------------------------------------
+    # Persistence + user status
+    # -------------------------------------------------
+    def _persist_score(self, user_id: str, score_data: dict) -> VerificationScore:
+        """
+        Upsert the score and the user's KYC status in one statement and one
+        transaction: INSERT ... ON CONFLICT (user_id) DO UPDATE ... RETURNING,
+        with the users UPDATE attached as a CTE. The users row is only
+        rewritten when its score or status actually moves, or when the stored
+        score row differs (which also bumps ``receipts_version``).
+        """
+        now = datetime.utcnow()
+        final_score = score_data["final_score"]
+        kyc_status = kyc_status_for(final_score, score_data["is_verified"])
+        verified = kyc_status == "verified"
+
+        # The CTE sees the score row as it was before this statement
+        score_unchanged = (
+            select(VerificationScore.id)
+            .where(
+                VerificationScore.user_id == user_id,
+                *(getattr(VerificationScore, name) == value for name, value in score_data.items()),
+            )
+            .exists()
+        )
+        user_status = (
+            update(User)
+            .where(
+                User.id == user_id,
+                or_(
+                    User.kyc_score.is_distinct_from(final_score),
+                    User.kyc_status.is_distinct_from(kyc_status),
+                    and_(verified, User.verification_date.is_(None)),
+                    not_(score_unchanged),
+                ),
+            )
+            .values(
+                kyc_score=final_score,
+                kyc_status=kyc_status,
+                receipts_version=case(
+                    (score_unchanged, User.receipts_version),
+                    else_=User.receipts_version + 1,
+                ),
+                verification_date=(
+                    func.coalesce(User.verification_date, now)
+                    if verified
+                    else User.verification_date
+                ),
+            )
+            .returning(User.id)
+            .cte("user_status")
+        )
 
+        table = VerificationScore.__table__
+        # Statements run through from_statement skip Python-side column
+        # defaults, so the new-row values the model would fill are explicit
+        stmt = insert(table).values(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            verification_threshold=Decimal("75.00"),
+            calculated_at=now,
+            **score_data,
+        )
+        stmt = (
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id],
+                set_={name: stmt.excluded[name] for name in (*score_data, "calculated_at")},
+            )
+            .returning(*table.c)
+            .add_cte(user_status)
+        )
+        score = self.db.scalars(
+            select(VerificationScore).from_statement(stmt),
+            execution_options={"populate_existing": True},
+        ).one()
+
+        # Detached, the returned row survives the commit without being
+        # expired, so callers can serialise it without a refresh SELECT
+        self.db.expunge(score)
+        invalidate_on_commit(self.db, user_id)
         self.db.commit()
+        return score
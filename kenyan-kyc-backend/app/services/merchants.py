@@ -0,0 +1,265 @@
+"""
+Merchant canonicalization - extracted company names to merchant ids
+
+OCR gives the same shop many spellings ("NAIVAS", "Naivas Ltd",
+"NAIVA5 LIMITED"). At ingest every name is normalized (lowercased,
+punctuation and trailing legal/descriptor words stripped) and resolved to
+a row in ``merchants``:
+
+1. exact normalized name already seen by this process: a dict lookup
+2. otherwise the most similar known merchant by trigram similarity, if it
+   reaches MERCHANT_SIMILARITY_THRESHOLD - through the pg_trgm GIN index
+   in Postgres, or an in-process trigram index when pg_trgm is not
+   installed (MERCHANT_MATCHER=auto picks either)
+3. otherwise a new merchant
+
+Trigrams follow pg_trgm's definition (alphanumeric words, lowercased,
+padded with two leading spaces and one trailing space), so both matchers
+score a pair of names the same way.
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import Connection, Engine, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import create_sync_engine
+from app.models.models import Merchant
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+# Connections for the resolver's own commits. They come from a pool of
+# their own: an upload already holds one from the main pool, and waiting
+# on that pool for a second could deadlock once uploads fill it
+RESOLVER_POOL_SIZE = 2
+RESOLVER_MAX_OVERFLOW = 3
+
+# Placeholder names receipt_drop_reasons treats as missing
+PLACEHOLDER_NAMES = ("unknown", "n/a")
+
+# Trailing words that do not tell two merchants apart
+_TRAILING_WORDS = {
+    "ltd", "limited", "plc", "co", "company", "inc", "llc", "k", "ke", "kenya",
+    "supermarket", "supermarkets", "hypermarket", "store", "stores",
+}
+
+
+def normalize_merchant_name(name: Optional[str]) -> Optional[str]:
+    """Matching key for a company name; None for missing/placeholder names."""
+    if not name or name.strip().lower() in PLACEHOLDER_NAMES:
+        return None
+    words = _WORD_RE.findall(name.lower())
+    while len(words) > 1 and words[-1] in _TRAILING_WORDS:
+        words.pop()
+    return " ".join(words)[:255] or None
+
+
+def trigrams(value: str) -> set[str]:
+    """The trigram set pg_trgm's show_trgm() would produce."""
+    grams = set()
+    for word in _WORD_RE.findall(value.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: str, b: str) -> float:
+    """pg_trgm similarity(): shared trigrams over distinct trigrams of both."""
+    ga, gb = trigrams(a), trigrams(b)
+    if not ga or not gb:
+        return 0.0
+    shared = len(ga & gb)
+    return shared / (len(ga) + len(gb) - shared)
+
+
+class TrigramIndex:
+    """In-process inverted index: trigram -> merchant ids, plus exact names."""
+
+    def __init__(self):
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        self._grams: dict[int, frozenset] = {}
+        self._exact: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    def get(self, normalized: str) -> Optional[int]:
+        return self._exact.get(normalized)
+
+    def alias(self, normalized: str, merchant_id: int) -> None:
+        """Remember a resolved spelling without indexing it as a merchant."""
+        self._exact[normalized] = merchant_id
+
+    def add(self, merchant_id: int, normalized: str) -> None:
+        with self._lock:
+            if merchant_id in self._grams:
+                return
+            grams = frozenset(trigrams(normalized))
+            for gram in grams:
+                self._postings[gram].append(merchant_id)
+            self._grams[merchant_id] = grams
+            self._exact.setdefault(normalized, merchant_id)
+
+    def best_match(self, normalized: str, threshold: float) -> Optional[tuple[int, float]]:
+        """Most similar merchant at or above ``threshold`` (oldest id wins ties)."""
+        grams = trigrams(normalized)
+        if not grams:
+            return None
+        # similarity <= shared / len(grams), so a match shares at least
+        # `needed` trigrams and must turn up in the postings of all but
+        # needed - 1 of them: the most common ones are never scanned
+        needed = max(1, math.ceil(threshold * len(grams) - 1e-9))
+        with self._lock:
+            rarest = sorted(grams, key=lambda gram: len(self._postings.get(gram, ())))
+            candidates = set()
+            for gram in rarest[:len(grams) - needed + 1]:
+                candidates.update(self._postings.get(gram, ()))
+            candidate_grams = [(merchant_id, self._grams[merchant_id]) for merchant_id in candidates]
+
+        best = None
+        for merchant_id, other in candidate_grams:
+            shared = len(grams & other)
+            score = shared / (len(grams) + len(other) - shared)
+            if score >= threshold and (
+                best is None or (score, -merchant_id) > (best[1], -best[0])
+            ):
+                best = (merchant_id, score)
+        return best
+
+
+class MerchantResolver:
+    """Resolves company names to merchant ids; one per process."""
+
+    def __init__(
+        self,
+        matcher: str = settings.MERCHANT_MATCHER,
+        threshold: float = settings.MERCHANT_SIMILARITY_THRESHOLD,
+    ):
+        if matcher not in ("auto", "pg_trgm", "memory"):
+            raise RuntimeError(f"Unknown MERCHANT_MATCHER: {matcher}")
+        self.matcher = matcher
+        self.threshold = threshold
+        self.index = TrigramIndex()
+        self._loaded_up_to = 0
+        self._use_pg_trgm: Optional[bool] = None if matcher == "auto" else matcher == "pg_trgm"
+        self._engine: Optional[Engine] = None
+        self._engine_lock = threading.Lock()
+
+    def _engine_for(self, db: Session) -> Engine:
+        # Same server as the caller's session, separate pool (see
+        # RESOLVER_POOL_SIZE)
+        url = db.get_bind().url
+        with self._engine_lock:
+            if self._engine is None or self._engine.url != url:
+                self._engine = create_sync_engine(
+                    url.render_as_string(hide_password=False),
+                    pool_label="merchants",
+                    pool_size=RESOLVER_POOL_SIZE,
+                    max_overflow=RESOLVER_MAX_OVERFLOW,
+                )
+            return self._engine
+
+    def _pg_trgm(self, conn: Connection) -> bool:
+        if self._use_pg_trgm is None:
+            self._use_pg_trgm = bool(
+                conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar()
+            )
+            logger.info(
+                "Merchant matching uses %s",
+                "pg_trgm" if self._use_pg_trgm else "the in-process trigram index",
+            )
+        return self._use_pg_trgm
+
+    def _load_new_merchants(self, conn: Connection) -> None:
+        # Ids only grow, so merchants created by other processes are picked
+        # up incrementally
+        rows = conn.execute(
+            select(Merchant.id, Merchant.normalized_name)
+            .where(Merchant.id > self._loaded_up_to)
+            .order_by(Merchant.id)
+        ).all()
+        for merchant_id, normalized in rows:
+            self.index.add(merchant_id, normalized)
+            self._loaded_up_to = merchant_id
+
+    def _match_pg_trgm(self, conn: Connection, normalized: str) -> Optional[tuple[int, float]]:
+        # % filters at pg_trgm.similarity_threshold (0.3 unless set); make it
+        # ours for this transaction so a lower threshold is not cut off
+        conn.execute(
+            text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+            {"threshold": str(self.threshold)},
+        )
+        score = func.similarity(Merchant.normalized_name, normalized)
+        row = conn.execute(
+            select(Merchant.id, score)
+            .where(Merchant.normalized_name.op("%")(normalized))  # GIN-indexed
+            .order_by(score.desc(), Merchant.id)
+            .limit(1)
+        ).first()
+        if row is None or row[1] < self.threshold:
+            return None
+        return row[0], row[1]
+
+    def _create(self, conn: Connection, name: str, normalized: str) -> int:
+        merchant_id = conn.execute(
+            insert(Merchant)
+            .values(name=name.strip()[:255], normalized_name=normalized)
+            .on_conflict_do_nothing(index_elements=[Merchant.normalized_name])
+            .returning(Merchant.id)
+        ).scalar()
+        if merchant_id is None:
+            # Created concurrently by another process
+            merchant_id = conn.execute(
+                select(Merchant.id).where(Merchant.normalized_name == normalized)
+            ).scalar_one()
+        conn.commit()
+        return merchant_id
+
+    def resolve(self, db: Session, name: Optional[str]) -> Optional[int]:
+        """
+        Merchant id for an extracted company name (None for placeholders).
+        Lookups and inserts run on a connection from the resolver's own pool
+        and commit immediately: ids are cached in-process, so a new merchant
+        must not vanish if the caller's transaction rolls back.
+        """
+        normalized = normalize_merchant_name(name)
+        if normalized is None:
+            return None
+
+        merchant_id = self.index.get(normalized)
+        if merchant_id is not None:
+            return merchant_id
+
+        with self._engine_for(db).connect() as conn:
+            if self._pg_trgm(conn):
+                match = self._match_pg_trgm(conn, normalized)
+            else:
+                self._load_new_merchants(conn)
+                merchant_id = self.index.get(normalized)
+                if merchant_id is not None:
+                    return merchant_id
+                match = self.index.best_match(normalized, self.threshold)
+
+            if match is not None:
+                merchant_id = match[0]
+                self.index.alias(normalized, merchant_id)
+                return merchant_id
+
+            merchant_id = self._create(conn, name, normalized)
+
+        self.index.add(merchant_id, normalized)
+        logger.info("New merchant %s for %r", merchant_id, name)
+        return merchant_id
+
+
+merchant_resolver = MerchantResolver()
@@ -0,0 +1,96 @@
+"""
+LISTEN connections that live as long as the app
+
+Per-worker caches that other workers' writes can invalidate (the principal
+cache, the token revocation filter) each keep one asyncpg connection
+LISTENing on their channel. ``NotificationListener`` owns that connection:
+it reconnects with backoff, notices a dropped connection at once (or, if
+it dropped silently, at the next ping) and tells the subclass, which must
+stop trusting its cache until ``connected`` runs again - notifications
+sent in between are lost.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+import asyncpg
+
+from app.core.database import ASYNC_DATABASE_URL, async_connect_args
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationListener:
+    """Keeps a LISTEN connection open for the app's lifetime, reconnecting on loss."""
+
+    channel: str
+
+    def __init__(self, ping_seconds: float = 30):
+        self.ping_seconds = ping_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    # Subclass hooks
+    async def connected(self, conn: asyncpg.Connection) -> None:
+        """LISTEN is in place; anything may have changed while nobody listened."""
+
+    def disconnected(self) -> None:
+        """The connection is gone; notifications may be missed from now on."""
+
+    def notify(self, payload: str) -> None:
+        raise NotImplementedError
+
+    async def idle(self, conn: asyncpg.Connection) -> None:
+        """Called every ``ping_seconds`` while connected."""
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _lost(self, lost: asyncio.Event) -> None:
+        # Stop trusting the cache at once; _run reconnects
+        self.disconnected()
+        lost.set()
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        self.notify(payload)
+
+    async def _run(self) -> None:
+        dsn = ASYNC_DATABASE_URL.set(drivername="postgresql").render_as_string(hide_password=False)
+        backoff = 1
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn, **async_connect_args)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: self._lost(lost))
+                await conn.add_listener(self.channel, self._on_notify)
+                await self.connected(conn)
+                backoff = 1
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), self.ping_seconds)
+                    except asyncio.TimeoutError:
+                        # A silently dropped connection only shows when used
+                        await asyncio.wait_for(conn.fetchval("SELECT 1"), self.ping_seconds)
+                        await self.idle(conn)
+                raise ConnectionError("connection closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("LISTEN %s disconnected: %s", self.channel, e)
+            finally:
+                self.disconnected()
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
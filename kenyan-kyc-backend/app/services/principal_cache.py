@@ -0,0 +1,219 @@
+"""
+In-process cache of authenticated principals for get_current_user
+
+A valid token used to cost a ``SELECT ... FROM users`` on every request.
+Active users are now kept here for up to PRINCIPAL_CACHE_TTL_SECONDS (at
+most PRINCIPAL_CACHE_MAX_ENTRIES of them, least recently used out first)
+as plain column values; every hit hands out a fresh detached ``User``, so
+a route that adds its user to a session never shares the instance.
+
+An entry is dropped whenever its users row changes:
+- in this process, right after the commit of any session that called
+  ``invalidate_on_commit`` (profile edits, admin verification, score and
+  receipts_version writes, bulk rescoring)
+- in every process, by the ``users_notify_change`` trigger
+  (migrations/012_principal_invalidation.sql), which NOTIFYs the user ids
+  on channel ``user_changed`` to a LISTEN connection each worker keeps
+  (``PrincipalListener``, see app/services/pg_notify.py); large
+  statements send ``*`` and workers clear everything
+
+With PRINCIPAL_CACHE_LISTEN on, the cache only serves while that
+connection is up and the trigger exists, so a lost notification can never
+serve a stale principal; the TTL bounds staleness only when it is off.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.models.models import User
+from app.services.pg_notify import NotificationListener
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "user_changed"
+# Payload telling listeners to drop every entry
+INVALIDATE_ALL = "*"
+
+_COLUMNS = [column.key for column in User.__mapper__.column_attrs]
+
+
+class PrincipalCache:
+    """Size-bounded TTL cache of active users' column values, keyed by id."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, require_listener: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Serve only while a PrincipalListener is connected
+        self.require_listener = require_listener
+        self.listening = False
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # Fill tokens: a lookup that raced an invalidation must not be cached
+        self._sequence = 0
+        self._invalidated: dict = {}
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and (self.listening or not self.require_listener)
+
+    def get(self, user_id: uuid.UUID) -> Optional[User]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            values = entry[1]
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def token(self) -> int:
+        """Taken before the database lookup whose result goes to ``put``."""
+        with self._lock:
+            return self._sequence
+
+    def put(self, user: User, token: int) -> None:
+        if not self.enabled:
+            return
+        values = {name: getattr(user, name) for name in _COLUMNS}
+        with self._lock:
+            if token < self._floor or self._invalidated.get(user.id, -1) >= token:
+                return
+            self._entries[user.id] = (time.monotonic() + self.ttl_seconds, values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._invalidated[user_id] = self._sequence
+            self._sequence += 1
+            self.invalidations += 1
+            if len(self._invalidated) > self.max_entries:
+                # Forget the per-user marks; fills started before now are refused
+                self._invalidated.clear()
+                self._floor = self._sequence
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._invalidated.clear()
+            self._sequence += 1
+            self._floor = self._sequence
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "listening": self.listening,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    require_listener=settings.PRINCIPAL_CACHE_LISTEN,
+)
+
+
+# -------------------------------------------------
+# Local invalidation, after commit
+# -------------------------------------------------
+_PENDING = "principal_cache_invalidations"
+
+
+def invalidate_on_commit(db: Session, *user_ids) -> None:
+    """Drop these users from this process's cache once ``db`` commits."""
+    db.info.setdefault(_PENDING, set()).update(
+        uuid.UUID(str(user_id)) for user_id in user_ids
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING, ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING, None)
+
+
+# -------------------------------------------------
+# Cross-process invalidation, LISTEN user_changed
+# -------------------------------------------------
+class PrincipalListener(NotificationListener):
+    """Drops other workers' changed users from the cache (LISTEN user_changed)."""
+
+    channel = CHANNEL
+
+    def __init__(self, cache: PrincipalCache, ping_seconds: float = 30):
+        super().__init__(ping_seconds)
+        self.cache = cache
+        self.warned_missing_trigger = False
+
+    async def _start_listening(self, conn) -> None:
+        # Without the trigger no other worker's change ever arrives, so
+        # cached principals could outlive a deactivation by the whole TTL
+        if not await conn.fetchval(
+            "SELECT exists(SELECT 1 FROM pg_trigger WHERE tgname = 'users_notify_change')"
+        ):
+            if not self.warned_missing_trigger:
+                logger.warning(
+                    "users_notify_change trigger missing (apply "
+                    "migrations/012_principal_invalidation.sql): principal "
+                    "cache disabled"
+                )
+            self.warned_missing_trigger = True
+            return
+        self.warned_missing_trigger = False
+        # Anything may have changed while nobody was listening
+        self.cache.clear()
+        self.cache.listening = True
+
+    async def connected(self, conn) -> None:
+        await self._start_listening(conn)
+
+    def disconnected(self) -> None:
+        self.cache.listening = False
+
+    def notify(self, payload: str) -> None:
+        if payload == INVALIDATE_ALL:
+            self.cache.clear()
+            return
+        try:
+            self.cache.invalidate(uuid.UUID(payload))
+        except ValueError:
+            logger.warning("Ignoring %s notification %r", CHANNEL, payload)
+
+    async def idle(self, conn) -> None:
+        if not self.cache.listening:
+            # The trigger may have been created since
+            await self._start_listening(conn)
+
+
+principal_listener = PrincipalListener(principal_cache)
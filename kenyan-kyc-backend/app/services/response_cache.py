@@ -0,0 +1,201 @@
+"""
+Versioned response cache for per-user score reads
+
+Entries are keyed by (kind, user, receipts_version, scoring config). Every
+receipt upload/delete (scored or not) and every score write that changes
+the stored score bumps ``users.receipts_version``, so a key never maps to
+stale content and nothing has to be invalidated explicitly; old versions
+simply age out. Bodies that also show the profile (GET /users/bootstrap)
+add ``users.updated_at`` to the version.
+
+Two tiers:
+- a per-process LRU (always on)
+- an optional shared backend (RESPONSE_CACHE_BACKEND=redis) so a body
+  built on one API node is reused by the others
+
+Bodies are stored as serialised JSON bytes, so a hit is returned without
+re-encoding. The ETag is derived from the key alone: a client holding the
+current version gets a 304 before the cache (or the database) is read.
+"""
+
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+import anyio
+
+from app.core.config import settings
+from app.services.kyc_scoring import SCORING_CONFIG_KEY
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """Minimal interface every shared cache backend implements."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: int) -> None:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Thread-safe LRU bounded by entry count (TTL is not needed: keys are versioned)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: int = 0) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Entries in a Redis shared by every API node (redis is only needed here)."""
+
+    def __init__(self, url: str, prefix: str = "kyc:resp:"):
+        try:
+            import redis
+        except ImportError as e:  # pragma: no cover - depends on deployment
+            raise RuntimeError(
+                "RESPONSE_CACHE_BACKEND=redis requires redis (pip install redis)"
+            ) from e
+
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: int) -> None:
+        self.client.set(self.prefix + key, value, ex=ttl_seconds or None)
+
+
+class VersionedResponseCache:
+    """Per-process LRU in front of an optional shared backend."""
+
+    def __init__(
+        self,
+        local: MemoryCacheBackend,
+        shared: Optional[CacheBackend] = None,
+        ttl_seconds: int = 0,
+        config_key: str = SCORING_CONFIG_KEY,
+    ):
+        self.local = local
+        self.shared = shared
+        self.ttl_seconds = ttl_seconds
+        self.config_key = config_key
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def key(self, kind: str, user_id, version: int | str) -> str:
+        return f"{kind}:{user_id}:{version}:{self.config_key}"
+
+    def etag(self, kind: str, user_id, version: int | str) -> str:
+        digest = hashlib.sha256(self.key(kind, user_id, version).encode()).hexdigest()
+        return f'W/"{digest[:32]}"'
+
+    def get_or_build(
+        self, kind: str, user_id, version: int | str, build: Callable[[], bytes]
+    ) -> bytes:
+        key = self.key(kind, user_id, version)
+        body = self._get_local(key)
+        if body is None and self.shared is not None:
+            body = self._get_shared(key)
+        if body is None:
+            self.misses += 1
+            body = build()
+            self.local.set(key, body)
+            if self.shared is not None:
+                self._set_shared(key, body)
+        return body
+
+    async def get_or_build_async(
+        self, kind: str, user_id, version: int | str, build: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        """``get_or_build`` for async routes; the shared backend is called off the event loop."""
+        key = self.key(kind, user_id, version)
+        body = self._get_local(key)
+        if body is None and self.shared is not None:
+            body = await anyio.to_thread.run_sync(self._get_shared, key)
+        if body is None:
+            self.misses += 1
+            body = await build()
+            self.local.set(key, body)
+            if self.shared is not None:
+                await anyio.to_thread.run_sync(self._set_shared, key, body)
+        return body
+
+    def _get_local(self, key: str) -> Optional[bytes]:
+        body = self.local.get(key)
+        if body is not None:
+            self.hits += 1
+        return body
+
+    def _get_shared(self, key: str) -> Optional[bytes]:
+        try:
+            body = self.shared.get(key)
+        except Exception as e:
+            # A cache outage only costs a rebuild
+            logger.warning("Response cache read failed for %s: %s", key, e)
+            return None
+        if body is not None:
+            self.shared_hits += 1
+            self.local.set(key, body)
+        return body
+
+    def _set_shared(self, key: str, body: bytes) -> None:
+        try:
+            self.shared.set(key, body, self.ttl_seconds)
+        except Exception as e:
+            logger.warning("Response cache write failed for %s: %s", key, e)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "backend": "redis" if self.shared is not None else "memory",
+            "local_entries": len(self.local),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+        }
+
+
+def build_response_cache() -> VersionedResponseCache:
+    backend = settings.RESPONSE_CACHE_BACKEND.lower()
+    shared = None
+    if backend == "redis":
+        shared = RedisCacheBackend(settings.RESPONSE_CACHE_REDIS_URL)
+    elif backend != "memory":
+        raise RuntimeError(f"Unknown RESPONSE_CACHE_BACKEND: {settings.RESPONSE_CACHE_BACKEND}")
+    return VersionedResponseCache(
+        MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES),
+        shared=shared,
+        ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    )
+
+
+response_cache = build_response_cache()
@@ -0,0 +1,192 @@
+"""
+Read-only calibration sweeps over the scoring settings.
+
+A columnar snapshot of every scored receipt is loaded once (through the
+same stream the bulk rescorer uses) and kept in memory. Each sweep then
+re-applies the drop rules for every (confidence cut-off, outlier cap) pair,
+computes the components once for that pair and evaluates all weight sets
+with a single matrix product; each verification threshold is then one
+vectorized comparison. Nothing is written back.
+
+Final scores are rounded in float64, so a user sitting exactly on a .xx5
+tie next to a threshold may be counted on the other side than the Decimal
+scorer would place them; at calibration granularity that is noise.
+"""
+
+import itertools
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import ROUND_FLOOR, Decimal
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.bulk_rescoring import (
+    COMPONENTS,
+    ReceiptColumns,
+    _hundredths,
+    component_scores,
+    stream_receipt_chunks,
+)
+from app.services.kyc_scoring import UNDER_REVIEW_SCORE
+
+
+@dataclass
+class ScoringSnapshot:
+    columns: Optional[ReceiptColumns]  # None when there are no scored receipts
+    loaded_at: datetime
+    load_seconds: float
+
+    @classmethod
+    def load(cls, db: Session, chunk_rows: int = settings.RESCORE_CHUNK_ROWS) -> "ScoringSnapshot":
+        started = time.perf_counter()
+        parts = list(stream_receipt_chunks(db, chunk_rows))
+        columns = ReceiptColumns.concat(parts) if parts else None
+        return cls(columns, datetime.utcnow(), round(time.perf_counter() - started, 3))
+
+    @property
+    def users(self) -> int:
+        return self.columns.size if self.columns else 0
+
+    @property
+    def receipts(self) -> int:
+        return self.columns.row_count if self.columns else 0
+
+    @property
+    def age_seconds(self) -> float:
+        return (datetime.utcnow() - self.loaded_at).total_seconds()
+
+
+@dataclass
+class SweepResult:
+    users: int
+    receipts: int
+    snapshot_loaded_at: datetime
+    grid_points: int
+    seconds: float
+    points: list = field(default_factory=list)
+
+
+def _cents_cap(max_amount) -> Optional[int]:
+    if max_amount is None:
+        return None
+    return int((Decimal(str(max_amount)) * 100).to_integral_value(ROUND_FLOOR))
+
+
+def _count_at_least(scaled: np.ndarray, cut: int) -> np.ndarray:
+    """Per column: how many values round (half-even, like Decimal.quantize) to >= cut."""
+    # x.5 rounds up to cut only when cut is even
+    reached = scaled >= cut - 0.5 if cut % 2 == 0 else scaled > cut - 0.5
+    return np.count_nonzero(reached, axis=0)
+
+
+def _weight_units(step) -> int:
+    units = int(round(1 / float(step)))
+    if units < 1 or units * Decimal(str(step)) != 1:
+        raise ValueError("weight_step must divide 1 exactly (e.g. 0.05, 0.1, 0.25)")
+    return units
+
+
+def weight_grid_size(step) -> int:
+    """How many weight sets ``weight_grid(step)`` returns, without building them."""
+    return math.comb(_weight_units(step) + 3, 3)
+
+
+def weight_grid(step) -> list[tuple[float, float, float, float]]:
+    """Every weight set on a ``step`` lattice whose four weights sum to 1."""
+    units = _weight_units(step)
+    return [
+        (a / units, b / units, c / units, (units - a - b - c) / units)
+        for a in range(units + 1)
+        for b in range(units + 1 - a)
+        for c in range(units + 1 - a - b)
+    ]
+
+
+def sweep(
+    snapshot: ScoringSnapshot,
+    min_confidences: Sequence,
+    max_amounts: Sequence,
+    weight_sets: Sequence[Sequence[float]],
+    thresholds: Sequence,
+) -> SweepResult:
+    """
+    Status counts for every combination of the given settings. Weights are
+    (document_quality, spending_pattern, consistency, diversity).
+    """
+    started = time.perf_counter()
+    cols, users = snapshot.columns, snapshot.users
+    weights = np.array(weight_sets, dtype=float).reshape(-1, len(COMPONENTS)).T  # 4 x W
+    threshold_h = [_hundredths(t) for t in thresholds]
+    review_h = _hundredths(UNDER_REVIEW_SCORE)
+    overall = np.where(cols.overall_ok, cols.overall, 0) if cols else None
+
+    points = []
+    for min_conf, max_amount in itertools.product(min_confidences, max_amounts):
+        if cols is None:
+            scaled = np.zeros((0, weights.shape[1]))
+        else:
+            # The per-user outlier cut is not swept: scores were taken at upload
+            trusted = cols.named & ~cols.outlier & (overall >= _hundredths(min_conf))
+            cap = _cents_cap(max_amount)
+            if cap is not None:
+                trusted &= cols.cents <= cap
+            sums = cols.sums(trusted)
+            components = component_scores(sums)
+            matrix = np.column_stack([components[name] for name in COMPONENTS])  # U x 4
+            # Final scores in hundredths, U x W (scaling after the product, like
+            # the scorer's quantize, keeps exact .xx5 ties where Decimal has them)
+            scaled = matrix @ weights
+            scaled *= 100
+            # Users with nothing trusted are never verified, whatever the threshold
+            scaled[sums.receipt_count == 0] = -1
+
+        # Users whose rounded final score reaches each cut-off, per weight set
+        at_least = {cut: _count_at_least(scaled, cut) for cut in {review_h, *threshold_h}}
+        for w, weight_set in enumerate(weight_sets):
+            named_weights = dict(zip(COMPONENTS, map(float, weight_set)))
+            for threshold, cut in zip(thresholds, threshold_h):
+                verified = int(at_least[cut][w])
+                under_review = int(at_least[review_h][w] - at_least[max(cut, review_h)][w])
+                points.append(
+                    {
+                        "min_confidence": min_conf,
+                        "max_amount": max_amount,
+                        "weights": named_weights,
+                        "verification_threshold": threshold,
+                        "verified": verified,
+                        "under_review": under_review,
+                        "pending": users - verified - under_review,
+                    }
+                )
+
+    return SweepResult(
+        users=users,
+        receipts=snapshot.receipts,
+        snapshot_loaded_at=snapshot.loaded_at,
+        grid_points=len(points),
+        seconds=round(time.perf_counter() - started, 4),
+        points=points,
+    )
+
+
+_snapshot: Optional[ScoringSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(db: Session, refresh: bool = False) -> ScoringSnapshot:
+    """Process-wide snapshot, reloaded when older than SCORING_SNAPSHOT_TTL_SECONDS."""
+    global _snapshot
+    with _snapshot_lock:
+        if (
+            refresh
+            or _snapshot is None
+            or _snapshot.age_seconds > settings.SCORING_SNAPSHOT_TTL_SECONDS
+        ):
+            _snapshot = ScoringSnapshot.load(db)
+        return _snapshot
@@ -0,0 +1,455 @@
+"""
+Receipt Storage - pluggable backends + content-addressed blobs
+
+Backends only know about opaque keys:
+- LocalStorageBackend: files under UPLOAD_DIR (single node / dev)
+- S3StorageBackend: any S3-compatible API (AWS, MinIO, Ceph ...), so API
+  and inference workers on different nodes see the same files
+
+On top of a backend, ContentAddressedStore names blobs by the SHA-256 of
+their bytes and fans them out over two levels (``blobs/ab/cd/abcd...``).
+Identical uploads share one blob; ``receipt_blobs`` keeps a reference
+count so a file is only removed once no receipt points at it. A
+transaction-scoped advisory lock per blob (``lock``) orders an upload
+that reuses a file against the removal of its last reference.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from sqlalchemy import delete, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import ReceiptBlob
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class StorageBackend(ABC):
+    """Minimal interface every storage backend implements."""
+
+    @abstractmethod
+    def put_file(self, key: str, local_path: str, content_type: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        ...
+
+    @abstractmethod
+    def stream_range(
+        self, key: str, start: int, length: int, chunk_size: int = CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """Stream ``length`` bytes starting at byte offset ``start``."""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def local_path(self, key: str):
+        """Context manager yielding a filesystem path holding the object (for OCR/ML)."""
+
+    def presigned_url(
+        self,
+        key: str,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ) -> Optional[str]:
+        """Return a time-limited direct download URL, or None if unsupported."""
+        return None
+
+
+class LocalStorageBackend(StorageBackend):
+    """Objects stored as plain files below ``root``."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def put_file(self, key: str, local_path: str, content_type: Optional[str] = None) -> None:
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(local_path, target)
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def size(self, key: str) -> int:
+        return self._path(key).stat().st_size
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def stream_range(
+        self, key: str, start: int, length: int, chunk_size: int = CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    @contextmanager
+    def local_path(self, key: str) -> Iterator[str]:
+        yield str(self._path(key))
+
+
+class S3StorageBackend(StorageBackend):
+    """Objects stored in an S3-compatible bucket (boto3 is only needed here)."""
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        presign_expires: int = 300,
+    ):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError as e:  # pragma: no cover - depends on deployment
+            raise RuntimeError(
+                "STORAGE_BACKEND=s3 requires boto3 (pip install boto3)"
+            ) from e
+
+        self.bucket = bucket
+        self.presign_expires = presign_expires
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+            # Path-style addressing keeps MinIO and other local stand-ins happy
+            config=Config(s3={"addressing_style": "path"}, signature_version="s3v4"),
+        )
+
+    def _is_missing(self, error) -> bool:
+        code = str(error.response.get("Error", {}).get("Code", ""))
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def put_file(self, key: str, local_path: str, content_type: Optional[str] = None) -> None:
+        extra = {"ContentType": content_type} if content_type else None
+        self.client.upload_file(local_path, self.bucket, key, ExtraArgs=extra)
+        os.remove(local_path)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if self._is_missing(e):
+                return False
+            raise
+        return True
+
+    def size(self, key: str) -> int:
+        return int(self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"])
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        try:
+            for chunk in body.iter_chunks(chunk_size):
+                yield chunk
+        finally:
+            body.close()
+
+    def stream_range(
+        self, key: str, start: int, length: int, chunk_size: int = CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        body = self.client.get_object(
+            Bucket=self.bucket,
+            Key=key,
+            Range=f"bytes={start}-{start + length - 1}",
+        )["Body"]
+        try:
+            for chunk in body.iter_chunks(chunk_size):
+                yield chunk
+        finally:
+            body.close()
+
+    def delete(self, key: str) -> bool:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        return True
+
+    @contextmanager
+    def local_path(self, key: str) -> Iterator[str]:
+        fd, tmp_path = tempfile.mkstemp(prefix="receipt-")
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, key, tmp_path)
+            yield tmp_path
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def presigned_url(
+        self,
+        key: str,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": key}
+        if filename:
+            params["ResponseContentDisposition"] = f'inline; filename="{filename}"'
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=self.presign_expires
+        )
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    content_hash: str
+    size: int
+    key: str
+
+
+class ContentAddressedStore:
+    """
+    Blob store keyed by SHA-256 with a two-level fan-out layout.
+    Each store is one storage tier: its blobs live under ``prefix`` and are
+    reference-counted separately from other tiers.
+    """
+
+    def __init__(
+        self,
+        backend: StorageBackend,
+        staging_dir: Optional[str] = None,
+        prefix: str = "blobs",
+        tier: str = "hot",
+    ):
+        self.backend = backend
+        self.prefix = prefix
+        self.tier = tier
+        # Uploads are hashed into a local staging file before being handed to
+        # the backend; keep it on the same filesystem as a local backend so
+        # the final move is an atomic rename.
+        self.tmp_dir = Path(staging_dir or tempfile.gettempdir())
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    def key_for(self, content_hash: str) -> str:
+        return f"{self.prefix}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+    def exists(self, content_hash: str) -> bool:
+        return self.backend.exists(self.key_for(content_hash))
+
+    def lock(self, db: Session, content_hash: str) -> None:
+        """
+        Hold this blob's lock until ``db``'s transaction ends. Taken before
+        an upload decides to reuse the file and before the file is removed,
+        so neither can happen between the other's check and commit.
+        """
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {"key": self.key_for(content_hash)},
+        )
+
+    def save(
+        self,
+        fileobj: BinaryIO,
+        max_size: Optional[int] = None,
+        content_type: Optional[str] = None,
+        db: Optional[Session] = None,
+    ) -> StoredBlob:
+        """
+        Stream ``fileobj`` to a local staging file, hashing as it is written,
+        then hand it to the backend. If a blob with the same digest already
+        exists the new copy is discarded.
+
+        Pass the ``db`` that will ``add_reference`` it: the blob's lock is
+        then taken before the existence check and held until that commit,
+        so the file cannot be removed in between.
+        """
+        digest = hashlib.sha256()
+        size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = fileobj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise ValueError(
+                            f"File exceeds maximum size of {max_size} bytes"
+                        )
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            content_hash = digest.hexdigest()
+            key = self.key_for(content_hash)
+            if db is not None:
+                self.lock(db, content_hash)
+            if self.backend.exists(key):
+                os.remove(tmp_path)
+                logger.info("Deduplicated upload into existing blob %s", content_hash)
+            else:
+                self.backend.put_file(key, tmp_path, content_type=content_type)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return StoredBlob(content_hash=content_hash, size=size, key=key)
+
+    def stream(self, content_hash: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        return self.backend.stream(self.key_for(content_hash), chunk_size)
+
+    def local_path(self, content_hash: str):
+        return self.backend.local_path(self.key_for(content_hash))
+
+    def presigned_url(self, content_hash: str, filename=None, content_type=None) -> Optional[str]:
+        return self.backend.presigned_url(
+            self.key_for(content_hash), filename=filename, content_type=content_type
+        )
+
+    def remove(self, content_hash: str) -> bool:
+        removed = self.backend.delete(self.key_for(content_hash))
+        if removed:
+            logger.info("Removed unreferenced blob %s", content_hash)
+        return removed
+
+    # -------------------------------------------------
+    # Reference counting (runs inside the caller's transaction)
+    # -------------------------------------------------
+    def add_reference(self, db: Session, blob: StoredBlob) -> None:
+        self.lock(db, blob.content_hash)
+        stmt = insert(ReceiptBlob).values(
+            content_hash=blob.content_hash,
+            tier=self.tier,
+            size_bytes=blob.size,
+            ref_count=1,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ReceiptBlob.content_hash, ReceiptBlob.tier],
+            set_={"ref_count": ReceiptBlob.ref_count + 1},
+        )
+        db.execute(stmt)
+
+    def release_reference(self, db: Session, content_hash: str) -> bool:
+        """
+        Drop one reference. Returns True when this was the last one, in which
+        case the caller should call ``remove_if_unreferenced`` after commit.
+        """
+        remaining = db.execute(
+            update(ReceiptBlob)
+            .where(
+                ReceiptBlob.content_hash == content_hash,
+                ReceiptBlob.tier == self.tier,
+            )
+            .values(ref_count=ReceiptBlob.ref_count - 1)
+            .returning(ReceiptBlob.ref_count)
+        ).scalar()
+
+        if remaining is None or remaining > 0:
+            return False
+
+        db.execute(
+            delete(ReceiptBlob).where(
+                ReceiptBlob.content_hash == content_hash,
+                ReceiptBlob.tier == self.tier,
+                ReceiptBlob.ref_count <= 0,
+            )
+        )
+        return True
+
+    def remove_if_unreferenced(self, db: Session, content_hash: str) -> bool:
+        """
+        Unlink the blob if no row references it, under its lock. An upload
+        that reused the file holds the lock until its reference commits, so
+        the check below sees that reference; one that comes later finds the
+        file gone and stores it again. Commits ``db`` to release the lock.
+        """
+        try:
+            self.lock(db, content_hash)
+            still_referenced = (
+                db.query(ReceiptBlob.content_hash)
+                .filter(
+                    ReceiptBlob.content_hash == content_hash,
+                    ReceiptBlob.tier == self.tier,
+                )
+                .first()
+            )
+            if still_referenced:
+                return False
+            # The file itself may already be gone (e.g. moved into an archive
+            # segment); the blob is unreferenced either way
+            self.remove(content_hash)
+            return True
+        finally:
+            db.commit()
+
+
+def build_storage_backend() -> StorageBackend:
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend == "s3":
+        return S3StorageBackend(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            presign_expires=settings.S3_PRESIGN_EXPIRES_SECONDS,
+        )
+    if backend != "local":
+        raise RuntimeError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+    return LocalStorageBackend(settings.UPLOAD_DIR)
+
+
+storage_backend = build_storage_backend()
+_staging_dir = os.path.join(settings.UPLOAD_DIR, "tmp")
+
+# Files read by OCR and the UI
+blob_store = ContentAddressedStore(storage_backend, staging_dir=_staging_dir)
+
+# Raw originals kept after upload normalization; the prefix lets object
+# storage lifecycle rules move them to an infrequent-access class
+cold_store = ContentAddressedStore(
+    storage_backend, staging_dir=_staging_dir, prefix="cold", tier="cold"
+)
@@ -0,0 +1,228 @@
+"""
+Access token revocation, checked on every request without a query
+
+Access tokens carry a ``jti``. ``POST /auth/logout`` writes it to
+``revoked_tokens`` (migrations/014_token_revocation.sql), whose trigger
+NOTIFYs it on channel ``token_revoked``. Each worker keeps a Bloom filter
+of the unexpired revoked jtis, loaded when its LISTEN connection comes up
+(``RevocationListener``) and extended by every notification:
+
+- a jti the filter has never seen was never revoked, and
+  ``get_current_user`` carries on without touching the database
+- a possible hit (a revoked token, or a false positive at
+  TOKEN_REVOCATION_ERROR_RATE) is confirmed with a primary key lookup
+
+While the LISTEN connection is down, or the NOTIFY trigger is missing,
+the filter may be missing revocations, so every check goes to the database
+until it is back and reloaded. The filter is rebuilt every TOKEN_REVOCATION_REBUILD_SECONDS
+(expired rows are deleted first), or as soon as it holds more jtis than it
+was sized for.
+"""
+
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.models import RevokedToken
+from app.services.pg_notify import NotificationListener
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "token_revoked"
+
+
+class BloomFilter:
+    """Set membership with no false negatives, in ``-n ln(p) / ln(2)^2`` bits."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        # Two halves of one digest, combined (Kirsch-Mitzenmacher)
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def false_positive_rate(self) -> float:
+        """Expected rate at the current fill"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class RevocationFilter:
+    """A worker's Bloom filter of revoked jtis, trusted only while listening."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.listening = False
+        self.built_at = 0.0
+        self._filter = BloomFilter(capacity, error_rate)
+        # Filled during a rebuild; notifications go to both filters meanwhile
+        self._building: Optional[BloomFilter] = None
+        self.checks = 0
+        self.lookups = 0
+        self.confirmed = 0
+
+    def add(self, jti: str) -> None:
+        # A worker's own revocations come back as notifications too
+        for bloom in (self._filter, self._building):
+            if bloom is not None and jti not in bloom:
+                bloom.add(jti)
+
+    def begin_rebuild(self, expected: int) -> BloomFilter:
+        self._building = BloomFilter(max(self.capacity, 2 * expected), self.error_rate)
+        return self._building
+
+    def finish_rebuild(self) -> None:
+        self._filter, self._building = self._building, None
+        self.built_at = time.monotonic()
+
+    def needs_rebuild(self, rebuild_seconds: float) -> bool:
+        return (
+            self._filter.count > self._filter.capacity
+            or time.monotonic() - self.built_at > rebuild_seconds
+        )
+
+    def might_be_revoked(self, jti: str) -> bool:
+        self.checks += 1
+        if self.listening and jti not in self._filter:
+            return False
+        self.lookups += 1
+        return True
+
+    async def is_revoked(self, jti: str) -> bool:
+        if not self.might_be_revoked(jti):
+            return False
+        async with AsyncSessionLocal() as db:
+            revoked = (
+                await db.execute(select(RevokedToken.jti).where(RevokedToken.jti == jti))
+            ).first() is not None
+        self.confirmed += revoked
+        return revoked
+
+    def stats(self) -> dict:
+        return {
+            "listening": self.listening,
+            "entries": self._filter.count,
+            "capacity": self._filter.capacity,
+            "bytes": len(self._filter._bits),
+            "hashes": self._filter.hashes,
+            "expected_false_positive_rate": round(self._filter.false_positive_rate(), 6),
+            "checks": self.checks,
+            "lookups": self.lookups,
+            "confirmed": self.confirmed,
+        }
+
+
+revocation_filter = RevocationFilter(
+    capacity=settings.TOKEN_REVOCATION_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_ERROR_RATE,
+)
+
+
+async def revoke_token(db: AsyncSession, payload: dict, user_id) -> None:
+    """Revoke the access token with this decoded ``payload`` and commit."""
+    jti = payload.get("jti")
+    if jti is None:
+        # Issued before tokens had ids; it simply runs out
+        await db.commit()
+        return
+    await db.execute(
+        insert(RevokedToken)
+        .values(jti=jti, user_id=user_id, expires_at=datetime.utcfromtimestamp(payload["exp"]))
+        .on_conflict_do_nothing()
+    )
+    await db.commit()
+    # This worker enforces it at once; the others when the NOTIFY lands
+    revocation_filter.add(jti)
+
+
+class RevocationListener(NotificationListener):
+    """Loads the revoked jtis and adds each new one (LISTEN token_revoked)."""
+
+    channel = CHANNEL
+
+    def __init__(self, revocations: RevocationFilter, rebuild_seconds: float, ping_seconds: float = 30):
+        super().__init__(ping_seconds)
+        self.revocations = revocations
+        self.rebuild_seconds = rebuild_seconds
+        self.warned_missing_trigger = False
+
+    async def _rebuild(self, conn) -> None:
+        # The new filter exists before the SELECT: a jti committed too late
+        # for its snapshot is notified afterwards and lands in it too
+        started = time.perf_counter()
+        await conn.execute("DELETE FROM revoked_tokens WHERE expires_at < $1", datetime.utcnow())
+        building = self.revocations.begin_rebuild(
+            await conn.fetchval("SELECT count(*) FROM revoked_tokens")
+        )
+        rows = await conn.fetch("SELECT jti FROM revoked_tokens")
+        for row in rows:
+            building.add(row[0])
+        self.revocations.finish_rebuild()
+        logger.info(
+            "Loaded %d revoked tokens into the revocation filter in %.0f ms",
+            len(rows), (time.perf_counter() - started) * 1000,
+        )
+
+    async def _start_listening(self, conn) -> None:
+        # Without the trigger no other worker's revocation ever arrives, so
+        # the filter alone would accept their logged-out tokens
+        if not await conn.fetchval(
+            "SELECT exists(SELECT 1 FROM pg_trigger WHERE tgname = 'revoked_tokens_notify')"
+        ):
+            if not self.warned_missing_trigger:
+                logger.warning(
+                    "revoked_tokens_notify trigger missing (apply "
+                    "migrations/014_token_revocation.sql): every token check "
+                    "goes to the database"
+                )
+            self.warned_missing_trigger = True
+            return
+        self.warned_missing_trigger = False
+        await self._rebuild(conn)
+        self.revocations.listening = True
+
+    async def connected(self, conn) -> None:
+        await self._start_listening(conn)
+
+    def disconnected(self) -> None:
+        self.revocations.listening = False
+
+    def notify(self, payload: str) -> None:
+        self.revocations.add(payload)
+
+    async def idle(self, conn) -> None:
+        if not self.revocations.listening:
+            # The trigger may have been created since
+            await self._start_listening(conn)
+        elif self.revocations.needs_rebuild(self.rebuild_seconds):
+            await self._rebuild(conn)
+
+
+revocation_listener = RevocationListener(
+    revocation_filter, rebuild_seconds=settings.TOKEN_REVOCATION_REBUILD_SECONDS
+)
@@ -0,0 +1,202 @@
+"""
+Conditional + Range-aware responses for stored blobs, and conditional
+responses for versioned JSON reads
+"""
+
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Iterator, Optional
+
+from fastapi import Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.services.storage import storage_backend
+
+# Blobs are content-addressed, so the bytes behind a URL never change
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Versioned API reads: always revalidate, an unchanged version costs a 304
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [c.strip() for c in header.split(",")]
+    bare = etag.removeprefix("W/")
+    return any(c == "*" or c.removeprefix("W/") == bare for c in candidates)
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def _parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into (start, end) inclusive.
+    Returns None when the header is malformed or asks for several ranges,
+    in which case the whole body is served. Raises ValueError when the
+    range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _ranged_response(
+    request: Request,
+    get_size: Callable[[], int],
+    read_range: Callable[[int, int], Iterator[bytes]],
+    etag: str,
+    media_type: str,
+    last_modified: Optional[datetime],
+    filename: Optional[str],
+    cache_control: str,
+) -> Response:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+
+    # Only looked up once we know a body is needed (304s skip the stat)
+    size = get_size()
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or _etag_matches(if_range, etag)):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers=headers,
+            )
+
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(length)
+            return StreamingResponse(
+                read_range(start, length),
+                status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type=media_type,
+                headers=headers,
+            )
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(
+        read_range(0, size),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+def blob_response(
+    request: Request,
+    key: str,
+    etag: str,
+    media_type: str,
+    last_modified: Optional[datetime] = None,
+    filename: Optional[str] = None,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+    offset: int = 0,
+    size: Optional[int] = None,
+) -> Response:
+    """
+    Serve a stored object honouring If-None-Match / If-Modified-Since
+    (304) and single-range ``Range`` requests (206). ``offset``/``size``
+    serve a slice of the object, e.g. one entry of an archive segment.
+    """
+    whole_object = offset == 0 and size is None
+    known_size = size
+
+    def get_size() -> int:
+        nonlocal known_size
+        if known_size is None:
+            known_size = storage_backend.size(key) - offset
+        return known_size
+
+    def read_range(start: int, length: int) -> Iterator[bytes]:
+        if whole_object and start == 0 and length == known_size:
+            return storage_backend.stream(key)
+        return storage_backend.stream_range(key, offset + start, length)
+
+    return _ranged_response(
+        request, get_size, read_range, etag, media_type, last_modified, filename, cache_control
+    )
+
+
+def bytes_response(
+    request: Request,
+    data: bytes,
+    etag: str,
+    media_type: str,
+    last_modified: Optional[datetime] = None,
+    filename: Optional[str] = None,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+) -> Response:
+    """Same as ``blob_response`` for a body already held in memory."""
+
+    def read_range(start: int, length: int) -> Iterator[bytes]:
+        yield data[start:start + length]
+
+    return _ranged_response(
+        request, lambda: len(data), read_range, etag, media_type, last_modified, filename, cache_control
+    )
+
+
+async def versioned_json_response(
+    request: Request,
+    etag: str,
+    get_body: Callable[[], Awaitable[bytes]],
+    cache_control: str = REVALIDATE_CACHE_CONTROL,
+) -> Response:
+    """
+    Serve a JSON body whose ETag is known up front: a matching
+    If-None-Match is answered with 304 without calling ``get_body``.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=await get_body(), media_type="application/json", headers=headers)
@@ -0,0 +1,15 @@
+-- =====================================================
+-- 001: Content-addressed receipt storage
+-- Run once against existing databases, then move the files with:
+--     python -m app.scripts.migrate_uploads_to_cas
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS receipt_blobs (
+    content_hash VARCHAR(64) PRIMARY KEY, -- SHA-256 of the file bytes
+    size_bytes INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 1, -- Receipts pointing at this blob
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE receipts ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+CREATE INDEX IF NOT EXISTS idx_receipts_content_hash ON receipts(content_hash);
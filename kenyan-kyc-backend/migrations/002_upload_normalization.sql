@@ -0,0 +1,11 @@
+-- =====================================================
+-- 002: Upload normalization + cold tier for raw originals
+-- =====================================================
+
+-- Blobs are now reference-counted per storage tier ('hot' | 'cold')
+ALTER TABLE receipt_blobs ADD COLUMN IF NOT EXISTS tier VARCHAR(10) NOT NULL DEFAULT 'hot';
+ALTER TABLE receipt_blobs DROP CONSTRAINT IF EXISTS receipt_blobs_pkey;
+ALTER TABLE receipt_blobs ADD PRIMARY KEY (content_hash, tier);
+
+-- Raw upload kept in the cold tier when the stored copy was normalized
+ALTER TABLE receipts ADD COLUMN IF NOT EXISTS original_content_hash VARCHAR(64);
@@ -0,0 +1,26 @@
+-- =====================================================
+-- 003: Cold archive segments for processed receipt files
+-- Files are moved into segments by:
+--     python -m app.scripts.archive_receipts
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS archive_segments (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    storage_key VARCHAR(500) NOT NULL UNIQUE,
+    entry_count INTEGER NOT NULL,
+    size_bytes BIGINT NOT NULL, -- Bytes written to the segment file
+    raw_bytes BIGINT NOT NULL, -- Uncompressed bytes of its entries
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS archived_blobs (
+    content_hash VARCHAR(64) PRIMARY KEY,
+    segment_id UUID NOT NULL REFERENCES archive_segments(id),
+    "offset" BIGINT NOT NULL, -- Start of the payload inside the segment
+    length INTEGER NOT NULL, -- Payload bytes as stored
+    size_bytes INTEGER NOT NULL, -- Bytes after decompression
+    codec VARCHAR(10) NOT NULL DEFAULT 'none' CHECK (codec IN ('none', 'zlib')),
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_archived_blobs_segment_id ON archived_blobs(segment_id);
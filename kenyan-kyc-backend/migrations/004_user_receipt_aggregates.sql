@@ -0,0 +1,37 @@
+-- =====================================================
+-- 004: Per-user receipt aggregates for incremental scoring
+-- Rows are built lazily on a user's next score; to build them all up
+-- front (and to verify them later) run:
+--     python -m app.scripts.check_score_aggregates --repair
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS user_receipt_aggregates (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    rules_key VARCHAR(64) NOT NULL, -- Filter thresholds the row was built with
+
+    trusted_count INTEGER NOT NULL DEFAULT 0,
+    dropped_count INTEGER NOT NULL DEFAULT 0,
+    total_spending DECIMAL(14,2) NOT NULL DEFAULT 0,
+
+    overall_conf_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    overall_conf_count INTEGER NOT NULL DEFAULT 0,
+    conf_amount_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    conf_amount_count INTEGER NOT NULL DEFAULT 0,
+    conf_weighted_amount_sum DECIMAL(16,4) NOT NULL DEFAULT 0,
+
+    date_count INTEGER NOT NULL DEFAULT 0,
+    min_receipt_date DATE,
+    max_receipt_date DATE,
+    date_conf_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    date_conf_count INTEGER NOT NULL DEFAULT 0,
+
+    company_conf_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    company_conf_count INTEGER NOT NULL DEFAULT 0,
+    address_conf_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    address_conf_count INTEGER NOT NULL DEFAULT 0,
+
+    merchant_counts JSONB NOT NULL DEFAULT '{}', -- company_name -> receipts
+    address_counts JSONB NOT NULL DEFAULT '{}', -- receipt_address -> receipts
+
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
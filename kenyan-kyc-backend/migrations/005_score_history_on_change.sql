@@ -0,0 +1,24 @@
+-- =====================================================
+-- 005: Record verification_history only when a score changes
+-- Scores are now upserted (INSERT ... ON CONFLICT DO UPDATE) on every
+-- recalculation; an unchanged rescore must not add a history row.
+-- =====================================================
+
+DROP TRIGGER IF EXISTS log_verification_score_changes ON verification_scores;
+
+CREATE TRIGGER log_verification_score_inserts
+    AFTER INSERT ON verification_scores
+    FOR EACH ROW
+    EXECUTE FUNCTION log_score_to_history();
+
+CREATE TRIGGER log_verification_score_changes
+    AFTER UPDATE ON verification_scores
+    FOR EACH ROW
+    WHEN (
+        (OLD.document_quality_score, OLD.spending_pattern_score, OLD.consistency_score,
+         OLD.diversity_score, OLD.final_score, OLD.total_receipts)
+        IS DISTINCT FROM
+        (NEW.document_quality_score, NEW.spending_pattern_score, NEW.consistency_score,
+         NEW.diversity_score, NEW.final_score, NEW.total_receipts)
+    )
+    EXECUTE FUNCTION log_score_to_history();
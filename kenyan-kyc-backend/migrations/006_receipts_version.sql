@@ -0,0 +1,9 @@
+-- =====================================================
+-- 006: Per-user version counter for cached score reads
+-- Bumped by receipt uploads/deletes and by score writes that change the
+-- stored score; /verification/score and /verification/breakdown are cached
+-- and ETagged by (user, receipts_version, scoring config).
+-- =====================================================
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS receipts_version BIGINT NOT NULL DEFAULT 0;
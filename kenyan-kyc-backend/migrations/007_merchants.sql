@@ -0,0 +1,34 @@
+-- =====================================================
+-- 007: Canonical merchants for extracted company names
+-- Existing receipts are resolved (and their users rescored) by:
+--     python -m app.scripts.resolve_merchants
+-- pg_trgm is optional; without it the API matches names with an
+-- in-process trigram index (MERCHANT_MATCHER=auto picks either).
+-- =====================================================
+
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'pg_trgm is not available; merchant matching stays in-process';
+END $$;
+
+CREATE TABLE IF NOT EXISTS merchants (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL, -- First spelling seen, for display
+    normalized_name VARCHAR(255) NOT NULL UNIQUE, -- Lowercased, punctuation and legal suffixes stripped
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS idx_merchants_normalized_trgm
+            ON merchants USING GIN (normalized_name gin_trgm_ops);
+    END IF;
+END $$;
+
+ALTER TABLE receipts
+    ADD COLUMN IF NOT EXISTS merchant_id INTEGER REFERENCES merchants(id);
+
+CREATE INDEX IF NOT EXISTS idx_receipts_merchant_id ON receipts(merchant_id);
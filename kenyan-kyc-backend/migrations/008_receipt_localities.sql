@@ -0,0 +1,10 @@
+-- =====================================================
+-- 008: Gazetteer locality for each receipt address
+-- Localities live in app/data/kenya_localities.csv (county ids are
+-- the official county codes). Existing receipts are matched (and their
+-- users rescored) by:
+--     python -m app.scripts.resolve_localities
+-- =====================================================
+
+ALTER TABLE receipts
+    ADD COLUMN IF NOT EXISTS locality_id INTEGER;
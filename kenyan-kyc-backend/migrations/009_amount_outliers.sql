@@ -0,0 +1,14 @@
+-- =====================================================
+-- 009: Per-user amount outlier scores
+-- receipts.amount_outlier_score is a robust z-score of the amount against
+-- the user's earlier trusted receipts, whose log-scale histogram is kept
+-- in user_receipt_aggregates.amount_histogram. Existing receipts are
+-- scored (and their users rescored) by:
+--     python -m app.scripts.score_amount_outliers
+-- =====================================================
+
+ALTER TABLE receipts
+    ADD COLUMN IF NOT EXISTS amount_outlier_score DECIMAL(6,2);
+
+ALTER TABLE user_receipt_aggregates
+    ADD COLUMN IF NOT EXISTS amount_histogram JSONB NOT NULL DEFAULT '{}';
@@ -0,0 +1,13 @@
+-- =====================================================
+-- 010: Composite indexes for keyset pagination
+-- GET /receipts and GET /admin/users page newest first on
+-- (uploaded_at, id) and (created_at, id); each page is a range scan of
+-- these indexes however deep it is. CONCURRENTLY keeps the tables
+-- writable while they build, so run this file outside a transaction.
+-- =====================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_receipts_user_uploaded
+    ON receipts(user_id, uploaded_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_account_created
+    ON users(account_type, created_at DESC, id DESC);
@@ -0,0 +1,49 @@
+-- =====================================================
+-- 011: Admin statistics rollups
+-- GET /admin/statistics reads the single platform_stats row and
+-- GET /admin/statistics/daily reads platform_stats_daily; both are
+-- refreshed by the API when stale, or on a schedule by:
+--     python -m app.scripts.refresh_admin_stats [--full]
+-- Run it once with --full after applying this file to fill the series.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS platform_stats (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    total_users INTEGER NOT NULL DEFAULT 0,
+    verified_users INTEGER NOT NULL DEFAULT 0,
+    pending_users INTEGER NOT NULL DEFAULT 0,
+    under_review_users INTEGER NOT NULL DEFAULT 0,
+    total_receipts BIGINT NOT NULL DEFAULT 0,
+    processed_receipts BIGINT NOT NULL DEFAULT 0,
+    failed_receipts BIGINT NOT NULL DEFAULT 0,
+    total_platform_spending DECIMAL(16,2) NOT NULL DEFAULT 0,
+    unique_merchants INTEGER NOT NULL DEFAULT 0,
+    average_kyc_score DECIMAL(5,2) NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    refresh_ms INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS platform_stats_daily (
+    day DATE PRIMARY KEY,
+    new_users INTEGER NOT NULL DEFAULT 0,
+    verified_users INTEGER NOT NULL DEFAULT 0,
+    receipts_uploaded INTEGER NOT NULL DEFAULT 0,
+    receipts_processed INTEGER NOT NULL DEFAULT 0,
+    receipts_failed INTEGER NOT NULL DEFAULT 0,
+    spending DECIMAL(16,2) NOT NULL DEFAULT 0
+);
+
+-- The view joined users, receipts and verification_scores in full
+DROP VIEW IF EXISTS admin_statistics;
+CREATE VIEW admin_statistics AS
+SELECT
+    total_users,
+    verified_users,
+    pending_users,
+    total_receipts,
+    processed_receipts,
+    total_platform_spending,
+    average_kyc_score,
+    unique_merchants AS unique_companies,
+    refreshed_at
+FROM platform_stats;
@@ -0,0 +1,35 @@
+-- =====================================================
+-- 012: Principal cache invalidation
+-- get_current_user caches active users in every API worker
+-- (app/services/principal_cache.py). Any UPDATE or DELETE on users
+-- NOTIFYs the changed ids on channel user_changed, and each worker's
+-- LISTEN connection drops them from its cache. A statement touching more
+-- than 1000 users sends '*' instead and the workers clear their caches.
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION notify_user_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (SELECT count(*) FROM changed_users) > 1000 THEN
+        PERFORM pg_notify('user_changed', '*');
+    ELSE
+        PERFORM pg_notify('user_changed', id::text) FROM changed_users;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_notify_change ON users;
+DROP TRIGGER IF EXISTS users_notify_delete ON users;
+
+CREATE TRIGGER users_notify_change
+    AFTER UPDATE ON users
+    REFERENCING OLD TABLE AS changed_users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_user_changed();
+
+CREATE TRIGGER users_notify_delete
+    AFTER DELETE ON users
+    REFERENCING OLD TABLE AS changed_users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_user_changed();
@@ -0,0 +1,23 @@
+-- =====================================================
+-- 013: Refresh tokens
+-- POST /auth/login now also returns an opaque refresh token, exchanged at
+-- POST /auth/refresh for a new access token and a new refresh token, so
+-- clients stay signed in without sending the password (and paying for a
+-- bcrypt verify) every ACCESS_TOKEN_EXPIRE_MINUTES. Only the sha256 of a
+-- token is stored. Tokens from one login share a family_id; a spent token
+-- presented again revokes the whole family.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    family_id UUID NOT NULL,
+    token_hash VARCHAR(64) NOT NULL UNIQUE,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    used_at TIMESTAMP,
+    revoked_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_id ON refresh_tokens(user_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family_id ON refresh_tokens(family_id);
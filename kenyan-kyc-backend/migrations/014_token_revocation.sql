@@ -0,0 +1,35 @@
+-- =====================================================
+-- 014: Access token revocation
+-- POST /auth/logout revokes its access token by JWT id (jti) instead of
+-- leaving it valid until it expires. Every API worker keeps a Bloom
+-- filter of the revoked jtis (app/services/token_revocation.py), loaded
+-- from this table and kept current by LISTEN token_revoked, so tokens
+-- that were never revoked are accepted without a query. Rows can be
+-- deleted once expires_at (the token's exp) has passed; the workers do
+-- so when they rebuild their filters.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(64) PRIMARY KEY,
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+
+CREATE OR REPLACE FUNCTION notify_token_revoked()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('token_revoked', jti) FROM revoked_jtis;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS revoked_tokens_notify ON revoked_tokens;
+
+CREATE TRIGGER revoked_tokens_notify
+    AFTER INSERT ON revoked_tokens
+    REFERENCING NEW TABLE AS revoked_jtis
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_token_revoked();
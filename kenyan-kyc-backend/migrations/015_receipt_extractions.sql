@@ -0,0 +1,26 @@
+-- =====================================================
+-- 015: Receipt extractions off the receipts row
+-- The model's tokens, labels and decoded text move from
+-- receipts.raw_extraction_json into receipt_extractions as zlib-compressed
+-- JSON, read only by GET /receipts/{id}/extraction. raw_extraction_json
+-- keeps the model's fields and the token count.
+--
+-- The GIN index over the whole document is dropped: nothing queries it,
+-- and every key worth filtering on (company, date, amount, currency,
+-- confidence) is a typed column, indexed where a query uses it. Move the
+-- existing rows' tokens, then reclaim the space, with:
+--     python -m app.scripts.migrate_extractions
+--     VACUUM (ANALYZE) receipts;   -- or VACUUM FULL receipts to shrink the files
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS receipt_extractions (
+    receipt_id UUID PRIMARY KEY REFERENCES receipts(id) ON DELETE CASCADE,
+    payload BYTEA NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Already compressed: store out of line without trying pglz again
+ALTER TABLE receipt_extractions ALTER COLUMN payload SET STORAGE EXTERNAL;
+
+DROP INDEX IF EXISTS idx_receipts_extraction_json;
@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from app.services.admin_exports import DATASETS, encode_csv, encode_ndjson
+
+COLUMNS = ["user_id", "full_name", "phone_number", "total_spent", "last_upload"]
+ROWS = [
+    (uuid.UUID(int=1), "=SUM(A1:A9)", "+254712345678", Decimal("1250.50"), datetime(2025, 3, 1, 9, 30)),
+    (uuid.UUID(int=2), "Wanjiku", None, None, None),
+]
+
+
+def test_csv_batches_concatenate_to_one_document():
+    body = encode_csv(COLUMNS, ROWS[:1], header=True) + encode_csv(COLUMNS, ROWS[1:], header=False)
+    parsed = list(csv.reader(io.StringIO(body.decode())))
+    assert parsed == [
+        COLUMNS,
+        [str(uuid.UUID(int=1)), "'=SUM(A1:A9)", "+254712345678", "1250.50", "2025-03-01T09:30:00"],
+        [str(uuid.UUID(int=2)), "Wanjiku", "", "", ""],
+    ]
+    assert encode_csv(COLUMNS, (), header=True).decode() == ",".join(COLUMNS) + "\n"
+
+
+def test_csv_escapes_formulas_but_not_phone_numbers():
+    cells = ["-1+cmd|' /C calc'!A0", '+1+HYPERLINK("http://x")', "@SUM(A1)", "\tx", "+254712345678", "-"]
+    body = encode_csv(["c"] * len(cells), [cells, [Decimal("-12.50")] * len(cells)], header=False)
+    escaped, amounts = list(csv.reader(io.StringIO(body.decode())))
+    assert escaped == ["'" + cells[0], "'" + cells[1], "'@SUM(A1)", "'\tx", "+254712345678", "'-"]
+    assert amounts == ["-12.50"] * len(cells)
+
+
+def test_ndjson_is_one_object_per_line_encoded_like_the_api():
+    lines = encode_ndjson(COLUMNS, ROWS, header=True).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"user_id": str(uuid.UUID(int=1)), "full_name": "=SUM(A1:A9)", "phone_number": "+254712345678",
+         "total_spent": "1250.50", "last_upload": "2025-03-01T09:30:00"},
+        {"user_id": str(uuid.UUID(int=2)), "full_name": "Wanjiku", "phone_number": None,
+         "total_spent": None, "last_upload": None},
+    ]
+
+
+def test_each_dataset_is_a_single_statement_without_per_user_queries():
+    for build in DATASETS.values():
+        sql = str(build().compile())
+        assert sql.count("FROM users") == 1
+        assert "ORDER BY users.id" in sql
@@ -0,0 +1,21 @@
+from datetime import date
+
+from app.core.config import settings
+from app.services.admin_stats import cache_control, contiguous_days
+
+
+def test_series_is_contiguous():
+    stored = {date(2025, 3, 2): "row"}
+    assert contiguous_days(stored, date(2025, 2, 28), 4) == [
+        {"day": date(2025, 2, 28)},
+        {"day": date(2025, 3, 1)},
+        "row",
+        {"day": date(2025, 3, 3)},
+    ]
+
+
+def test_browsers_reuse_only_the_remaining_freshness(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_STATS_MAX_AGE_SECONDS", 60)
+    monkeypatch.setattr(settings, "ADMIN_STATS_STALE_SECONDS", 600)
+    assert cache_control(15.5) == "private, max-age=44, stale-while-revalidate=600"
+    assert cache_control(3600) == "private, max-age=0, stale-while-revalidate=600"
@@ -0,0 +1,43 @@
+import random
+import statistics
+from decimal import Decimal
+
+from app.services.amount_outliers import AmountSketch, amount_position, outlier_score
+
+
+def _sketch(amounts):
+    sketch = AmountSketch()
+    for amount in amounts:
+        sketch.add(Decimal(amount))
+    return sketch
+
+
+def test_adds_and_removes_are_exact():
+    rng = random.Random(39)
+    amounts = [Decimal(rng.randint(100, 5_000_000)) / 100 for _ in range(200)]
+    sketch = _sketch(amounts)
+    for amount in amounts[50:]:
+        sketch.add(amount, -1)
+    assert sketch.as_json() == _sketch(amounts[:50]).as_json()
+    # Stored as JSONB with string keys
+    assert AmountSketch(sketch.as_json()).counts == sketch.counts
+
+
+def test_median_tracks_the_exact_log_median():
+    rng = random.Random(39)
+    amounts = [Decimal(round(rng.lognormvariate(7, 1), 2)) for _ in range(1001)]
+    exact = statistics.median(amount_position(a) for a in amounts)
+    assert abs(_sketch(amounts).median() - exact) < 1  # within one bucket (~12%)
+
+
+def test_outliers_are_relative_to_the_user():
+    low_spender = _sketch(["180", "220", "250", "300", "310", "350", "400", "420", "500", "260"])
+    high_spender = _sketch(["15000", "18000", "22000", "25000", "30000", "35000", "40000",
+                            "45000", "60000", "28000"])
+
+    assert outlier_score(low_spender, Decimal("320"), 10) < 1
+    assert outlier_score(low_spender, Decimal("25000"), 10) > Decimal("3.5")
+    assert outlier_score(high_spender, Decimal("25000"), 10) < 1
+    assert outlier_score(high_spender, Decimal("2132779"), 10) > Decimal("3.5")
+    # Not enough history yet
+    assert outlier_score(low_spender, Decimal("25000"), 11) is None
@@ -0,0 +1,42 @@
+import hashlib
+import os
+
+from app.models.models import ArchivedBlob, ArchiveSegment
+from app.services.archive import ENTRY_HEADER, ReceiptArchive, SegmentWriter
+from app.services.storage import ContentAddressedStore, LocalStorageBackend
+
+
+def test_segment_entries_read_back_with_one_ranged_read(tmp_path):
+    backend = LocalStorageBackend(str(tmp_path / "uploads"))
+    store = ContentAddressedStore(backend, staging_dir=str(tmp_path / "uploads" / "tmp"))
+    archive = ReceiptArchive(backend, store)
+
+    text_like = b"TOTAL KES 1,234.50\n" * 500  # compresses well
+    image_like = os.urandom(20_000)  # already-compressed bytes stay raw
+    blobs = {hashlib.sha256(d).hexdigest(): d for d in (text_like, image_like)}
+
+    writer = SegmentWriter(str(store.tmp_dir))
+    for content_hash, data in blobs.items():
+        writer.append(content_hash, data)
+    writer.close()
+
+    key = archive.segment_key(writer.segment_id)
+    backend.put_file(key, writer.path)
+    segment = ArchiveSegment(id=writer.segment_id, storage_key=key)
+
+    codecs = {}
+    for entry in writer.entries:
+        blob = ArchivedBlob(segment=segment, **entry)
+        codecs[entry["content_hash"]] = entry["codec"]
+        assert archive.read(blob) == blobs[entry["content_hash"]]
+
+    assert codecs[hashlib.sha256(text_like).hexdigest()] == "zlib"
+    assert codecs[hashlib.sha256(image_like).hexdigest()] == "none"
+
+    # Segments are self-describing: the first header names the first blob
+    raw = (tmp_path / "uploads" / key).read_bytes()
+    magic, digest, _, length = ENTRY_HEADER.unpack_from(raw)
+    assert magic == b"KRA1"
+    assert digest.hex() == writer.entries[0]["content_hash"]
+    assert length == writer.entries[0]["length"]
+    assert len(raw) == writer.size
@@ -0,0 +1,46 @@
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.api.routes.users import _BOOTSTRAP_COLUMNS
+from app.models.models import Receipt
+from app.schemas import ReceiptResponse
+from app.services.kyc_scoring import SCORING_COLUMNS, is_scored_receipt, partition_receipts
+
+
+def _receipt(status="completed", amount="500.00", confidence="0.97", company="NAIVAS LTD"):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        status=status,
+        company_name=company,
+        total_amount=Decimal(amount) if amount else None,
+        amount_outlier_score=None,
+        overall_confidence=Decimal(confidence),
+    )
+
+
+def test_one_fetch_covers_the_listing_and_the_breakdown():
+    loaded = [column.key for column in _BOOTSTRAP_COLUMNS]
+    assert len(loaded) == len(set(loaded))
+    assert {c.key for c in SCORING_COLUMNS} <= set(loaded)
+    assert {name for name in ReceiptResponse.model_fields if name in Receipt.__table__.c} <= set(loaded)
+    assert "raw_extraction_json" not in loaded
+
+
+def test_partition_of_fetched_receipts_matches_scoring():
+    receipts = [
+        _receipt(),
+        _receipt(status="failed"),
+        _receipt(amount=None),
+        _receipt(confidence="0.50"),
+        _receipt(company="unknown"),
+        _receipt(status="processing"),
+    ]
+    scored = [r for r in receipts if is_scored_receipt(r)]
+    assert scored == [receipts[0], receipts[3], receipts[4]]
+
+    trusted, dropped = partition_receipts(scored)
+    assert trusted == [receipts[0]]
+    assert [r for r, _ in dropped] == [receipts[3], receipts[4]]
+    assert dropped[0][1].startswith("low_confidence")
+    assert dropped[1][1] == "missing_company_name"
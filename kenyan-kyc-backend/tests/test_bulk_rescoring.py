@@ -0,0 +1,79 @@
+import random
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.services.bulk_rescoring import EPOCH, BulkRescorer, ReceiptColumns
+from app.services.kyc_scoring import (
+    KYCScorer,
+    ScoringInputs,
+    is_amount_outlier,
+    location_key,
+    merchant_key,
+    receipt_drop_reasons,
+)
+
+
+def _receipt(rng):
+    def conf():
+        return None if rng.random() < 0.1 else Decimal(rng.choice(["0.50", "0.95", "0.96", "0.97", "1.00"]))
+
+    return SimpleNamespace(
+        company_name=rng.choice(["NAIVAS LTD", "CARREFOUR", "QUICKMART", "unknown", "", None]),
+        # Resolved receipts count by merchant, unresolved ones by raw name
+        merchant_id=rng.choice([None, 1, 2]),
+        receipt_address=rng.choice(["Westlands, Nairobi", "CBD Nairobi", "", None]),
+        locality_id=rng.choice([None, 101]),
+        receipt_date=None if rng.random() < 0.1 else date(2025, 1, 1) + timedelta(days=rng.randint(0, 120)),
+        total_amount=Decimal(rng.randint(1, 30_000_000)) / 100,
+        amount_outlier_score=rng.choice([None, None, Decimal("0.40"), Decimal("5.10")]),
+        overall_confidence=conf(),
+        confidence_total=conf(),
+        confidence_date=conf(),
+        confidence_company=conf(),
+        confidence_address=conf(),
+    )
+
+
+def _stream_row(user_id, r):
+    # Shape of the rows stream_receipt_chunks reads
+    def hundredths(value):
+        return None if value is None else int(value * 100)
+
+    return (
+        str(user_id),
+        not receipt_drop_reasons(r),
+        bool(r.company_name) and r.company_name.strip().lower() not in ("unknown", "n/a"),
+        is_amount_outlier(r.amount_outlier_score),
+        int(r.total_amount * 100),
+        hundredths(r.overall_confidence),
+        hundredths(r.confidence_total),
+        hundredths(r.confidence_date),
+        hundredths(r.confidence_company),
+        hundredths(r.confidence_address),
+        (r.receipt_date - EPOCH).days if r.receipt_date else None,
+        merchant_key(r),
+        location_key(r),
+    )
+
+
+def test_vectorized_scores_match_decimal_scorer():
+    rng = random.Random(33)
+    receipts_by_user = {
+        uuid.uuid4(): [_receipt(rng) for _ in range(rng.choice([1, 2, 4, 9, 30]))]
+        for _ in range(200)
+    }
+    rows = [
+        _stream_row(user_id, r)
+        for user_id, receipts in receipts_by_user.items()
+        for r in receipts
+    ]
+
+    scored, _ = BulkRescorer(db=None).score_chunk(ReceiptColumns(rows))
+
+    scorer = KYCScorer(db=None)
+    assert len(scored) == len(receipts_by_user)
+    for row in scored:
+        trusted = [r for r in receipts_by_user[row.pop("user_id")] if not receipt_drop_reasons(r)]
+        assert row == scorer._score_data(ScoringInputs.from_receipts(trusted))
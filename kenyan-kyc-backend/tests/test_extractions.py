@@ -0,0 +1,25 @@
+from app.services.extractions import BULKY_KEYS, pack, split_extraction, unpack
+
+
+def test_tokens_leave_the_summary_and_survive_compression():
+    parsed = {
+        "company_name": "NAIVAS LTD",
+        "total_amount": 1234.5,
+        "raw_tokens": ["ĠNA", "IV", "AS"] * 100,
+        "raw_labels": ["B-company", "I-company", "O"] * 100,
+        "raw_text": " NAIVAS" * 100,
+    }
+    summary, bulky = split_extraction(parsed)
+
+    assert summary == {"company_name": "NAIVAS LTD", "total_amount": 1234.5, "token_count": 300}
+    assert set(bulky) == set(BULKY_KEYS)
+
+    payload, raw_bytes = pack(bulky)
+    assert len(payload) < raw_bytes
+    assert unpack(payload) == bulky
+
+
+def test_result_without_tokens_has_no_side_part():
+    summary, bulky = split_extraction({"company_name": "NAIVAS LTD"})
+    assert summary == {"company_name": "NAIVAS LTD"}
+    assert bulky is None
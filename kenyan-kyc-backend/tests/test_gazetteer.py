@@ -0,0 +1,40 @@
+import random
+
+from app.services.gazetteer import AhoCorasick, Gazetteer, gazetteer
+
+
+def test_automaton_finds_every_overlapping_match():
+    patterns = ["he", "she", "his", "hers"]
+    automaton = AhoCorasick((p, p) for p in patterns)
+    rng = random.Random(38)
+    for _ in range(500):
+        text = "".join(rng.choice("hers") for _ in range(30))
+        expected = sorted(
+            (i, i + len(p), p) for p in patterns for i in range(len(text)) if text.startswith(p, i)
+        )
+        assert sorted(automaton.iter_matches(text)) == expected
+
+
+def test_most_specific_locality_wins():
+    def name(address):
+        locality = gazetteer.match(address)
+        return locality.name if locality else None
+
+    assert name("Sarit Centre, Westlands, Nairobi") == "Sarit Centre"
+    assert name("WESTLANDS NAIROBI") == "Westlands"
+    assert name("Junction Mall, Ngong Rd") == "The Junction Mall"
+    assert name("Ngong Rd, Nairobi") == "Ngong Road"
+    assert name("P.O. Box 12, Ngong") == "Ngong"
+    assert name("Moi Avenue, MSA") == "Mombasa"
+    assert name("Kenyatta Street") is None
+    assert name(None) is None
+    # Whole words only
+    assert name("Embuvu Rd") is None
+    assert gazetteer.county_of(gazetteer.match_id("Murang'a town")).id == 21
+
+
+def test_same_name_county_and_town():
+    g = Gazetteer.load()
+    assert g.match("Nakuru").kind == "town"
+    assert g.county_of(g.match_id("Nakuru")).name == "Nakuru"
+    assert all(g.get(locality.parent_id) for locality in g.localities.values() if locality.parent_id)
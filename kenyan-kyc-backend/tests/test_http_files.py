@@ -0,0 +1,22 @@
+import pytest
+
+from app.utils.http_files import _etag_matches, _parse_range
+
+
+def test_parse_range_forms():
+    assert _parse_range("bytes=0-99", 1000) == (0, 99)
+    assert _parse_range("bytes=900-", 1000) == (900, 999)
+    assert _parse_range("bytes=-10", 1000) == (990, 999)
+    assert _parse_range("bytes=0-5000", 1000) == (0, 999)
+    # Multiple ranges are served as a full 200 response
+    assert _parse_range("bytes=0-1,5-6", 1000) is None
+
+    with pytest.raises(ValueError):
+        _parse_range("bytes=1000-", 1000)
+
+
+def test_etag_matching_is_weak():
+    assert _etag_matches('W/"abc-thumb"', '"abc-thumb"')
+    assert _etag_matches('"x", "abc-thumb"', '"abc-thumb"')
+    assert _etag_matches("*", '"abc-thumb"')
+    assert not _etag_matches('"abc-preview"', '"abc-thumb"')
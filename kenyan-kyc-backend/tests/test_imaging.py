@@ -0,0 +1,22 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app.services.imaging import ImageTooLarge, normalize_image
+
+
+def _png(size) -> io.BytesIO:
+    out = io.BytesIO()
+    Image.new("RGB", size, (255, 255, 255)).save(out, format="PNG")
+    out.seek(0)
+    return out
+
+
+def test_decompression_bombs_are_rejected_not_stored(monkeypatch):
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1_000)
+    with pytest.raises(ImageTooLarge):
+        normalize_image(_png((100, 100)), max_dim=64)
+
+    assert normalize_image(_png((20, 20)), max_dim=64)[:4] == b"RIFF"
+    assert normalize_image(io.BytesIO(b"%PDF-1.4"), max_dim=64) is None
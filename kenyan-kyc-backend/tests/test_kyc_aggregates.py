@@ -0,0 +1,70 @@
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.models.models import UserReceiptAggregate
+from app.services.amount_outliers import AmountSketch
+from app.services.kyc_scoring import (
+    KYCScorer,
+    ReceiptContribution,
+    ScoringInputs,
+    receipt_drop_reasons,
+)
+
+
+def _receipt(
+    i, company="NAIVAS LTD", confidence="0.97", amount="1250.50", merchant_id=1, outlier_score=None
+):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        status="completed",
+        company_name=company,
+        merchant_id=merchant_id,
+        receipt_address=["Westlands, Nairobi", "CBD Nairobi", None][i % 3],
+        locality_id=[101, None, None][i % 3],  # CBD Nairobi left unmatched
+        receipt_date=date(2025, 1, 1) + timedelta(days=7 * i),
+        total_amount=Decimal(amount),
+        amount_outlier_score=outlier_score,
+        overall_confidence=Decimal(confidence),
+        confidence_total=Decimal(confidence),
+        confidence_date=Decimal(confidence),
+        confidence_company=Decimal(confidence),
+        confidence_address=Decimal(confidence),
+    )
+
+
+def test_folded_aggregate_matches_full_recompute():
+    receipts = [
+        _receipt(0),
+        _receipt(1, company="CARREFOUR", confidence="1.00", amount="9800.00", merchant_id=2),
+        _receipt(2, company="unknown", merchant_id=None),  # dropped: placeholder merchant
+        _receipt(3, confidence="0.50"),  # dropped: low confidence
+        _receipt(4, company="QUICKMART", amount="310.00", merchant_id=3),
+        _receipt(5, company="JAVA HOUSE", confidence="0.99", merchant_id=None),  # not resolved yet
+        _receipt(6, company="Naivas"),  # same merchant, another spelling
+        _receipt(7, amount="90000.00", outlier_score=Decimal("6.20")),  # dropped: unusual for user
+    ]
+    agg = UserReceiptAggregate(user_id=uuid.uuid4())
+    KYCScorer._reset_aggregate(agg)
+    for r in receipts:
+        KYCScorer._fold(agg, ReceiptContribution.of(r), 1)
+
+    # Removing a receipt that is not a date boundary needs no rescan
+    removed = receipts.pop(4)
+    assert not KYCScorer._fold(agg, ReceiptContribution.of(removed), -1)
+
+    trusted = [r for r in receipts if not receipt_drop_reasons(r)]
+    assert ScoringInputs.from_aggregate(agg) == ScoringInputs.from_receipts(trusted)
+    assert agg.dropped_count == 3
+    assert agg.merchant_counts == {"#1": 2, "#2": 1, "JAVA HOUSE": 1}
+    assert agg.address_counts == {"@101": 2, "CBD Nairobi": 1}
+    sketch = AmountSketch()
+    for r in trusted:
+        sketch.add(r.total_amount)
+    assert agg.amount_histogram == sketch.as_json()
+
+    scorer = KYCScorer(db=None)
+    assert scorer._score_data(ScoringInputs.from_aggregate(agg)) == scorer._score_data(
+        ScoringInputs.from_receipts(trusted)
+    )
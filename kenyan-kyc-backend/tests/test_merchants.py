@@ -0,0 +1,31 @@
+from app.services.merchants import TrigramIndex, normalize_merchant_name, similarity, trigrams
+
+
+def test_normalization_strips_case_punctuation_and_suffixes():
+    assert normalize_merchant_name("NAIVAS") == "naivas"
+    assert normalize_merchant_name("Naivas Ltd.") == "naivas"
+    assert normalize_merchant_name("NAIVAS SUPERMARKET LIMITED") == "naivas"
+    assert normalize_merchant_name("Quick-Mart (K) Ltd") == "quick mart"
+    # A suffix word on its own is the name
+    assert normalize_merchant_name("Ltd") == "ltd"
+    for placeholder in (None, "", " Unknown ", "N/A"):
+        assert normalize_merchant_name(placeholder) is None
+
+
+def test_trigrams_match_pg_trgm():
+    assert trigrams("cat") == {"  c", " ca", "cat", "at "}
+    # Documented pg_trgm result for similarity('word', 'two words')
+    assert round(similarity("word", "two words"), 6) == 0.363636
+
+
+def test_index_resolves_ocr_variants_to_the_closest_merchant():
+    index = TrigramIndex()
+    index.add(1, "naivas")
+    index.add(2, "carrefour")
+    index.add(3, "quickmart")
+
+    assert index.get("naivas") == 1
+    assert index.best_match("naiva5", 0.5)[0] == 1
+    assert index.best_match("carrefor", 0.5)[0] == 2
+    assert index.best_match("quick mart", 0.5)[0] == 3
+    assert index.best_match("java house", 0.5) is None
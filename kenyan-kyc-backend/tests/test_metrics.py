@@ -0,0 +1,77 @@
+from app.core.metrics import (
+    OTHER_STATEMENTS,
+    Metrics,
+    RequestStats,
+    _current_request,
+    normalize_statement,
+    redact_parameters,
+)
+
+
+def test_statements_differing_only_in_values_share_a_key():
+    psycopg = normalize_statement(
+        "SELECT users.id FROM users\n  WHERE users.id IN (%(id_1_1)s, %(id_1_2)s) LIMIT %(param_1)s"
+    )
+    asyncpg = normalize_statement(
+        "SELECT users.id FROM users WHERE users.id IN ($1::UUID, $2::UUID, $3::UUID) LIMIT $4::INTEGER"
+    )
+    literal = normalize_statement("SELECT users.id FROM users WHERE users.id IN ('a', 'b') LIMIT 50")
+    assert psycopg == asyncpg == literal == "SELECT users.id FROM users WHERE users.id IN (...) LIMIT ?"
+
+    assert normalize_statement(
+        "INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5, $6)"
+    ) == "INSERT INTO t (a, b) VALUES (...), ..."
+    # Digits inside identifiers stay
+    assert normalize_statement("SELECT anon_1.x FROM anon_1") == "SELECT anon_1.x FROM anon_1"
+
+
+def test_slow_query_parameters_are_redacted():
+    redacted = redact_parameters({"email": "a@b.co", "score": 91.5, "id": None})
+    assert redacted == {"email": "<str len=6>", "score": "<float>", "id": "NULL"}
+    assert "hunter2" not in str(redact_parameters(("hunter2",)))
+    assert redact_parameters([{"a": 1}, {"a": 2}], executemany=True) == "<2 parameter sets>"
+
+
+def test_distinct_statements_are_capped():
+    metrics = Metrics(max_statements=2, slow_query_seconds=1)
+    for n in range(4):
+        metrics.observe_statement(f"SELECT * FROM t{chr(97 + n)}", 0.001)
+    metrics.observe_statement("SELECT * FROM ta WHERE id = $1", 2.0)
+
+    body = metrics.render()
+    assert body.count("kyc_db_statement_seconds_count") == 3
+    assert f'statement="{OTHER_STATEMENTS}"}} 2' in body
+    assert "kyc_db_slow_statements_total 1" in body
+
+
+def test_statements_are_counted_against_the_current_request():
+    metrics = Metrics(max_statements=10, slow_query_seconds=1)
+    stats = RequestStats()
+    token = _current_request.set(stats)
+    try:
+        metrics.observe_statement("SELECT 1", 0.002)
+        metrics.observe_statement("SELECT 2", 0.003)
+    finally:
+        _current_request.reset(token)
+    metrics.observe_statement("SELECT 3", 0.001)
+    assert stats.queries == 2
+
+    metrics.observe_request("GET", "/api/v1/users/{id}", 0.01, stats)
+    body = metrics.render()
+    assert 'kyc_http_request_queries_total{method="GET",route="/api/v1/users/{id}"} 2' in body
+
+
+def test_each_family_is_one_group():
+    metrics = Metrics(max_statements=10, slow_query_seconds=1)
+    metrics.observe_request("GET", "/a", 0.01, RequestStats())
+    metrics.observe_request("POST", "/b", 0.01, RequestStats())
+    seen, current = set(), None
+    for line in metrics.render().splitlines():
+        if line.startswith("# TYPE"):
+            current = line.split()[2]
+            assert current not in seen
+            seen.add(current)
+        elif not line.startswith("#"):
+            assert line.split("{")[0].split(" ")[0] in (
+                current, current + "_bucket", current + "_sum", current + "_count"
+            )
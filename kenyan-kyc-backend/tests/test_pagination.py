@@ -0,0 +1,55 @@
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.schemas import ReceiptResponse
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    page_rows,
+    parse_fields,
+    sparse_response,
+)
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    at, row_id = datetime(2025, 3, 1, 12, 30, 5, 123456), uuid.uuid4()
+    assert decode_cursor(encode_cursor(at, row_id)) == (at, row_id)
+
+    for bad in ("", "not-a-cursor", encode_cursor(at, row_id)[:-3]):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(bad)
+        assert exc.value.status_code == 400
+
+
+def test_next_cursor_only_when_another_page_follows():
+    rows = [SimpleNamespace(id=uuid.uuid4(), uploaded_at=datetime(2025, 1, day)) for day in (3, 2, 1)]
+    page, cursor = page_rows(rows, "uploaded_at", 2)
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == (rows[1].uploaded_at, rows[1].id)
+    assert page_rows(rows, "uploaded_at", 3) == (rows, None)
+
+
+def test_sparse_fields_keep_schema_order_and_encoding():
+    fields = parse_fields("total_amount, company_name", ReceiptResponse, required=("id", "uploaded_at"))
+    assert fields == ["id", "company_name", "total_amount", "uploaded_at"]
+    assert parse_fields(None, ReceiptResponse) is None
+    with pytest.raises(HTTPException):
+        parse_fields("company_name,raw_extraction_json", ReceiptResponse)
+
+    row = SimpleNamespace(
+        id=uuid.uuid4(), company_name="NAIVAS", total_amount=Decimal("105.00"),
+        uploaded_at=datetime(2025, 1, 1),
+    )
+    response = sparse_response([row], ReceiptResponse, fields, "abc")
+    assert json.loads(response.body) == [
+        {"id": str(row.id), "company_name": "NAIVAS", "total_amount": "105.00",
+         "uploaded_at": "2025-01-01T00:00:00"},
+    ]
+    assert response.headers[NEXT_CURSOR_HEADER] == "abc"
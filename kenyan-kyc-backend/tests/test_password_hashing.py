@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+from app.core.security import (
+    PasswordHasher,
+    PasswordHasherBusy,
+    hash_refresh_token,
+    new_refresh_token,
+)
+
+
+def test_queue_is_bounded_and_counted():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def storm():
+        jobs = [asyncio.ensure_future(hasher._run(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        stats = hasher.stats()
+        release.set()
+        return stats, await asyncio.gather(*jobs, return_exceptions=True)
+
+    stats, results = asyncio.run(storm())
+    assert (stats["running"], stats["queued"], stats["rejected"]) == (1, 1, 1)
+    assert results[:2] == [True, True]
+    assert isinstance(results[2], PasswordHasherBusy)
+    assert hasher.stats()["completed"] == 2
+    assert hasher.stats()["queued"] == 0
+
+
+def test_cancelled_waiter_gives_its_slot_back():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def run():
+        running = asyncio.ensure_future(hasher._run(release.wait))
+        queued = asyncio.ensure_future(hasher._run(release.wait))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        await running
+        # Both slots are free again
+        return await asyncio.gather(hasher._run(lambda: 1), hasher._run(lambda: 2))
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_password_round_trip():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+
+    async def run():
+        hashed = await hasher.hash("correct horse")
+        return await hasher.verify("correct horse", hashed), await hasher.verify("wrong", hashed)
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_refresh_tokens_are_stored_hashed():
+    token = new_refresh_token()
+    assert token != new_refresh_token()
+    assert hash_refresh_token(token) == hash_refresh_token(token)
+    assert len(hash_refresh_token(token)) == 64
+    assert token not in hash_refresh_token(token)
@@ -0,0 +1,107 @@
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from app.models.models import User
+from app.services.principal_cache import (
+    PrincipalCache,
+    PrincipalListener,
+    invalidate_on_commit,
+    principal_cache,
+)
+
+
+def _user(**values):
+    return User(id=uuid.uuid4(), email="a@b.co", full_name="A", is_active=True, receipts_version=3, **values)
+
+
+def test_hits_are_fresh_detached_copies():
+    cache = PrincipalCache(max_entries=10, ttl_seconds=60)
+    user = _user()
+    assert cache.get(user.id) is None
+    cache.put(user, cache.token())
+
+    first, second = cache.get(user.id), cache.get(user.id)
+    assert first is not second
+    assert inspect(first).detached and first.receipts_version == 3
+    assert cache.stats()["hit_rate"] == round(2 / 3, 4)
+
+
+def test_expiry_size_bound_and_disabled_without_listener():
+    cache = PrincipalCache(max_entries=2, ttl_seconds=0.05)
+    users = [_user() for _ in range(3)]
+    for user in users:
+        cache.put(user, cache.token())
+    assert cache.get(users[0].id) is None and cache.get(users[2].id) is not None
+    time.sleep(0.06)
+    assert cache.get(users[2].id) is None
+
+    gated = PrincipalCache(max_entries=2, ttl_seconds=60, require_listener=True)
+    gated.put(users[0], gated.token())
+    assert gated.get(users[0].id) is None
+    gated.listening = True
+    gated.put(users[0], gated.token())
+    assert gated.get(users[0].id) is not None
+
+
+def test_lookup_that_raced_an_invalidation_is_not_cached():
+    cache = PrincipalCache(max_entries=10, ttl_seconds=60)
+    user, other = _user(), _user()
+    token = cache.token()  # lookup starts
+    cache.invalidate(user.id)  # a write commits meanwhile
+    cache.put(user, token)
+    cache.put(other, token)
+    assert cache.get(user.id) is None and cache.get(other.id) is not None
+
+    token = cache.token()
+    cache.clear()
+    cache.put(user, token)
+    assert cache.get(user.id) is None
+
+
+def test_invalidation_waits_for_commit():
+    user = _user()
+    required = principal_cache.require_listener
+    principal_cache.require_listener = False
+    try:
+        principal_cache.put(user, principal_cache.token())
+        db = Session()
+        invalidate_on_commit(db, user.id)
+        db.rollback()
+        assert principal_cache.get(user.id) is not None
+
+        invalidate_on_commit(db, str(user.id))
+        assert principal_cache.get(user.id) is not None
+        db.commit()
+        assert principal_cache.get(user.id) is None
+    finally:
+        principal_cache.require_listener = required
+
+
+class _Connection:
+    def __init__(self, trigger: bool):
+        self.trigger = trigger
+
+    async def fetchval(self, sql, *args):
+        return self.trigger
+
+
+def test_cache_does_not_serve_without_the_notify_trigger():
+    cache = PrincipalCache(max_entries=10, ttl_seconds=60, require_listener=True)
+    listener = PrincipalListener(cache)
+    conn = _Connection(trigger=False)
+    user = _user()
+
+    asyncio.run(listener.connected(conn))
+    assert not cache.listening
+    cache.put(user, cache.token())
+    assert cache.get(user.id) is None
+
+    conn.trigger = True
+    asyncio.run(listener.idle(conn))
+    assert cache.listening
+    cache.put(user, cache.token())
+    assert cache.get(user.id) is not None
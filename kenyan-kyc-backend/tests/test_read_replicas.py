@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.core.replicas import ReplicaSet, caught_up, parse_replica_urls, replication_lag
+
+
+def _replica_set(*healthy):
+    replicas = [SimpleNamespace(name=f"r{n}", healthy=h) for n, h in enumerate(healthy, 1)]
+    return ReplicaSet(replicas, sticky_seconds=10, max_lag_seconds=5, check_seconds=5)
+
+
+def test_replica_urls_are_comma_separated():
+    assert parse_replica_urls("") == []
+    assert parse_replica_urls(" postgresql://a/db, postgresql://b/db ,") == [
+        "postgresql://a/db",
+        "postgresql://b/db",
+    ]
+
+
+def test_replicas_take_turns_skipping_unhealthy_ones():
+    replicas = _replica_set(True, False, True)
+    assert [replicas.pick().name for _ in range(4)] == ["r1", "r3", "r1", "r3"]
+
+    for replica in replicas.replicas:
+        replica.healthy = False
+    assert replicas.pick() is None
+
+
+def test_replication_lag():
+    # Replayed all the primary's WAL: current however old the last write
+    assert replication_lag(True, True, True, 3600.0) == 0.0
+    assert replication_lag(True, True, False, 2.5) == 2.5
+    assert replication_lag(True, True, None, None) == 0.0
+    # Not following the primary at all
+    assert replication_lag(True, False, True, 0.1) is None
+    assert replication_lag(False, False, None, None) is None
+
+
+def test_recently_changed_users_stay_on_the_primary():
+    replicas = _replica_set(True)
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    user = SimpleNamespace(updated_at=now - timedelta(seconds=3))
+
+    assert replicas.is_sticky(user, now)
+    assert not replicas.is_sticky(user, now + timedelta(seconds=10))
+    assert not replicas.is_sticky(SimpleNamespace(updated_at=None), now)
+
+
+def test_replica_must_have_the_users_latest_row():
+    written = datetime(2025, 1, 1, 12, 0, 0)
+    user = SimpleNamespace(receipts_version=4, updated_at=written)
+
+    assert caught_up((4, written), user)
+    assert caught_up((5, written + timedelta(seconds=1)), user)
+    assert not caught_up((3, written), user)
+    assert not caught_up((4, written - timedelta(microseconds=1)), user)
+    assert not caught_up(None, user)
+    assert caught_up((0, None), SimpleNamespace(receipts_version=0, updated_at=None))
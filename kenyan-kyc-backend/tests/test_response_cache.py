@@ -0,0 +1,60 @@
+import asyncio
+
+from app.services.response_cache import CacheBackend, MemoryCacheBackend, VersionedResponseCache
+
+
+class _BrokenBackend(CacheBackend):
+    def get(self, key):
+        raise ConnectionError("down")
+
+    def set(self, key, value, ttl_seconds):
+        raise ConnectionError("down")
+
+
+def test_lru_evicts_least_recently_used():
+    lru = MemoryCacheBackend(max_entries=2)
+    lru.set("a", b"1")
+    lru.set("b", b"2")
+    lru.get("a")
+    lru.set("c", b"3")
+    assert lru.get("b") is None
+    assert lru.get("a") == b"1" and lru.get("c") == b"3"
+
+
+def test_entries_and_etags_follow_the_version():
+    cache = VersionedResponseCache(MemoryCacheBackend(10), shared=MemoryCacheBackend(10))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b'{"n":%d}' % len(builds)
+
+    assert cache.get_or_build("score", "u1", 1, build) == b'{"n":1}'
+    assert cache.get_or_build("score", "u1", 1, build) == b'{"n":1}'
+    assert cache.get_or_build("score", "u1", 2, build) == b'{"n":2}'
+    assert cache.etag("score", "u1", 1) == cache.etag("score", "u1", 1)
+    assert cache.etag("score", "u1", 1) != cache.etag("score", "u1", 2)
+    assert cache.etag("score", "u1", 1) != cache.etag("breakdown", "u1", 1)
+
+    # Another node's process-local tier is empty but the shared one is not
+    other = VersionedResponseCache(MemoryCacheBackend(10), shared=cache.shared)
+    assert other.get_or_build("score", "u1", 2, build) == b'{"n":2}'
+    assert len(builds) == 2 and other.shared_hits == 1
+
+
+def test_shared_backend_outage_only_costs_a_rebuild():
+    cache = VersionedResponseCache(MemoryCacheBackend(10), shared=_BrokenBackend())
+    assert cache.get_or_build("breakdown", "u1", 1, lambda: b"{}") == b"{}"
+    assert cache.stats()["misses"] == 1
+
+
+def test_async_reads_share_entries_with_sync_ones():
+    cache = VersionedResponseCache(MemoryCacheBackend(10), shared=MemoryCacheBackend(10))
+    cache.get_or_build("score", "u1", 1, lambda: b'{"n":1}')
+
+    async def build():
+        return b'{"n":2}'
+
+    assert asyncio.run(cache.get_or_build_async("score", "u1", 1, build)) == b'{"n":1}'
+    assert asyncio.run(cache.get_or_build_async("score", "u1", 2, build)) == b'{"n":2}'
+    assert cache.get_or_build("score", "u1", 2, lambda: b"stale") == b'{"n":2}'
@@ -0,0 +1,58 @@
+import random
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from app.core.config import settings
+from app.services.bulk_rescoring import BulkRescorer, ReceiptColumns, current_weights
+from app.services.kyc_scoring import (
+    MAX_SINGLE_RECEIPT_KES,
+    MIN_RECEIPT_CONFIDENCE,
+    kyc_status_for,
+)
+from app.services.score_calibration import ScoringSnapshot, sweep, weight_grid, weight_grid_size
+from test_bulk_rescoring import _receipt, _stream_row
+
+
+def test_sweep_at_current_settings_matches_rescoring():
+    rng = random.Random(34)
+    rows = [
+        _stream_row(user_id, _receipt(rng))
+        for user_id in (uuid.uuid4() for _ in range(300))
+        for _ in range(rng.choice([1, 3, 8, 25]))
+    ]
+    columns = ReceiptColumns(rows)
+    scored, _ = BulkRescorer(db=None).score_chunk(columns)
+    expected = {"verified": 0, "under_review": 0, "pending": 0}
+    for row in scored:
+        expected[kyc_status_for(row["final_score"], row["is_verified"])] += 1
+
+    snapshot = ScoringSnapshot(columns, datetime.utcnow(), 0.0)
+    result = sweep(
+        snapshot,
+        min_confidences=[Decimal("0.50"), MIN_RECEIPT_CONFIDENCE],
+        max_amounts=[None, MAX_SINGLE_RECEIPT_KES],
+        weight_sets=[current_weights(), (1, 0, 0, 0)],
+        thresholds=[Decimal("50"), settings.VERIFICATION_THRESHOLD],
+    )
+
+    assert result.grid_points == 16
+    current = next(
+        p
+        for p in result.points
+        if p["min_confidence"] == MIN_RECEIPT_CONFIDENCE
+        and p["max_amount"] == MAX_SINGLE_RECEIPT_KES
+        and tuple(p["weights"].values()) == current_weights()
+        and p["verification_threshold"] == settings.VERIFICATION_THRESHOLD
+    )
+    assert {k: current[k] for k in expected} == expected
+    assert all(p["verified"] + p["under_review"] + p["pending"] == 300 for p in result.points)
+
+
+def test_weight_grid_sums_to_one():
+    grid = weight_grid(Decimal("0.25"))
+    assert len(grid) == 35 == weight_grid_size(Decimal("0.25"))
+    assert all(abs(sum(w) - 1) < 1e-9 for w in grid)
+    assert len(set(grid)) == len(grid)
+    # Sized without being built
+    assert weight_grid_size(Decimal("0.001")) == 167_668_501
@@ -0,0 +1,95 @@
+import hashlib
+import io
+import os
+import uuid
+
+import pytest
+
+from app.services.storage import (
+    ContentAddressedStore,
+    LocalStorageBackend,
+    S3StorageBackend,
+    StorageBackend,
+)
+
+
+def _local_store(tmp_path):
+    return ContentAddressedStore(
+        LocalStorageBackend(str(tmp_path / "uploads")),
+        staging_dir=str(tmp_path / "uploads" / "tmp"),
+    )
+
+
+def test_store_uses_two_level_fanout_and_dedupes(tmp_path):
+    store = _local_store(tmp_path)
+    payload = b"receipt bytes" * 1000
+    digest = hashlib.sha256(payload).hexdigest()
+
+    first = store.save(io.BytesIO(payload))
+    second = store.save(io.BytesIO(payload))
+
+    assert first.content_hash == digest
+    assert first.size == len(payload)
+    assert first.key == f"blobs/{digest[:2]}/{digest[2:4]}/{digest}"
+    assert second.key == first.key
+    assert (tmp_path / "uploads" / first.key).read_bytes() == payload
+    assert b"".join(store.stream(digest, chunk_size=4096)) == payload
+
+    with store.local_path(digest) as path:
+        assert open(path, "rb").read() == payload
+
+    # Temp files never linger after a save
+    assert list(store.tmp_dir.iterdir()) == []
+
+
+def test_store_rejects_oversized_upload_without_leaving_files(tmp_path):
+    store = _local_store(tmp_path)
+
+    with pytest.raises(ValueError):
+        store.save(io.BytesIO(b"x" * 100), max_size=10)
+
+    assert list(store.tmp_dir.iterdir()) == []
+    assert not store.remove(hashlib.sha256(b"x" * 100).hexdigest())
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    class _PutOnly(StorageBackend):
+        def put_file(self, key, local_path, content_type=None):
+            pass
+
+    with pytest.raises(TypeError):
+        _PutOnly()
+
+
+@pytest.mark.skipif(
+    not os.getenv("S3_TEST_ENDPOINT_URL"),
+    reason="set S3_TEST_ENDPOINT_URL (e.g. a local MinIO) to run",
+)
+def test_s3_backend_round_trip(tmp_path):
+    backend = S3StorageBackend(
+        bucket=os.getenv("S3_TEST_BUCKET", "kyc-receipts-test"),
+        endpoint_url=os.environ["S3_TEST_ENDPOINT_URL"],
+        access_key_id=os.getenv("S3_TEST_ACCESS_KEY_ID", "minioadmin"),
+        secret_access_key=os.getenv("S3_TEST_SECRET_ACCESS_KEY", "minioadmin"),
+    )
+    try:
+        backend.client.create_bucket(Bucket=backend.bucket)
+    except backend.client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+
+    store = ContentAddressedStore(backend, staging_dir=str(tmp_path))
+    payload = uuid.uuid4().bytes * 4096
+
+    blob = store.save(io.BytesIO(payload), content_type="image/jpeg")
+    assert store.exists(blob.content_hash)
+    assert backend.size(blob.key) == len(payload)
+    assert b"".join(store.stream(blob.content_hash, chunk_size=8192)) == payload
+
+    with store.local_path(blob.content_hash) as path:
+        assert open(path, "rb").read() == payload
+
+    url = store.presigned_url(blob.content_hash, filename="r.jpg")
+    assert url and blob.key in url
+
+    assert store.remove(blob.content_hash)
+    assert not store.exists(blob.content_hash)
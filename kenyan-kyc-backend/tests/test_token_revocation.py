@@ -0,0 +1,89 @@
+import asyncio
+import uuid
+
+from app.core.security import create_access_token, decode_access_token
+from app.services.token_revocation import BloomFilter, RevocationFilter, RevocationListener
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    revoked = [uuid.uuid4().hex for _ in range(10_000)]
+    for jti in revoked:
+        bloom.add(jti)
+
+    assert all(jti in bloom for jti in revoked)
+    others = [uuid.uuid4().hex for _ in range(20_000)]
+    assert sum(jti in bloom for jti in others) / len(others) < 0.02
+    assert 0.005 < bloom.false_positive_rate() < 0.015
+
+
+def test_checks_go_to_the_database_unless_listening():
+    revocations = RevocationFilter(capacity=100, error_rate=0.001)
+    revocations.add("revoked")
+
+    assert revocations.might_be_revoked("fresh")
+    revocations.listening = True
+    assert not revocations.might_be_revoked("fresh")
+    assert revocations.might_be_revoked("revoked")
+    assert (revocations.checks, revocations.lookups) == (3, 2)
+
+
+def test_rebuild_keeps_revocations_that_arrive_meanwhile():
+    revocations = RevocationFilter(capacity=100, error_rate=0.001)
+    revocations.listening = True
+    revocations.add("expired")
+
+    building = revocations.begin_rebuild(expected=1)
+    building.add("loaded")
+    revocations.add("notified")
+    revocations.add("notified")
+    revocations.finish_rebuild()
+
+    assert revocations.might_be_revoked("loaded")
+    assert revocations.might_be_revoked("notified")
+    assert not revocations.might_be_revoked("expired")
+    assert revocations.stats()["entries"] == 2
+
+
+def test_rebuild_is_due_once_the_filter_outgrows_its_capacity():
+    revocations = RevocationFilter(capacity=2, error_rate=0.01)
+    revocations.begin_rebuild(expected=0)
+    revocations.finish_rebuild()
+    assert not revocations.needs_rebuild(rebuild_seconds=60)
+    for jti in ("a", "b", "c"):
+        revocations.add(jti)
+    assert revocations.needs_rebuild(rebuild_seconds=60)
+
+
+def test_access_tokens_carry_distinct_ids():
+    first = decode_access_token(create_access_token({"sub": "u1"}))
+    second = decode_access_token(create_access_token({"sub": "u1"}))
+    assert first["jti"] and first["jti"] != second["jti"]
+
+
+class _Connection:
+    def __init__(self, trigger: bool):
+        self.trigger = trigger
+
+    async def fetchval(self, sql, *args):
+        return self.trigger if "pg_trigger" in sql else 0
+
+    async def fetch(self, sql, *args):
+        return []
+
+    async def execute(self, sql, *args):
+        pass
+
+
+def test_filter_is_not_trusted_without_the_notify_trigger():
+    revocations = RevocationFilter(capacity=100, error_rate=0.001)
+    listener = RevocationListener(revocations, rebuild_seconds=60)
+    conn = _Connection(trigger=False)
+
+    asyncio.run(listener.connected(conn))
+    assert not revocations.listening
+    assert revocations.might_be_revoked("fresh")
+
+    conn.trigger = True
+    asyncio.run(listener.idle(conn))
+    assert revocations.listening
@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react';
 import Login from './components/Login';
 import Register from './components/Register';
 import Dashboard from './components/Dashboard';
+import { logout } from './services/api';
 
 function App() {
   const [view, setView] = useState('login');
@@ -21,7 +22,12 @@ function App() {
   };
 
   const handleLogout = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      logout(localStorage.getItem('token'), refreshToken).catch(() => {});
+    }
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     setIsAuthenticated(false);
     setView('login');
   };
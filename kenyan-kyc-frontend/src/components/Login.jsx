@@ -17,6 +17,7 @@ export default function Login({ onSuccess, onSwitchToRegister }) {
     try {
       const response = await login(formData);
       localStorage.setItem('token', response.data.access_token);
+      localStorage.setItem('refresh_token', response.data.refresh_token);
       onSuccess();
     } catch (err) {
       setError(err.response?.data?.detail || 'Login failed');
@@ -1,16 +1,42 @@
 // src/components/ReceiptList.jsx
 import { useState, useEffect } from 'react';
-import { getReceipts, deleteReceipt, getReceiptFile } from '../services/api';
+import { getReceipts, nextCursor, deleteReceipt, getReceiptFile } from '../services/api';
 
+// Small WebP rendition so the list moves kilobytes instead of full scans
+function ReceiptThumb({ id }) {
+  const [src, setSrc] = useState(null);
+
+  useEffect(() => {
+    let url;
+    let cancelled = false;
+    getReceiptFile(id, 'thumb')
+      .then((res) => {
+        if (cancelled) return;
+        url = URL.createObjectURL(res.data);
+        setSrc(url);
+      })
+      .catch(() => {});
+    return () => {
+      cancelled = true;
+      if (url) URL.revokeObjectURL(url);
+    };
+  }, [id]);
+
+  if (!src) return <div className="w-10 h-10 rounded bg-gray-100" />;
+  return <img src={src} alt="" loading="lazy" className="w-10 h-10 rounded object-cover" />;
+}
 
 export default function ReceiptList({ refreshTrigger, onReceiptsChanged }) {
   const [receipts, setReceipts] = useState([]);
+  const [cursor, setCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const fetchReceipts = async () => {
     try {
       const response = await getReceipts();
       setReceipts(response.data);
+      setCursor(nextCursor(response));
     } catch (error) {
       console.error('Failed to fetch receipts:', error);
     } finally {
@@ -18,6 +44,19 @@ export default function ReceiptList({ refreshTrigger, onReceiptsChanged }) {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await getReceipts({ cursor });
+      setReceipts((current) => [...current, ...response.data]);
+      setCursor(nextCursor(response));
+    } catch (error) {
+      console.error('Failed to fetch more receipts:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchReceipts();
   }, [refreshTrigger]);
@@ -48,7 +87,8 @@ export default function ReceiptList({ refreshTrigger, onReceiptsChanged }) {
     if (!confirm('Delete this receipt? This may also update your KYC score.')) return;
     try {
       await deleteReceipt(id);
-      await fetchReceipts();
+      // Dropped in place: the pages already loaded and the cursor stay valid
+      setReceipts((current) => current.filter((receipt) => receipt.id !== id));
       //  Tell parent (Dashboard) to refresh stats + score
       if (onReceiptsChanged) {
         onReceiptsChanged();
@@ -89,6 +129,9 @@ export default function ReceiptList({ refreshTrigger, onReceiptsChanged }) {
           <table className="w-full">
             <thead className="bg-gray-50">
               <tr>
+                <th className="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">
+                  Preview
+                </th>
                 <th className="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">
                   File
                 </th>
@@ -112,6 +155,9 @@ export default function ReceiptList({ refreshTrigger, onReceiptsChanged }) {
             <tbody className="divide-y divide-gray-200">
               {receipts.map((receipt) => (
                 <tr key={receipt.id} className="hover:bg-gray-50">
+                  <td className="px-4 py-3">
+                    <ReceiptThumb id={receipt.id} />
+                  </td>
                   <td className="px-4 py-3 text-sm">{receipt.file_name}</td>
                   <td className="px-4 py-3">{getStatusBadge(receipt.status)}</td>
                   <td className="px-4 py-3 text-sm">{receipt.company_name || '-'}</td>
@@ -144,6 +190,17 @@ export default function ReceiptList({ refreshTrigger, onReceiptsChanged }) {
               ))}
             </tbody>
           </table>
+          {cursor && (
+            <div className="text-center pt-4">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="text-kenya-green font-semibold hover:underline disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
@@ -12,7 +12,7 @@ import {
   ResponsiveContainer,
   Legend
 } from 'recharts';
-import { getReceipts } from '../services/api';
+import { getAllReceipts } from '../services/api';
 
 const COLORS = ['#006600', '#BB0000', '#FF8C00', '#4B0082', '#FFD700', '#00CED1'];
 
@@ -64,8 +64,10 @@ export default function SpendingCharts() {
 
   const fetchData = async () => {
     try {
-      const response = await getReceipts();
-      const receipts = response.data.filter((r) => r.status === 'completed');
+      const all = await getAllReceipts({
+        fields: 'status,company_name,total_amount,receipt_date',
+      });
+      const receipts = all.filter((r) => r.status === 'completed');
 
       // Spending by company
       const companySpending = {};
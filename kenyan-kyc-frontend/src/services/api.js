@@ -21,10 +21,64 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// An expired access token is swapped once for a new pair using the refresh
+// token; concurrent 401s share one /auth/refresh call, since each refresh
+// token only works once
+let refreshing = null;
+
+const refreshTokens = () => {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshing = axios
+      .post(`${API_URL}/auth/refresh`, { refresh_token: refreshToken })
+      .then((response) => {
+        localStorage.setItem('token', response.data.access_token);
+        localStorage.setItem('refresh_token', response.data.refresh_token);
+        return response.data.access_token;
+      })
+      .catch((err) => {
+        localStorage.removeItem('token');
+        localStorage.removeItem('refresh_token');
+        throw err;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+api.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const config = error.config;
+    if (
+      error.response?.status !== 401 ||
+      config._retried ||
+      config.url.startsWith('/auth/') ||
+      !localStorage.getItem('refresh_token')
+    ) {
+      throw error;
+    }
+    config._retried = true;
+    const token = await refreshTokens();
+    config.headers.Authorization = `Bearer ${token}`;
+    return api(config);
+  }
+);
+
 // Auth
 export const register = (data) => api.post('/auth/register', data);
 export const login = (data) => api.post('/auth/login', data);
 export const getCurrentUser = () => api.get('/auth/me');
+// Revokes the refresh token (and every token rotated from the same login);
+// tokens are passed in as the caller clears localStorage straight away
+export const logout = (token, refreshToken) =>
+  api.post(
+    '/auth/logout',
+    { refresh_token: refreshToken },
+    { headers: { Authorization: `Bearer ${token}` } }
+  );
 
 // Receipts
 export const uploadReceipt = (file) => {
@@ -35,18 +89,36 @@ export const uploadReceipt = (file) => {
   });
 };
 
-export const getReceipts = () => api.get('/receipts');
+// One page, newest first; the X-Next-Cursor header (null on the last page)
+// is passed back as `cursor` for the next one
+export const getReceipts = (params = {}) => api.get('/receipts', { params });
+export const nextCursor = (response) => response.headers['x-next-cursor'] || null;
+
+// Every receipt, following the cursor page by page (charts need them all)
+export const getAllReceipts = async (params = {}) => {
+  const receipts = [];
+  let cursor;
+  do {
+    const response = await getReceipts({ limit: 200, ...params, cursor });
+    receipts.push(...response.data);
+    cursor = nextCursor(response);
+  } while (cursor);
+  return receipts;
+};
 
 
 export const processReceipt = (id) => api.post(`/receipts/${id}/process`);
 
 export const deleteReceipt = (id) => api.delete(`/receipts/${id}`);
-export const getReceiptFile = (id) =>
-  api.get(`/receipts/${id}/file`, { responseType: 'blob' });
+// size: 'thumb' | 'preview' | 'original'
+export const getReceiptFile = (id, size = 'original') =>
+  api.get(`/receipts/${id}/file`, { params: { size }, responseType: 'blob' });
 
 // Verification / dashboard
 export const getScore = () => api.get('/verification/score');
 export const getScoreBreakdown = () => api.get('/verification/breakdown');
 export const getDashboard = () => api.get('/users/dashboard');
+// Profile, score, breakdown, first receipts page and counts in one call
+export const getBootstrap = () => api.get('/users/bootstrap');
 
 export default api;